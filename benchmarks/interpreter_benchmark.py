@@ -0,0 +1,66 @@
+#!/usr/local/bin/python3
+
+# NOTE: It compares the end-to-end latency of running the bundled
+#       examples compiled and interpreted by GHCi. Every example is
+#       run once to warm up, and then it is run again after adding
+#       an action with a new literal to the model code, which forces
+#       recompiling or reloading the model. Changing the specs would
+#       not do, for they are passed at launch time.
+#
+#       Usage: interpreter_benchmark.py [DIRNAME]
+
+import os
+import sys
+import time
+import runpy
+import webbrowser
+
+from simulation.aivika.modeler import *
+
+examples_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'examples')
+
+dirname = 'target'
+if len(sys.argv) > 1:
+    dirname = sys.argv[1]
+
+def load_example(filename):
+    """Build the model of the example without running it and return the model, specs and experiment."""
+    captured = []
+    run = MainModel.run
+    MainModel.run = lambda model, specs, experiment = None, **kwargs: captured.append((model, specs, experiment))
+    try:
+        runpy.run_path(filename, run_name = '__main__')
+    finally:
+        MainModel.run = run
+    return captured[0]
+
+def change_code(model):
+    """Add an action with a new literal to the model code, which changes the build fingerprint."""
+    model.add_action('return (' + str(int(time.time())) + ' :: Int) >> return ()')
+
+def measure(func):
+    """Return the wall time of calling the function and its result."""
+    t0 = time.time()
+    status = func()
+    return (time.time() - t0, status)
+
+webbrowser.open = lambda url: None
+
+for name in sorted(os.listdir(examples_dir)):
+    if not name.endswith('.py'):
+        continue
+    filename = os.path.join(examples_dir, name)
+    example_dirname = os.path.join(dirname, name[:-3])
+    (model, specs, experiment) = load_example(filename)
+    model.run(specs, experiment, dirname = example_dirname + '-compiled')
+    (model, specs, experiment) = load_example(filename)
+    change_code(model)
+    (compiled, status1) = measure(lambda: model.run(specs, experiment, dirname = example_dirname + '-compiled'))
+    (model, specs, experiment) = load_example(filename)
+    model.interpret(specs, experiment, dirname = example_dirname + '-interpreted')
+    (model, specs, experiment) = load_example(filename)
+    change_code(model)
+    (interpreted, status2) = measure(lambda: model.interpret(specs, experiment, dirname = example_dirname + '-interpreted'))
+    print(name)
+    print('  compiled:     ' + ('%.2f' % compiled) + ' s (status ' + str(status1) + ')')
+    print('  interpreted:  ' + ('%.2f' % interpreted) + ' s (status ' + str(status2) + ')')
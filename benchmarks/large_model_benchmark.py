@@ -0,0 +1,48 @@
+#!/usr/local/bin/python3
+
+# NOTE: It generates the code of a model with many ports and reports
+#       the wall time and peak memory used by the generation.
+#
+#       Usage: large_model_benchmark.py [PORT_COUNT [DIRNAME]]
+
+import sys
+import time
+
+from simulation.aivika.modeler import *
+
+import resource as rusage
+
+def build_model(port_count, chain_length = 100):
+    """Build a model with the specified number of ports."""
+    model = MainModel()
+    data_type = TransactType(model, 'Transact')
+    chain_count = max(1, port_count // (chain_length + 1))
+    for i in range(0, chain_count):
+        stream = exponential_random_stream(data_type, 1.0)
+        for j in range(0, chain_length):
+            stream = prefetch_stream(stream)
+        terminate_stream(stream)
+    return model
+
+port_count = 100000
+dirname = 'target'
+if len(sys.argv) > 1:
+    port_count = int(sys.argv[1])
+if len(sys.argv) > 2:
+    dirname = sys.argv[2]
+
+t0 = time.time()
+model = build_model(port_count)
+t1 = time.time()
+specs = Specs(0, 1000, 0.1)
+model.generate(specs, dirname = dirname)
+t2 = time.time()
+
+peak = rusage.getrusage(rusage.RUSAGE_SELF).ru_maxrss
+if sys.platform == 'darwin':
+    peak = peak // 1024
+
+print('ports:          ' + str(port_count))
+print('build time:     ' + ('%.2f' % (t1 - t0)) + ' s')
+print('generate time:  ' + ('%.2f' % (t2 - t1)) + ' s')
+print('peak RSS:       ' + str(peak // 1024) + ' MiB')
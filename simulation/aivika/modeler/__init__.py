@@ -4,6 +4,15 @@
 
 from simulation.aivika.modeler.specs import *
 from simulation.aivika.modeler.model import *
+from simulation.aivika.modeler.replicate import *
+from simulation.aivika.modeler.template import *
+from simulation.aivika.modeler.model_backend import *
+from simulation.aivika.modeler.model_store import *
+from simulation.aivika.modeler.model_mirror import *
+from simulation.aivika.modeler.param import *
+from simulation.aivika.modeler.sweep import *
+from simulation.aivika.modeler.shard import *
+from simulation.aivika.modeler.executor import *
 from simulation.aivika.modeler.expr import *
 from simulation.aivika.modeler.expr_random import *
 from simulation.aivika.modeler.expr_run import *
@@ -50,6 +50,10 @@ class TransactType:
         expect_either_attr(attr)
         self._attrs[attr.get_name()] = attr
 
+    def bind_to_model(self, model):
+        """Return the same transact type, but whose streams and servers are created in the specified sub-model."""
+        return BoundTransactType(self, model)
+
     def write(self, file):
         """Write the type definition code in the specified file."""
         file.write('type ')
@@ -106,6 +110,17 @@ class TransactType:
         code = '(' + comp + ' { arrivalValue = ' + code + ' })'
         return code
 
+class BoundTransactType(TransactType):
+    """The transact data type bound to another sub-model, for example, to the replicated one."""
+
+    def __init__(self, transact_type, model):
+        """Initializes a new instance by the transact type and sub-model."""
+        if model.get_main_model() != transact_type.get_model().get_main_model():
+            raise InvalidDataTypeException('Expected transact type ' + transact_type.get_name() + ' to be bound to the same model')
+        self._model = model
+        self._name = transact_type.get_name()
+        self._attrs = transact_type._attrs
+
 class Attr:
     """The transact attribute."""
 
@@ -134,7 +149,7 @@ class Attr:
     def get_expr(self):
         """Return an expression that evaluates to the attribute value."""
         code = '(\\a -> return $ ' + self.get_code() + ' $ arrivalValue a)'
-        return Expr(self._model, code)
+        return Expr(self._model, code, pure = True)
 
     def get_data_type(self):
         """Return the data type."""
@@ -189,12 +204,12 @@ class OptionalAttr(Attr):
     def get_expr(self, default_value):
         """Return an expression that evaluates to the attribute value."""
         code = '(\\a -> return $ maybe ' + str(default_value) + ' id $ ' + self.get_code() + ' $ arrivalValue a)'
-        return Expr(self._model, code)
+        return Expr(self._model, code, pure = True)
 
     def has_expr(self):
         """Return an expression that evaluates to flag indicating whether the attribute is defined."""
         code = '(\\a -> return $ isJust $ ' + self.get_code() + ' $ arrivalValue a)'
-        return Expr(self._model, code)
+        return Expr(self._model, code, pure = True)
 
     def get_data_type(self):
         """Return the data type."""
@@ -285,4 +300,4 @@ def arriving_time_expr(data_type):
     expect_transact_type(data_type)
     model = data_type.get_model()
     code = '(return . arrivalTime)'
-    return Expr(model, code)
+    return Expr(model, code, pure = True)
@@ -0,0 +1,236 @@
+# Copyright (c) 2017 David Sorokin <david.sorokin@gmail.com>
+#
+# Licensed under BSD3. See the LICENSE.txt file in the root of this distribution.
+
+import os
+import sys
+import abc
+import shlex
+import threading
+import subprocess
+import queue
+
+from simulation.aivika.modeler.model_sweep import OUTPUT_FILE
+
+class ExecutorException(Exception):
+    """Raised when the executor is invalid."""
+
+    def __init__(self, message):
+        """Initializes a new instance."""
+        self.message = message
+
+class Transport(abc.ABC):
+    """The way to reach the worker that runs the compiled model.
+
+       The worker runs one job at a time. Before the first job the compiled
+       model is shipped to the worker.
+    """
+
+    @abc.abstractmethod
+    def get_name(self):
+        """Return the worker name."""
+        pass
+
+    @abc.abstractmethod
+    def prepare(self, executable):
+        """Ship the executable to the worker and return its path on the worker or None if it fails."""
+        pass
+
+    @abc.abstractmethod
+    def get_job_dirname(self, dirname):
+        """Return the directory on the worker, where the job saves the report that must be placed in the local directory."""
+        pass
+
+    @abc.abstractmethod
+    def run(self, executable, args):
+        """Run the executable on the worker with the arguments and return the exit status and output."""
+        pass
+
+    @abc.abstractmethod
+    def fetch(self, job_dirname, dirname):
+        """Copy the report saved on the worker to the local directory and return the exit status."""
+        pass
+
+class LocalTransport(Transport):
+    """The worker that is a subprocess on the local machine."""
+
+    def __init__(self, name = 'local'):
+        """Initializes a new instance by the worker name."""
+        self._name = name
+
+    def get_name(self):
+        """Return the worker name."""
+        return self._name
+
+    def prepare(self, executable):
+        """Return the executable as it is already on the worker."""
+        return executable
+
+    def get_job_dirname(self, dirname):
+        """Return the local directory itself."""
+        return dirname
+
+    def run(self, executable, args):
+        """Run the executable as a subprocess and return the exit status and output."""
+        return _run_command([executable] + args)
+
+    def fetch(self, job_dirname, dirname):
+        """Do nothing, for the report is already in the local directory."""
+        return 0
+
+class CommandTransport(Transport):
+    """The worker on the host reachable by the commands such as ssh and scp.
+
+       The commands are templates whose items may contain {host}, {command}
+       for the shell command run on the host, {src} and {dst}. The defaults
+       use ssh and scp. The compiled model and the reports are kept in the
+       remote directory on the host.
+    """
+
+    def __init__(self, host,
+                 run_command = ['ssh', '{host}', '{command}'],
+                 copy_command = ['scp', '{src}', '{host}:{dst}'],
+                 fetch_command = ['scp', '-r', '{host}:{src}', '{dst}'],
+                 remote_dirname = '/tmp/aivika-modeler'):
+        """Initializes a new instance by the host and command templates."""
+        self._host = host
+        self._run_command = run_command
+        self._copy_command = copy_command
+        self._fetch_command = fetch_command
+        self._remote_dirname = remote_dirname
+
+    def get_name(self):
+        """Return the worker name."""
+        return self._host
+
+    def get_remote_dirname(self):
+        """Return the remote directory."""
+        return self._remote_dirname
+
+    def prepare(self, executable):
+        """Copy the executable to the remote directory and return its remote path or None if it fails."""
+        (status, output) = self._run_shell(['mkdir', '-p', self._remote_dirname])
+        if status != 0:
+            return None
+        remote_executable = self._remote_dirname + '/' + os.path.basename(executable)
+        (status, output) = _run_command(self._format(self._copy_command, src = executable, dst = remote_executable))
+        if status != 0:
+            return None
+        return remote_executable
+
+    def get_job_dirname(self, dirname):
+        """Return the remote directory of the job, which has the same name as the local one."""
+        dirname = os.path.abspath(dirname)
+        parent = os.path.basename(os.path.dirname(dirname))
+        return self._remote_dirname + '/' + parent + '/' + os.path.basename(dirname)
+
+    def run(self, executable, args):
+        """Run the executable on the host and return the exit status and output."""
+        return self._run_shell([executable] + args)
+
+    def fetch(self, job_dirname, dirname):
+        """Copy the remote report to the local directory and return the exit status."""
+        dirname = os.path.abspath(dirname)
+        (status, output) = _run_command(self._format(self._fetch_command, src = job_dirname, dst = os.path.dirname(dirname)))
+        return status
+
+    def _run_shell(self, args):
+        """Run the shell command on the host."""
+        command = ' '.join(shlex.quote(arg) for arg in args)
+        return _run_command(self._format(self._run_command, command = command))
+
+    def _format(self, template, **kwargs):
+        """Substitute the values in the command template."""
+        return [item.format(host = self._host, **kwargs) for item in template]
+
+class Executor:
+    """It runs the jobs of the compiled model on the workers, retrying the failed jobs.
+
+       Every worker runs one job at a time. A failed job is queued again
+       and can be taken by any worker until the number of retries is
+       exhausted. A worker that the model cannot be shipped to is dropped.
+    """
+
+    def __init__(self, workers, retries = 2):
+        """Initializes a new instance by the transports of the workers and the number of retries."""
+        if len(workers) == 0:
+            raise ExecutorException('The executor requires at least one worker')
+        self._workers = workers
+        self._retries = retries
+
+    def get_workers(self):
+        """Return the transports of the workers."""
+        return self._workers
+
+    def get_retries(self):
+        """Return the number of retries."""
+        return self._retries
+
+    def execute(self, executable, jobs):
+        """Run the jobs and return their exit statuses.
+
+           The jobs are (args, dirname) pairs, where dirname is the local
+           directory of the report, which is passed to the model by the
+           experiment.path parameter.
+        """
+        statuses = [None] * len(jobs)
+        attempts = [0] * len(jobs)
+        pending = queue.Queue()
+        for i in range(len(jobs)):
+            pending.put(i)
+        lock = threading.Lock()
+        state = { 'alive': len(self._workers), 'left': len(jobs) }
+        done = threading.Event()
+        if len(jobs) == 0:
+            done.set()
+        def finish(i, status):
+            statuses[i] = status
+            state['left'] -= 1
+            if state['left'] == 0:
+                done.set()
+        def work(worker):
+            remote_executable = worker.prepare(executable)
+            if remote_executable is None:
+                with lock:
+                    sys.stdout.write('Worker ' + worker.get_name() + ' is dropped as the model cannot be shipped to it\n')
+                    state['alive'] -= 1
+                    if state['alive'] == 0:
+                        while not pending.empty():
+                            finish(pending.get(), 1)
+                return
+            while not done.is_set():
+                try:
+                    i = pending.get(timeout = 0.1)
+                except queue.Empty:
+                    continue
+                (args, dirname) = jobs[i]
+                job_dirname = worker.get_job_dirname(dirname)
+                if not os.path.exists(dirname):
+                    os.makedirs(dirname)
+                (status, output) = worker.run(remote_executable, args + ['--param', 'experiment.path=' + job_dirname])
+                if status == 0:
+                    status = worker.fetch(job_dirname, dirname)
+                with open(os.path.join(dirname, OUTPUT_FILE), 'w') as file:
+                    file.write(output)
+                with lock:
+                    attempts[i] += 1
+                    sys.stdout.write('Job ' + str(i) + ' has finished on ' + worker.get_name() + ' with status ' + str(status) + '\n')
+                    if (status != 0) and (attempts[i] <= self._retries) and (state['alive'] > 0):
+                        pending.put(i)
+                    else:
+                        finish(i, status)
+        threads = [threading.Thread(target = work, args = (worker,)) for worker in self._workers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return [1 if status is None else status for status in statuses]
+
+def _run_command(args):
+    """Run the command and return its exit status and merged output."""
+    try:
+        process = subprocess.Popen(args, stdout = subprocess.PIPE, stderr = subprocess.STDOUT, universal_newlines = True)
+    except OSError as e:
+        return (127, args[0] + ': ' + str(e.strerror) + '\n')
+    output = process.communicate()[0]
+    return (process.wait(), output)
@@ -3,9 +3,16 @@
 # Licensed under BSD3. See the LICENSE.txt file in the root of this distribution.
 
 import os
+import threading
 import webbrowser
 
 from simulation.aivika.modeler.util import *
+from simulation.aivika.modeler.shard import SHARD_FINAL_TABLE_TITLE
+from simulation.aivika.modeler.shard import SHARD_TABLE_TITLE
+from simulation.aivika.modeler.experiment.base.final_table import FinalTableView
+from simulation.aivika.modeler.experiment.base.final_stats import FinalStatsView
+from simulation.aivika.modeler.experiment.base.table import TableView
+from simulation.aivika.modeler.experiment.chart.deviation_chart import DeviationChartView
 
 class ExperimentException(Exception):
     """Raised when something is invalid when creating the experiment."""
@@ -21,21 +28,55 @@ class Experiment:
                  renderer,
                  run_count = '1',
                  title = None,
-                 descr = None):
-        """Initializes a new instance."""
+                 descr = None,
+                 shards = 1):
+        """Initializes a new instance.
+
+           If there is more than one shard then the runs are split between
+           the processes, whose final values and deviations are merged.
+        """
         self._renderer = renderer
         self._path = get_experiment_path()
         self.run_count = run_count
         self.title = title
         self.descr = descr
+        self.shards = shards
 
     def get_path(self):
         """Return the experiment path."""
         return self._path
 
+    def get_launch_params(self):
+        """Return a dictionary of the parameter values that override the experiment when the model is launched."""
+        return { 'experiment.run_count': self.run_count,
+                 'experiment.path': self._path }
+
+    def get_renderer(self):
+        """Return the renderer."""
+        return self._renderer
+
+    def get_shard_views(self):
+        """Return the additional views that save the data merged after the shards are run."""
+        if int(self.shards) <= 1:
+            return []
+        final_series = []
+        series = []
+        for view in self._renderer.get_views():
+            if isinstance(view, FinalStatsView) or isinstance(view, FinalTableView):
+                final_series = _merge_series(final_series, view.series)
+            elif isinstance(view, DeviationChartView):
+                series = _merge_series(series, view.left_y_series)
+                series = _merge_series(series, view.right_y_series)
+        views = [FinalTableView(title = SHARD_FINAL_TABLE_TITLE, series = final_series)]
+        if (series is None) or (len(series) > 0):
+            views.append(TableView(title = SHARD_TABLE_TITLE, series = series))
+        return views
+
     def install(self, model):
         """Install the prerequisites."""
         self._renderer.install(model)
+        for view in self.get_shard_views():
+            view.install(model)
         model.add_package_import('aivika-experiment')
         model.add_extra_dep('aivika-experiment-5.0')
         if model.get_base_comp() is None:
@@ -57,7 +98,7 @@ class Experiment:
         """Write the experiment definition code in the file."""
         fields = {}
         fields['experimentSpecs'] = lambda file, indent: file.write('specs')
-        fields['experimentRunCount'] = lambda file, indent: file.write(str(self.run_count))
+        fields['experimentRunCount'] = lambda file, indent: write_launch_param(file, 'experiment.run_count', str(self.run_count))
         if not (self.title is None):
             func = lambda file, indent: file.write(encode_str(self.title))
             fields['experimentTitle'] = func
@@ -72,16 +113,28 @@ class Experiment:
         url = 'file://' + self.get_path() + os.sep + 'index.html'
         webbrowser.open(url)
 
+def _merge_series(series, other_series):
+    """Merge the result series, where None means all results."""
+    if (series is None) or (other_series is None):
+        return None
+    return series + [x for x in other_series if not (x in series)]
+
+_experiment_paths = set()
+
+_experiment_paths_lock = threading.Lock()
+
 def get_experiment_path():
-    """Get the experiment directory path."""
+    """Get the experiment directory path, which is not returned twice even if the directory was not created yet."""
     cwd = os.getcwd()
     basedir = cwd + os.sep + 'experiment'
     counter = 1
-    while True:
-        if counter == 1:
-            dirname = basedir
-        else:
-            dirname = basedir + '(' + str(counter) + ')'
-        counter += 1
-        if not os.path.exists(dirname):
-            return dirname
+    with _experiment_paths_lock:
+        while True:
+            if counter == 1:
+                dirname = basedir
+            else:
+                dirname = basedir + '(' + str(counter) + ')'
+            counter += 1
+            if not (os.path.exists(dirname) or (dirname in _experiment_paths)):
+                _experiment_paths.add(dirname)
+                return dirname
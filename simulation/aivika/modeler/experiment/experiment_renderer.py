@@ -11,6 +11,10 @@ class ExperimentRenderer:
         """Initializes a new instance."""
         self._views = views
 
+    def get_views(self):
+        """Return the views."""
+        return self._views
+
     def install(self, model):
         """Install the prerequisites."""
         for view in self._views:
@@ -22,13 +26,13 @@ class ExperimentRenderer:
         else:
             model.add_module_import('import Simulation.Aivika.Experiment.Trans')
 
-    def _write_generators(self, file):
+    def _write_generators(self, file, experiment):
         """Write the generators."""
         func = lambda file, item, indent: self._write_view(file, item, indent)
         indent = '  '
         file.write('generators =\n')
         file.write(indent)
-        write_list(func, self._views, file, indent)
+        write_list(func, self._views + experiment.get_shard_views(), file, indent)
         file.write('\n')
 
     def _write_view(self, file, view, indent):
@@ -54,10 +58,10 @@ class ChartingExperimentRenderer(ExperimentRenderer):
         else:
             raise ExperimentException('No support for the generalized version')
 
-    def _write_generators(self, file):
+    def _write_generators(self, file, experiment):
         """Write the generators."""
         file.write('generators :: ChartRendering r => [WebPageGenerator r]\n')
-        ExperimentRenderer._write_generators(self, file)
+        ExperimentRenderer._write_generators(self, file, experiment)
 
 class ExperimentRendererUsingDiagrams(ChartingExperimentRenderer):
     """The simulation experiment renderer that uses Diagrams."""
@@ -80,7 +84,7 @@ class ExperimentRendererUsingDiagrams(ChartingExperimentRenderer):
 
     def write(self, file, experiment):
         """Write the code that runs the simulation experiment."""
-        self._write_generators(file)
+        self._write_generators(file, experiment)
         file.write('\n')
         file.write('main =\n')
         file.write('  do putStrLn "Loading SVG fonts..."\n')
@@ -88,5 +92,7 @@ class ExperimentRendererUsingDiagrams(ChartingExperimentRenderer):
         file.write('     putStrLn "Loaded."\n')
         file.write('     putStrLn "Started running the simulation and saving the results..."\n')
         file.write('     let renderer = DiagramsRenderer SVG (return fonts)\n')
-        file.write('         path     = WritableFilePath ' + encode_str(experiment.get_path()) + '\n')
+        file.write('         path     = WritableFilePath (')
+        write_launch_param(file, 'experiment.path', encode_str(experiment.get_path()), read_func = 'Just')
+        file.write(')\n')
         file.write('     runExperimentParallel experiment generators (WebPageRenderer renderer path) model\n')
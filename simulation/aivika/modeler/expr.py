@@ -2,6 +2,10 @@
 #
 # Licensed under BSD3. See the LICENSE.txt file in the root of this distribution.
 
+import math
+
+from simulation.aivika.modeler.param import Param
+
 class InvalidExprException(Exception):
     """Raised when the expression is invalid."""
 
@@ -10,19 +14,59 @@ class InvalidExprException(Exception):
         self.message = message
 
 class Expr:
-    """The expression that may depend on the current modeling time or transact attributes."""
+    """The expression that may depend on the current modeling time or transact attributes.
 
-    def __init__(self, model, comp):
-        """Initializes a new instance."""
+       The expressions form a directed acyclic graph. The pure expressions,
+       i.e. those without side effects, are hash-consed within the model, so
+       that every pure subexpression is evaluated only once per transact
+       no matter how many times it is reused.
+    """
+
+    def __init__(self, model, comp, pure = False):
+        """Initializes a new instance by the function that returns an Event computation for the transact.
+
+           The expression should be marked as pure only if it has no side
+           effect and it returns the same value when evaluated repeatedly
+           for the same transact at the same modeling time.
+        """
         self._model = model
         self._comp = comp
+        self._pure = pure
+        self._id = self._new_id(('leaf', comp))
+
+    def _new_id(self, key):
+        """Return the expression identifier, which is shared by all equal pure expressions."""
+        if self._pure:
+            return self._model.new_expr_id(key)
+        else:
+            return self._model.new_expr_id()
 
     def get_model(self):
         """Return the corresponding simulation model."""
         return self._model
 
+    def is_pure(self):
+        """Whether the expression has no side effect."""
+        return self._pure
+
+    def is_constant(self):
+        """Whether the expression is a constant value."""
+        return False
+
+    def is_parametric(self):
+        """Whether the expression value is fixed for the whole simulation run."""
+        return False
+
     def read(self, transact_comp):
         """Return the corresponding computation."""
+        return _ExprWriter(transact_comp).read(self)
+
+    def _get_args(self):
+        """Return the subexpressions."""
+        return []
+
+    def _read_leaf(self, transact_comp):
+        """Return the computation of the expression that has no subexpressions."""
         return '(' + self._comp + ' ' + transact_comp + ')'
 
     def __add__(self, other):
@@ -85,6 +129,270 @@ class Expr:
         """Greater than or equal to."""
         return binary_expr(self, '>=', other)
 
+class ConstExpr(Expr):
+    """The expression that returns a constant value."""
+
+    def __init__(self, model, value):
+        """Initializes a new instance by the specified value."""
+        self._value = str(value)
+        if _is_bool(value) or _is_number(value):
+            self._literal = value
+        else:
+            self._literal = None
+        Expr.__init__(self, model, 'const (return $ ' + self._value + ')', pure = True)
+
+    def is_constant(self):
+        """Whether the expression is a constant value."""
+        return True
+
+    def is_parametric(self):
+        """Whether the expression value is fixed for the whole simulation run."""
+        return True
+
+    def get_literal(self):
+        """Return the Python value of the constant if it is a number or boolean; otherwise, None."""
+        return self._literal
+
+    def _write_value(self, args):
+        """Return the value code."""
+        return '(' + self._value + ')'
+
+class ParameterExpr(Expr):
+    """The expression that returns the value of a Parameter computation such as the start time.
+
+       Such a value is fixed for the whole simulation run.
+    """
+
+    def __init__(self, model, parameter_comp):
+        """Initializes a new instance by the specified Parameter computation."""
+        Expr.__init__(self, model, 'const (liftParameter ' + parameter_comp + ')', pure = True)
+
+    def is_parametric(self):
+        """Whether the expression value is fixed for the whole simulation run."""
+        return True
+
+class ApplyExpr(Expr):
+    """The expression that applies the pure function to the values of subexpressions."""
+
+    def __init__(self, model, func, args):
+        """Initializes a new instance by the specified function code and subexpressions."""
+        self._model = model
+        self._func = func
+        self._args = args
+        self._pure = all(arg.is_pure() for arg in args)
+        self._constant = all(arg.is_constant() for arg in args)
+        self._parametric = all(arg.is_parametric() for arg in args)
+        self._id = self._new_id(('apply', func, tuple(arg._id for arg in args)))
+
+    def is_constant(self):
+        """Whether the expression is a constant value."""
+        return self._constant
+
+    def is_parametric(self):
+        """Whether the expression value is fixed for the whole simulation run."""
+        return self._parametric
+
+    def _get_args(self):
+        """Return the subexpressions."""
+        return self._args
+
+    def _write_value(self, args):
+        """Return the value code by the specified argument values."""
+        return '(' + ' '.join([self._func] + args) + ')'
+
+class BindExpr(Expr):
+    """The expression that passes the values of subexpressions to the function returning an Event computation."""
+
+    def __init__(self, model, func, args):
+        """Initializes a new instance by the specified function code and subexpressions."""
+        self._model = model
+        self._func = func
+        self._args = args
+        self._pure = False
+        self._id = self._new_id(None)
+
+    def _get_args(self):
+        """Return the subexpressions."""
+        return self._args
+
+    def _write_comp(self, args):
+        """Return the computation by the specified argument values."""
+        return ' '.join([self._func] + args)
+
+class IfExpr(Expr):
+    """The conditional expression."""
+
+    def __init__(self, model, cond_expr, true_expr, false_expr):
+        """Initializes a new instance by the specified subexpressions."""
+        self._model = model
+        self._args = [cond_expr, true_expr, false_expr]
+        self._pure = all(arg.is_pure() for arg in self._args)
+        self._constant = all(arg.is_constant() for arg in self._args)
+        self._parametric = all(arg.is_parametric() for arg in self._args)
+        self._id = self._new_id(('if', tuple(arg._id for arg in self._args)))
+
+    def is_constant(self):
+        """Whether the expression is a constant value."""
+        return self._constant
+
+    def is_parametric(self):
+        """Whether the expression value is fixed for the whole simulation run."""
+        return self._parametric
+
+    def _get_args(self):
+        """Return the subexpressions."""
+        return self._args
+
+    def _write_value(self, args):
+        """Return the value code by the specified argument values."""
+        return '(if ' + args[0] + ' then ' + args[1] + ' else ' + args[2] + ')'
+
+class SeqExpr(Expr):
+    """The sequence of expressions for performing some side effect."""
+
+    def __init__(self, model, args):
+        """Initializes a new instance by the specified subexpressions."""
+        self._model = model
+        self._args = args
+        self._pure = all(arg.is_pure() for arg in args)
+        self._id = self._new_id(('seq', tuple(arg._id for arg in args)))
+
+    def _get_args(self):
+        """Return the subexpressions."""
+        return self._args
+
+    def _write_value(self, args):
+        """Return the value code by the specified argument values."""
+        return '()'
+
+class _ExprWriter:
+    """It writes the expression in A-normal form for the specified transact.
+
+       Every pure subexpression is bound once at the beginning of the
+       do-block and then referred to by name. The constant subexpressions
+       are inlined. The subexpressions that depend only on the simulation
+       run parameters are hoisted to the model, where they are computed
+       once per run. The subexpressions with side effects are bound in
+       the order of evaluation every time they occur.
+    """
+
+    def __init__(self, transact_comp, hoisted_expr = None):
+        """Initializes a new instance, where the hoisted expression is written itself, if any."""
+        self._transact_comp = transact_comp
+        self._hoisted_expr = hoisted_expr
+        self._values = {}
+        self._counter = 0
+
+    def read(self, expr):
+        """Return the computation of the expression."""
+        if len(expr._get_args()) == 0:
+            return expr._read_leaf(self._transact_comp)
+        stmts = []
+        self._write_pure_args(expr, stmts)
+        return self._write_block(expr, stmts)
+
+    def _new_name(self):
+        """Return a new variable name."""
+        self._counter += 1
+        return '_e' + str(self._counter)
+
+    def _write_block(self, expr, stmts):
+        """Write the expression in the specified statements and return the do-block."""
+        value = self._write_expr(expr, stmts)
+        if len(stmts) == 0:
+            return '(return $ ' + value + ')'
+        last = stmts[-1]
+        prefix = value + ' <- '
+        if not last.startswith(prefix):
+            stmts.append('return ' + value)
+        elif len(stmts) == 1:
+            return '(' + last[len(prefix):] + ')'
+        else:
+            stmts[-1] = last[len(prefix):]
+        return '(do { ' + '; '.join(stmts) + ' })'
+
+    def _write_pure_args(self, expr, stmts):
+        """Bind all pure subexpressions reachable from the specified expression."""
+        stack = [expr]
+        visited = set()
+        while len(stack) > 0:
+            e = stack.pop()
+            if e._id in visited:
+                continue
+            visited.add(e._id)
+            if e.is_pure():
+                self._write_pure(e, stmts)
+            else:
+                stack.extend(reversed(e._get_args()))
+
+    def _write_pure(self, expr, stmts):
+        """Bind the pure expression and its subexpressions unless they are already bound."""
+        stack = [(expr, False)]
+        while len(stack) > 0:
+            (e, ready) = stack.pop()
+            if e._id in self._values:
+                continue
+            args = e._get_args()
+            if (len(args) > 0) and e.is_parametric() and (not e.is_constant()) and (not (e is self._hoisted_expr)):
+                comp = _ExprWriter('()', hoisted_expr = e).read(e)
+                self._values[e._id] = e.get_model().hoist_expr(e._id, comp)
+            elif not ready:
+                stack.append((e, True))
+                for arg in reversed(args):
+                    stack.append((arg, False))
+            elif e.is_constant():
+                self._values[e._id] = e._write_value([self._values[arg._id] for arg in args])
+            elif len(args) == 0:
+                name = self._new_name()
+                stmts.append(name + ' <- ' + e._read_leaf(self._transact_comp))
+                self._values[e._id] = name
+            else:
+                name = self._new_name()
+                value = e._write_value([self._values[arg._id] for arg in args])
+                stmts.append('let { ' + name + ' = ' + value + ' }')
+                self._values[e._id] = name
+
+    def _write_expr(self, expr, stmts):
+        """Write the expression with side effects in the statements and return its value."""
+        stack = [(expr, False)]
+        results = []
+        while len(stack) > 0:
+            (e, ready) = stack.pop()
+            if e.is_pure():
+                results.append(self._values[e._id])
+                continue
+            args = e._get_args()
+            if isinstance(e, IfExpr):
+                args = args[0:1]
+            if not ready:
+                stack.append((e, True))
+                for arg in reversed(args):
+                    stack.append((arg, False))
+                continue
+            values = results[len(results) - len(args):]
+            del results[len(results) - len(args):]
+            if isinstance(e, IfExpr):
+                name = self._new_name()
+                true_block = self._write_block(e._args[1], [])
+                false_block = self._write_block(e._args[2], [])
+                stmts.append(name + ' <- if ' + values[0] + ' then ' + true_block + ' else ' + false_block)
+                results.append(name)
+            elif isinstance(e, SeqExpr):
+                results.append('()')
+            elif isinstance(e, BindExpr):
+                name = self._new_name()
+                stmts.append(name + ' <- ' + e._write_comp(values))
+                results.append(name)
+            elif len(args) == 0:
+                name = self._new_name()
+                stmts.append(name + ' <- ' + e._read_leaf(self._transact_comp))
+                results.append(name)
+            else:
+                name = self._new_name()
+                stmts.append('let { ' + name + ' = ' + e._write_value(values) + ' }')
+                results.append(name)
+        return results[0]
+
 def expect_expr(expr):
     """Expect the argument to be an expression."""
     if isinstance(expr, Expr):
@@ -100,38 +408,37 @@ def expect_or_coerce_expr(model, expr):
         return return_expr(model, expr)
     elif isinstance(expr, float):
         return return_expr(model, expr)
+    elif isinstance(expr, Param):
+        if model.get_main_model() != expr.get_model().get_main_model():
+            raise InvalidExprException('Expected the parameter ' + expr.get_name() + ' to belong to the same model')
+        return return_expr(model, expr)
     else:
         raise InvalidExprException('Expected an expression: ' + str(expr))
 
 def return_expr(model, value):
     """Get an expression that returns the specified constant value."""
-    code = 'const (return $ ' + str(value) + ')'
-    return Expr(model, code)
+    return ConstExpr(model, value)
 
 def time_expr(model):
     """Get an expression that returns the current modeling time."""
     code = 'const (liftDynamics time)'
-    return Expr(model, code)
+    return Expr(model, code, pure = True)
 
 def start_time_expr(model):
     """Get an expression that returns the start time."""
-    code = 'const (liftParameter starttime)'
-    return Expr(model, code)
+    return ParameterExpr(model, 'starttime')
 
 def stop_time_expr(model):
     """Get an expression that returns the stop time."""
-    code = 'const (liftParameter stoptime)'
-    return Expr(model, code)
+    return ParameterExpr(model, 'stoptime')
 
 def starttime_expr(model):
     """Get an expression that returns the start time."""
-    code = 'const (liftParameter starttime)'
-    return Expr(model, code)
+    return ParameterExpr(model, 'starttime')
 
 def dt_expr(model):
     """Get an expression that returns the integration time step."""
-    code = 'const (liftParameter dt)'
-    return Expr(model, code)
+    return ParameterExpr(model, 'dt')
 
 def binary_expr(expr_1, op, expr_2):
     """Apply the specified binary operator to the expressions."""
@@ -139,7 +446,6 @@ def binary_expr(expr_1, op, expr_2):
     e2 = expr_2
     expect_expr(e1)
     model = e1.get_model()
-    model.add_module_import('import Control.Monad')
     e2 = expect_or_coerce_expr(model, e2)
     if e1.get_model().get_main_model() != e2.get_model().get_main_model():
         raise InvalidExprException('Expected all expressions to belong to the same model')
@@ -155,8 +461,11 @@ def binary_expr(expr_1, op, expr_2):
         pass
     else:
         raise InvalidExprException('Unrecognized binary operator: ' + op + ' (must be one of: ==, !=, <, >, <=, >=, +, -, *, /, **, %, and, or)')
-    code = '(\\a -> liftM2 (' + op + ') ' + e1.read('a') + ' ' + e2.read('a') + ')'
-    return Expr(model, code)
+    if e1.is_constant() and e2.is_constant():
+        value = _fold_binary(op, _get_literal(e1), _get_literal(e2))
+        if not (value is None):
+            return ConstExpr(model, value)
+    return ApplyExpr(model, '(' + op + ')', [e1, e2])
 
 def unary_expr(op, expr):
     """Apply the specified unary operator to the expression."""
@@ -171,9 +480,11 @@ def unary_expr(op, expr):
     else:
         raise InvalidExprException('Unrecognized unary operator: ' + op + ' (must be one of: +, -, abs, not, round)')
     model = e.get_model()
-    model.add_module_import('import Data.Functor')
-    code = '(\\a -> fmap (' + op + ') ' + e.read('a') + ')'
-    return Expr(model, code)
+    if e.is_constant():
+        value = _fold_unary(op, _get_literal(e))
+        if not (value is None):
+            return ConstExpr(model, value)
+    return ApplyExpr(model, op, [e])
 
 def if_expr(cond_expr, true_expr, false_expr):
     """The conditional expression."""
@@ -186,19 +497,23 @@ def if_expr(cond_expr, true_expr, false_expr):
     if (c.get_model().get_main_model() != t.get_model().get_main_model()) or (c.get_model().get_main_model() != f.get_model().get_main_model()):
         raise InvalidExprException('Expected all expressions to belong to the same model')
     model = c.get_model()
-    code = '(\\a -> do { f <- ' + c.read('a') + '; '
-    code += 'if f then ' + t.read('a') + ' else ' + f.read('a')
-    code += ' })'
-    return Expr(model, code)
+    cond = _get_literal(c)
+    if _is_bool(cond):
+        if cond:
+            return t
+        else:
+            return f
+    return IfExpr(model, c, t, f)
 
 def int2double_expr(expr):
     """Return an expression that converts the integer value to a floating-point number."""
     e = expr
     expect_expr(e)
     model = e.get_model()
-    model.add_module_import('import Data.Functor')
-    code = '(\\a -> fmap (fromRational . toRational) ' + expr.read('a') + ')'
-    return Expr(model, code)
+    value = _get_literal(e)
+    if _is_number(value) and _is_finite(float(value)):
+        return ConstExpr(model, float(value))
+    return ApplyExpr(model, '(fromRational . toRational)', [e])
 
 def expr_sequence(exprs):
     """The sequence of expressions for performing some side-effect."""
@@ -212,8 +527,123 @@ def expr_sequence(exprs):
         if (e0.get_model().get_main_model() != e.get_model().get_main_model()):
             raise InvalidExprException('Expected the expressions to belong to the same model')
     model = e0.get_model()
-    model.add_module_import('import Control.Monad')
-    code = '(\\a -> sequence_ ['
-    code += ', '.join([e.read('a') for e in es])
-    code += '])'
-    return Expr(model, code)
+    return SeqExpr(model, list(es))
+
+def _is_bool(value):
+    """Whether the value is a Python boolean."""
+    return isinstance(value, bool)
+
+def _is_number(value):
+    """Whether the value is a Python integer or floating-point number."""
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def _is_finite(value):
+    """Whether the floating-point number is neither infinite nor NaN."""
+    return not (math.isinf(value) or math.isnan(value))
+
+# NOTE: It is the range of the Haskell Int type on the 64-bit platforms.
+
+_INT_MIN = - 2 ** 63
+_INT_MAX = 2 ** 63 - 1
+
+def _is_int_range(value):
+    """Whether the integer fits the Haskell Int type."""
+    return (value >= _INT_MIN) and (value <= _INT_MAX)
+
+def _get_literal(expr):
+    """Return the Python value of the constant expression or None."""
+    if isinstance(expr, ConstExpr):
+        return expr.get_literal()
+    else:
+        return None
+
+def _fold_binary(op, x, y):
+    """Compute the binary operator with the constant operands or return None if it cannot be done safely.
+
+       The operator is already translated to Haskell. The result must be the same
+       as Haskell would compute, or else the expression is left as is. In
+       particular, the integer result is not folded if it does not fit
+       the 64-bit Int type, for Haskell Int would wrap around while
+       Integer would not.
+    """
+    if _is_bool(x) and _is_bool(y):
+        if op == '&&':
+            return x and y
+        elif op == '||':
+            return x or y
+        elif op == '==':
+            return x == y
+        elif op == '/=':
+            return x != y
+        else:
+            return None
+    elif _is_number(x) and _is_number(y):
+        if op == '==':
+            return x == y
+        elif op == '/=':
+            return x != y
+        elif op == '<':
+            return x < y
+        elif op == '<=':
+            return x <= y
+        elif op == '>':
+            return x > y
+        elif op == '>=':
+            return x >= y
+        elif op == '+':
+            value = x + y
+        elif op == '-':
+            value = x - y
+        elif op == '*':
+            value = x * y
+        elif op == '/':
+            if y == 0:
+                return None
+            value = float(x) / float(y)
+        elif op == 'mod':
+            if isinstance(x, float) or isinstance(y, float) or y == 0:
+                return None
+            value = x % y
+        elif op == '**':
+            try:
+                value = math.pow(x, y)
+            except (ValueError, OverflowError):
+                return None
+        else:
+            return None
+        if isinstance(value, float) and not _is_finite(value):
+            return None
+        if isinstance(value, int) and not _is_int_range(value):
+            return None
+        return value
+    else:
+        return None
+
+def _fold_unary(op, x):
+    """Compute the unary operator with the constant operand or return None if it cannot be done safely.
+
+       As with the binary operators, the integer result must fit the 64-bit Int type.
+    """
+    if _is_bool(x):
+        if op == 'not':
+            return not x
+        elif op == 'id':
+            return x
+        else:
+            return None
+    elif _is_number(x):
+        if op == 'negate':
+            value = -x
+        elif op == 'id':
+            value = x
+        elif op == 'abs':
+            value = abs(x)
+        elif op == 'round' and _is_finite(float(x)):
+            value = int(round(x))
+        else:
+            return None
+        if isinstance(value, int) and not _is_int_range(value):
+            return None
+        return value
+    else:
+        return None
@@ -3,13 +3,63 @@
 # Licensed under BSD3. See the LICENSE.txt file in the root of this distribution.
 
 import os
+import sys
+import time
+import array
+import asyncio
+import functools
+import itertools
+import threading
 
-from simulation.aivika.modeler.model_project import generate_cabal_file_impl
-from simulation.aivika.modeler.model_project import generate_stack_file_impl
+from simulation.aivika.modeler.model_project import update_file_impl
+from simulation.aivika.modeler.model_project import render_cabal_file_impl
+from simulation.aivika.modeler.model_project import render_stack_file_impl
 from simulation.aivika.modeler.model_project import generate_license_file_impl
 from simulation.aivika.modeler.model_project import generate_readme_file_impl
 from simulation.aivika.modeler.model_project import generate_setup_file_impl
-from simulation.aivika.modeler.model_project import generate_lib_file_impl
+from simulation.aivika.modeler.model_project import render_lib_file_impl
+from simulation.aivika.modeler.model_project import render_cabal_project_file_impl
+from simulation.aivika.modeler.model_project import BUILD_PROFILES
+from simulation.aivika.modeler.model_project import DEFAULT_BUILD_PROFILE
+from simulation.aivika.modeler.model_cache import compute_fingerprint
+from simulation.aivika.modeler.model_cache import read_fingerprint
+from simulation.aivika.modeler.model_cache import write_fingerprint
+from simulation.aivika.modeler.model_cache import read_executable_path
+from simulation.aivika.modeler.model_cache import write_executable_path
+from simulation.aivika.modeler.model_cache import remove_executable_path
+from simulation.aivika.modeler.model_emitter import StringSpool
+from simulation.aivika.modeler.model_emitter import digest_text
+from simulation.aivika.modeler.model_emitter import emit_file_impl
+from simulation.aivika.modeler.model_reachability import get_action_var_impl
+from simulation.aivika.modeler.model_reachability import find_dead_vars_impl
+from simulation.aivika.modeler.model_split import SplitModel
+from simulation.aivika.modeler.model_split import CompileTimer
+from simulation.aivika.modeler.model_split import TYPES_MODULE
+from simulation.aivika.modeler.model_split import PART_MODULE_PREFIX
+from simulation.aivika.modeler.model_split import TEMPLATE_MODULE_PREFIX
+from simulation.aivika.modeler.model_split import write_types_module_impl
+from simulation.aivika.modeler.model_check import parse_diagnostics_impl
+from simulation.aivika.modeler.model_check import locate_diagnostics_impl
+from simulation.aivika.modeler.model_interpreter import get_interpreter_session_impl
+from simulation.aivika.modeler.model_backend import get_backend_impl
+from simulation.aivika.modeler.model_backend import CapturedOutput
+from simulation.aivika.modeler.model_store import DependencyStore
+from simulation.aivika.modeler.model_store import get_dependency_store
+from simulation.aivika.modeler.model_store import set_dependency_store
+from simulation.aivika.modeler.model_mirror import get_offline_mirror
+from simulation.aivika.modeler.experiment.experiment_renderer import ExperimentRendererUsingDiagrams
+from simulation.aivika.modeler.data_type import encode_data_type
+from simulation.aivika.modeler.util import encode_str
+from simulation.aivika.modeler.param import InvalidParamException
+from simulation.aivika.modeler.param import get_param_args
+from simulation.aivika.modeler.specs import can_launch_method
+from simulation.aivika.modeler.specs import can_launch_generator_type
+from simulation.aivika.modeler.sweep import SweepResults
+from simulation.aivika.modeler.shard import ShardResults
+from simulation.aivika.modeler.shard import get_shard_ranges
+from simulation.aivika.modeler.shard import get_shard_generator_type
+from simulation.aivika.modeler.model_sweep import run_sweep_impl
+from simulation.aivika.modeler.model_sweep import read_final_tables_impl
 
 class ModelException(Exception):
     """Raised when something is invalid when creating or processing the model."""
@@ -25,12 +75,27 @@ class InvalidVariableException(ModelException):
         """Initializes a new instance."""
         ModelException.__init__(self, message)
 
+class InvalidProfileException(ModelException):
+    """Raised when the build profile is invalid."""
+
+    def __init__(self, message):
+        """Initializes a new instance."""
+        ModelException.__init__(self, message)
+
 class Model:
     """The simulation model."""
     pass
 
 class MainModel(Model):
-    """The main simulation model."""
+    """The main simulation model.
+
+       The identifiers of ports, sub-models and expressions are allocated by
+       the main model under its own lock, so that distinct models can be
+       built in parallel threads, each by its own thread, and every such
+       model gets the same names regardless of the thread scheduling.
+       The names are not deterministic if one model is built by several
+       threads at once.
+    """
 
     def __init__(self, base_comp = None):
         """Initializes a new simulation model."""
@@ -40,12 +105,29 @@ class MainModel(Model):
         self._package_locations = set()
         self._extra_deps = set()
         self._module_imports = set()
-        self._actions = []
-        self._sources = []
+        self._actions = StringSpool()
+        self._action_parts = array.array('l')
+        self._sources = StringSpool()
+        self._source_lists = []
         self._var_names = set()
         self._lazy_var_names = set()
-        self._ports = set()
-        self._transact_types = set()
+        self._root_var_names = set()
+        self._eliminated_var_names = []
+        self._ports = []
+        self._pending_ports = []
+        self._transact_types = []
+        self._params = []
+        self._templates = []
+        self._id_lock = threading.Lock()
+        self._next_port_id = 1
+        self._next_submodel_id = 1
+        self._next_expr_id = 1
+        self._expr_ids = dict()
+        self._digests = []
+        self._fingerprint = None
+        self._split = False
+        self._compile_times_enabled = False
+        self._compile_times = dict()
         self._add_defaults()
 
     def _add_defaults(self):
@@ -63,6 +145,7 @@ class MainModel(Model):
         self._module_imports.add('import Data.Functor')
         self._module_imports.add('import Control.Arrow')
         self._module_imports.add('import Control.Monad')
+        self._module_imports.add('import Lib')
 
     def get_main_model(self):
         """Return the main model."""
@@ -84,6 +167,38 @@ class MainModel(Model):
         """Return the source name prefix."""
         return ''
 
+    def new_port_id(self):
+        """Allocate a new port identifier unique within the model."""
+        with self._id_lock:
+            port_id = self._next_port_id
+            self._next_port_id += 1
+            return port_id
+
+    def new_submodel_id(self):
+        """Allocate a new sub-model identifier unique within the model."""
+        with self._id_lock:
+            submodel_id = self._next_submodel_id
+            self._next_submodel_id += 1
+            return submodel_id
+
+    def new_expr_id(self, key = None):
+        """Return the expression identifier by the specified structural key.
+
+           The same identifier is returned for equal keys, which allows
+           hash-consing the pure expressions. A new unique identifier is
+           allocated if the key is not specified.
+        """
+        with self._id_lock:
+            if not (key is None):
+                expr_id = self._expr_ids.get(key)
+                if not (expr_id is None):
+                    return expr_id
+            expr_id = self._next_expr_id
+            self._next_expr_id += 1
+            if not (key is None):
+                self._expr_ids[key] = expr_id
+            return expr_id
+
     def add_pragma(self, pragma):
         """Add the specified pragma."""
         self._pragmas.add(pragma)
@@ -104,19 +219,34 @@ class MainModel(Model):
         """Add the specified module to import."""
         self._module_imports.add(module)
 
-    def add_var(self, name, comp):
-        """Add a new variable with the specified definition."""
+    def add_var(self, name, comp, part = 0):
+        """Add a new variable with the specified definition and optional part of the model code."""
         if name in self._var_names:
             raise InvalidVariableException('Variable ' + name + ' is already defined')
         elif name in self._lazy_var_names:
             action = name + ' <- ' + comp
             self._lazy_var_names.remove(name)
             self._var_names.add(name)
-            self.add_action(action)
+            self.add_action(action, part = part)
         else:
             action = name + ' <- ' + comp
             self._var_names.add(name)
-            self.add_action(action)
+            self.add_action(action, part = part)
+
+    def hoist_expr(self, expr_id, comp):
+        """Bind the Event computation of the expression, evaluated once in the start time, and return the variable name.
+
+           It is used for the expressions that depend only on the simulation
+           run parameters. The computation is bound only once per expression.
+        """
+        name = '_expr_' + str(expr_id)
+        if not (name in self._var_names):
+            self.add_var(name, 'runEventInStartTime $ ' + comp)
+        return name
+
+    def add_root_var(self, name):
+        """Mark the variable as a root, which is never eliminated even if it is not used."""
+        self._root_var_names.add(name)
 
     def add_lazy_var(self, name):
         """Add a new variable that will be defined lazily."""
@@ -127,26 +257,74 @@ class MainModel(Model):
         else:
             self._lazy_var_names.add(name)
 
-    def add_action(self, action):
-        """Add the specified action."""
+    def remove_lazy_var(self, name):
+        """Remove the lazy variable that will never be defined, for its definition was fused with another one."""
+        self._lazy_var_names.remove(name)
+
+    def add_action(self, action, part = 0):
+        """Add the specified action and optional part of the model code, where every sub-model has its own part."""
         self._actions.append(action)
+        self._action_parts.append(part)
 
     def add_port(self, port):
         """Add the specified port for completeness test."""
-        self._ports.add(port)
+        self._ports.append(port)
+
+    def add_pending_port(self, port):
+        """Add the specified port whose definition is deferred until it is read."""
+        self._pending_ports.append(port)
+
+    def flush_pending_ports(self):
+        """Define all ports whose definitions were deferred."""
+        ports = self._pending_ports
+        self._pending_ports = []
+        for port in ports:
+            port.flush()
 
     def add_result_source(self, source):
         """Add the specified result source."""
         self._sources.append(source)
 
+    def add_result_sources(self, sources):
+        """Add the code of the result source list computed by the model."""
+        self._source_lists.append(sources)
+
+    def encode_source_name(self, name):
+        """Return the code of the specified result source name."""
+        return encode_str(name)
+
+    def add_template(self, template):
+        """Add the specified sub-model template, whose module is generated with the model."""
+        for t in self._templates:
+            if t.get_module_name() == template.get_module_name():
+                raise ModelException('Template ' + template.get_name() + ' is already defined')
+        self._templates.append(template)
+
+    def add_template_import(self, template):
+        """Do nothing, for the model imports the modules of all templates."""
+        pass
+
+    def add_param(self, param):
+        """Add the specified model parameter."""
+        for p in self._params:
+            if p.get_name() == param.get_name():
+                raise InvalidParamException('Parameter ' + param.get_name() + ' is already defined')
+        self._params.append(param)
+
+    def get_params(self):
+        """Return a dictionary of the default values of the model parameters by their names."""
+        return dict((p.get_name(), p.get_value()) for p in self._params)
+
     def add_transact_type(self, transact_type):
         """Add the specified transact type."""
-        self._transact_types.add(transact_type)
+        if not (transact_type in self._transact_types):
+            self._transact_types.append(transact_type)
 
     def require_complete(self):
         """Require the model to be complete."""
+        self.flush_pending_ports()
         if len(self._lazy_var_names) > 0:
-            for name in self._lazy_var_names:
+            for name in sorted(self._lazy_var_names):
                 raise InvalidVariableException('Variable ' + name + ' is used but not defined')
         for port in self._ports:
             if not port.is_bound_to_input():
@@ -154,30 +332,426 @@ class MainModel(Model):
             if not port.is_bound_to_output():
                 raise InvalidVariableException('Variable ' + port.get_name() + ' must be bound to its output')
 
-    def run(self, specs, experiment = None, dirname = 'target'):
-        """Generate and compile the project."""
-        self.generate(specs = specs, experiment = experiment, dirname = dirname)
-        cwd = os.getcwd()
-        os.chdir(dirname)
-        status = os.system('stack build')
+    def get_eliminated_vars(self):
+        """Return the list of variables eliminated from the last generated code.
+
+           A variable is eliminated if its value never reaches a terminated
+           stream, a queue, a result source or a side-effecting action.
+        """
+        return list(self._eliminated_var_names)
+
+    def get_compile_times(self):
+        """Return a dictionary of the compile times of modules in seconds measured in the last build.
+
+           The times are measured only when the model code is split into modules
+           and the compile times are requested by compile or generate.
+        """
+        return dict(self._compile_times)
+
+    def get_fingerprint(self):
+        """Return the fingerprint of the last generated project or None.
+
+           The fingerprint covers the model code, the cabal and stack files
+           and the toolchain identity. It can be used as a cache key.
+        """
+        return self._fingerprint
+
+    def run(self, specs, experiment = None, dirname = 'target', split_modules = False, profile = DEFAULT_BUILD_PROFILE, backend = None, params = None,
+            executor = None):
+        """Generate and compile the project.
+
+           The profile can be 'dev' for fast compiling without optimisation,
+           'release' for the usual optimisation or 'max' for the most
+           aggressive one. Every profile is built in its own directory.
+
+           The backend is either an instance of BuildBackend or one of the
+           names 'stack', 'cabal', 'ghc' and 'fake'. If it is None then the
+           default backend is used, which can be changed by set_default_backend.
+
+           The optional params is a dictionary of the parameter values that
+           override the defaults without recompiling the model.
+
+           The specs, run count and experiment path are passed on the command
+           line too. They are not part of the build fingerprint, so changing
+           them does not rebuild the model.
+
+           If the experiment has more than one shard or the executor is
+           specified then it is run by run_shards, one process per CPU at
+           most unless the executor runs the shards on its workers.
+        """
+        _require_profile(profile)
+        backend = get_backend_impl(backend)
+        if (not (experiment is None)) and ((int(experiment.shards) > 1) or not (executor is None)):
+            (status, results) = self._run_shards(specs, experiment, dirname, split_modules, profile, backend, params, None, 1, executor)
+            if status == 0:
+                experiment.open()
+            return status
+        self.generate(specs = specs, experiment = experiment, dirname = dirname, split_modules = split_modules, backend = backend)
+        status = self._build(profile, backend, dirname)
+        if status == 0:
+            status = backend.call(self._get_launch_command(specs, experiment, dirname, profile, backend, params), cwd = dirname)
+        if (status == 0) and (not (experiment is None)):
+            experiment.open()
+        return status
+
+    def compile(self, specs, experiment = None, dirname = 'target', split_modules = False, profile = DEFAULT_BUILD_PROFILE, backend = None,
+                compile_times = False):
+        """Generate and compile the project with the specified build profile and backend.
+
+           If compile_times is true and the code is split into modules then
+           the compile time of every module is measured, which is available
+           by get_compile_times.
+        """
+        _require_profile(profile)
+        backend = get_backend_impl(backend)
+        self.generate(specs = specs, experiment = experiment, dirname = dirname, split_modules = split_modules, backend = backend,
+                      compile_times = compile_times)
+        return self._build(profile, backend, dirname)
+
+    async def run_async(self, specs, experiment = None, dirname = 'target', split_modules = False, profile = DEFAULT_BUILD_PROFILE, backend = None,
+                        params = None, timeout = None, write = None):
+        """Generate, compile and run the project asynchronously, returning CapturedOutput.
+
+           The commands are run as subprocesses in the project directory
+           without changing the current directory of the process. Their
+           output is captured line by line and passed to the optional write
+           function as it arrives. If the timeout in seconds expires then the
+           running command is killed and asyncio.TimeoutError is raised. If
+           the task is cancelled then the running command is killed too.
+           Unlike run, the experiment results are not opened in the browser.
+           The experiment cannot be split into shards here, for which
+           run_shards should be used instead.
+
+           Different models can be run concurrently, but the same model
+           must not be run or compiled concurrently in different projects.
+        """
+        _require_profile(profile)
+        backend = get_backend_impl(backend)
+        if (not (experiment is None)) and (int(experiment.shards) > 1):
+            raise ModelException('The experiment split into shards cannot be run asynchronously, use run_shards instead')
+        output = CapturedOutput(write)
+        coroutine = self._run_async(specs, experiment, dirname, split_modules, profile, backend, params, output)
+        output.set_status(await asyncio.wait_for(coroutine, timeout))
+        return output
+
+    async def compile_async(self, specs, experiment = None, dirname = 'target', split_modules = False, profile = DEFAULT_BUILD_PROFILE, backend = None,
+                            timeout = None, write = None, compile_times = False):
+        """Generate and compile the project asynchronously, returning CapturedOutput.
+
+           It is similar to run_async but it does not run the model.
+           The compile_times flag is the same as in compile.
+        """
+        _require_profile(profile)
+        backend = get_backend_impl(backend)
+        output = CapturedOutput(write)
+        coroutine = self._compile_async(specs, experiment, dirname, split_modules, profile, backend, output, compile_times)
+        output.set_status(await asyncio.wait_for(coroutine, timeout))
+        return output
+
+    async def _compile_async(self, specs, experiment, dirname, split_modules, profile, backend, output, compile_times = False):
+        """Generate the project without blocking the event loop, compile it asynchronously and return the exit status."""
+        loop = asyncio.get_event_loop()
+        generate = functools.partial(self.generate, specs = specs, experiment = experiment, dirname = dirname, split_modules = split_modules,
+                                     backend = backend, compile_times = compile_times)
+        await loop.run_in_executor(None, generate)
+        return await self._build_async(profile, backend, dirname, output)
+
+    async def _run_async(self, specs, experiment, dirname, split_modules, profile, backend, params, output):
+        """Generate, compile and run the project asynchronously and return the exit status."""
+        status = await self._compile_async(specs, experiment, dirname, split_modules, profile, backend, output)
         if status == 0:
-            status = os.system('stack exec modeling-project-exe')
-        os.chdir(cwd)
+            loop = asyncio.get_event_loop()
+            args = await loop.run_in_executor(None, self._get_launch_command, specs, experiment, dirname, profile, backend, params)
+            status = await backend.call_async(args, cwd = dirname, write = output.write)
+        return status
+
+    def _get_launch_command(self, specs, experiment, dirname, profile, backend, params):
+        """Return the command that launches the compiled model."""
+        args = self._get_param_args(params, specs, experiment)
+        path = self.executable_path(dirname, profile = profile, backend = backend)
+        if path is None:
+            return backend.get_exec_command(profile, args)
+        else:
+            return [path] + args
+
+    def executable_path(self, dirname = 'target', profile = DEFAULT_BUILD_PROFILE, backend = None):
+        """Return the absolute path to the executable built in the project directory or None if it is not built.
+
+           The path is resolved once after the build and then it is taken
+           from the cache, so that the executable can be launched directly
+           without the overhead of the build tool, for example, by an
+           external scheduler.
+        """
+        _require_profile(profile)
+        backend = get_backend_impl(backend)
+        work_dir = backend.get_work_dir(profile)
+        path = read_executable_path(dirname, work_dir)
+        if (path is None) or not os.path.isfile(path):
+            path = backend.find_executable(profile, cwd = dirname)
+            if not (path is None):
+                write_executable_path(dirname, path, work_dir)
+        return path
+
+    def interpret(self, specs, experiment = None, dirname = 'target', split_modules = False, backend = None, params = None):
+        """Generate the project and run it in the GHCi interpreter without compiling.
+
+           It suits small models with a few runs, for which compiling takes
+           far longer than the simulation itself. The interpreter session is
+           kept alive between calls, so that a rerun only reloads the model
+           modules that have changed.
+        """
+        backend = get_backend_impl(backend)
+        files = self.generate(specs = specs, experiment = experiment, dirname = dirname, split_modules = split_modules, backend = backend)
+        restart = any((dirname + '/' + name) in files for name in ['modeling-project.cabal', 'stack.yaml', 'cabal.project'])
+        session = get_interpreter_session_impl(dirname, backend, restart = restart)
+        if not session.is_alive():
+            status = session.start()
+            if status != 0:
+                return status
+        if (len(files) > 0) or not session.is_loaded():
+            status = session.load()
+            if status != 0:
+                return status
+        status = session.run_main(args = self._get_param_args(params, specs, experiment))
         if (status == 0) and (not (experiment is None)):
             experiment.open()
         return status
 
-    def compile(self, specs, experiment = None, dirname = 'target'):
-        """Generate and compile the project."""
-        self.generate(specs = specs, experiment = experiment, dirname = dirname)
-        cwd = os.getcwd()
-        os.chdir(dirname)
-        status = os.system('stack build')
-        os.chdir(cwd)
+    def sweep(self, specs, experiment, design, dirname = 'target', split_modules = False, profile = DEFAULT_BUILD_PROFILE, backend = None,
+              processes = None, rts_threads = 1, executor = None):
+        """Compile the model once and run the experiment for every point of the design, returning SweepResults.
+
+           The design is a list of dictionaries of the parameter values, for
+           example, returned by full_factorial_design or latin_hypercube_design.
+           Besides the model parameters, the points may override the specs and
+           run count by the reserved names such as 'specs.stop_time'.
+
+           At most the specified number of processes run at once, which is the
+           number of CPUs by default. Every process uses rts_threads threads
+           of the Haskell runtime unless it is None. Every point saves its
+           report in its own subdirectory of the experiment path and the final
+           values of its FinalTableView views are gathered in the results.
+           If the executor is specified then the points are run on its workers.
+        """
+        if experiment is None:
+            raise ModelException('The parameter sweep requires the experiment')
+        for point in design:
+            self._get_param_args(point, specs, experiment)
+        status = self.compile(specs = specs, experiment = experiment, dirname = dirname, split_modules = split_modules, profile = profile, backend = backend)
+        if status != 0:
+            raise ModelException('Could not compile the project in ' + dirname)
+        dirnames = [os.path.join(experiment.get_path(), 'point-' + str(i)) for i in range(len(design))]
+        values = [dict(point) for point in design]
+        statuses = self._launch_all(specs, experiment, values, dirnames, dirname, profile, backend, processes, rts_threads, executor = executor)
+        results = SweepResults(list(design), statuses)
+        for (i, point_dirname) in enumerate(dirnames):
+            if statuses[i] == 0:
+                results.add_rows(i, read_final_tables_impl(point_dirname))
+        return results
+
+    def run_shards(self, specs, experiment, dirname = 'target', split_modules = False, profile = DEFAULT_BUILD_PROFILE, backend = None,
+                   params = None, processes = None, rts_threads = 1, executor = None):
+        """Compile the model once and run the experiment split into shards by separate processes, returning ShardResults.
+
+           The number of shards is defined by the experiment. Every shard runs
+           its own range of runs and saves its report in its own subdirectory
+           of the experiment path. If the generator has a seed then it is
+           shifted by the first run index of the shard. The final values and
+           deviations of all shards are merged and written in the experiment
+           path as if the experiment were run by one process.
+
+           If the executor is specified then the shards are run on its workers,
+           possibly on other hosts, instead of the local processes.
+        """
+        (status, results) = self._run_shards(specs, experiment, dirname, split_modules, profile, backend, params, processes, rts_threads, executor)
+        if results is None:
+            raise ModelException('Could not compile the project in ' + dirname)
+        return results
+
+    def _run_shards(self, specs, experiment, dirname, split_modules, profile, backend, params, processes, rts_threads, executor):
+        """Run the experiment split into shards and return the exit status with the merged results if compiled."""
+        self._get_param_args(params, specs, experiment)
+        status = self.compile(specs = specs, experiment = experiment, dirname = dirname, split_modules = split_modules, profile = profile, backend = backend)
+        if status != 0:
+            return (status, None)
+        ranges = get_shard_ranges(experiment.run_count, experiment.shards)
+        dirnames = [os.path.join(experiment.get_path(), 'shard-' + str(i)) for i in range(len(ranges))]
+        values = []
+        for (offset, count) in ranges:
+            shard_values = dict(params or {})
+            shard_values['experiment.run_count'] = count
+            if can_launch_generator_type(specs.generator_type):
+                shard_values['specs.generator_type'] = get_shard_generator_type(specs.generator_type, offset)
+            values.append(shard_values)
+        statuses = self._launch_all(specs, experiment, values, dirnames, dirname, profile, backend, processes, rts_threads, label = 'Shard', executor = executor)
+        results = ShardResults(ranges, statuses)
+        for status in statuses:
+            if status != 0:
+                return (status, results)
+        for (i, shard_dirname) in enumerate(dirnames):
+            results.add_shard(i, shard_dirname)
+        results.write(experiment.get_path(), title = experiment.title)
+        return (0, results)
+
+    def _launch_all(self, specs, experiment, values, dirnames, dirname, profile, backend, processes, rts_threads, label = 'Point', executor = None):
+        """Launch the compiled model with every dictionary of the parameter values saving the report in the directory and return the exit statuses.
+
+           If the executor is specified then it runs the model on its workers.
+        """
+        backend = get_backend_impl(backend)
+        path = self.executable_path(dirname, profile = profile, backend = backend)
+        if rts_threads is None:
+            rts_args = []
+        else:
+            rts_args = ['+RTS', '-N' + str(rts_threads), '-RTS']
+        if not (executor is None):
+            if path is None:
+                raise ModelException('Could not find the executable built in ' + dirname)
+            jobs = []
+            for (point_values, point_dirname) in zip(values, dirnames):
+                jobs.append((self._get_param_args(point_values, specs, experiment) + rts_args, point_dirname))
+            return executor.execute(path, jobs)
+        commands = []
+        for (point_values, point_dirname) in zip(values, dirnames):
+            point_values = dict(point_values)
+            point_values['experiment.path'] = point_dirname
+            args = self._get_param_args(point_values, specs, experiment) + rts_args
+            if path is None:
+                commands.append(backend.get_exec_command(profile, args))
+            else:
+                commands.append([path] + args)
+        return run_sweep_impl(backend, commands, dirnames, cwd = dirname, processes = processes, label = label)
+
+    def check(self, specs, experiment = None, dirname = 'target', split_modules = False, backend = None):
+        """Generate the project and only type check it, returning a list of diagnostics.
+
+           No code is generated and nothing is linked, which is much faster
+           than compiling. The diagnostics refer to the lines of the generated
+           code and the ports defined in these lines. The model is type
+           correct if there are no errors among the diagnostics.
+        """
+        backend = get_backend_impl(backend)
+        self.generate(specs = specs, experiment = experiment, dirname = dirname, split_modules = split_modules, backend = backend)
+        args = backend.get_dependencies_command()
+        if not (args is None):
+            status = backend.call(args, cwd = dirname)
+            if status != 0:
+                raise ModelException('Could not build the dependencies of the project in ' + dirname)
+        process = backend.popen(backend.get_check_command(), cwd = dirname)
+        output = process.communicate()[0]
+        status = process.wait()
+        diagnostics = parse_diagnostics_impl(output)
+        if (status != 0) and not any(diagnostic.is_error() for diagnostic in diagnostics):
+            raise ModelException('Could not type check the project in ' + dirname + ':\n' + output)
+        locate_diagnostics_impl(diagnostics, dirname, self._var_names, self._get_port_names())
+        return diagnostics
+
+    def _get_param_args(self, params, specs, experiment = None):
+        """Return the command line arguments that pass the specs, experiment settings and specified parameter values."""
+        values = specs.get_launch_params()
+        if not (experiment is None):
+            values.update(experiment.get_launch_params())
+        if not (params is None):
+            names = set(p.get_name() for p in self._params)
+            for name in params:
+                if not ((name in names) or (name in values)):
+                    raise InvalidParamException('Unknown parameter ' + name)
+            values.update(params)
+            if ('specs.method' in params) and not can_launch_method(params['specs.method']):
+                raise InvalidParamException('Unsupported value of parameter specs.method: ' + str(params['specs.method']))
+            if ('specs.generator_type' in params) and not can_launch_generator_type(params['specs.generator_type']):
+                raise InvalidParamException('Unsupported value of parameter specs.generator_type: ' + str(params['specs.generator_type']))
+        return get_param_args(values)
+
+    def _get_port_names(self):
+        """Return a dictionary of the port names by the variables."""
+        names = dict()
+        for name in self._var_names:
+            i = name.rfind('_user_')
+            if i >= 0:
+                names[name] = name[i + len('_user_'):]
+        for port in self._ports:
+            names[port.get_mangled_name()] = port.get_name()
+        return names
+
+    def _build(self, profile, backend, dirname):
+        """Build the project in the specified directory unless it is up to date."""
+        fingerprint = self._get_build_fingerprint(profile, backend, dirname)
+        if fingerprint is None:
+            return 0
+        args = backend.get_build_command(profile, split_modules = self._split, compile_times = self._compile_times_enabled)
+        if self._compile_times_enabled:
+            status = self._build_with_compile_times(args, backend, dirname)
+        else:
+            self._compile_times = dict()
+            status = backend.call(args, cwd = dirname)
+        if status == 0:
+            write_fingerprint(dirname, fingerprint, backend.get_work_dir(profile))
+        return status
+
+    async def _build_async(self, profile, backend, dirname, output):
+        """Build the project in the specified directory asynchronously unless it is up to date."""
+        loop = asyncio.get_event_loop()
+        fingerprint = await loop.run_in_executor(None, self._get_build_fingerprint, profile, backend, dirname)
+        if fingerprint is None:
+            return 0
+        args = backend.get_build_command(profile, split_modules = self._split, compile_times = self._compile_times_enabled)
+        if self._compile_times_enabled:
+            timer = CompileTimer(time.time)
+            def write(stream, line):
+                if timer.feed(line):
+                    output.write(stream, line)
+            status = await backend.call_async(args, cwd = dirname, write = write)
+            self._compile_times = timer.get_times()
+        else:
+            self._compile_times = dict()
+            status = await backend.call_async(args, cwd = dirname, write = output.write)
+        if status == 0:
+            write_fingerprint(dirname, fingerprint, backend.get_work_dir(profile))
+        return status
+
+    def _get_build_fingerprint(self, profile, backend, dirname):
+        """Return the fingerprint of the build or None if the project is up to date.
+
+           If the project must be built then the cached executable path is removed.
+        """
+        work_dir = backend.get_work_dir(profile)
+        fingerprint = compute_fingerprint(self._digests, backend.get_identity())
+        if read_fingerprint(dirname, work_dir) == fingerprint:
+            return None
+        remove_executable_path(dirname, work_dir)
+        return fingerprint
+
+    def _build_with_compile_times(self, args, backend, dirname):
+        """Build the project in the specified directory measuring the compile times of modules."""
+        timer = CompileTimer(time.time)
+        process = backend.popen(args, cwd = dirname)
+        for line in process.stdout:
+            if timer.feed(line):
+                sys.stdout.write(line)
+        status = process.wait()
+        self._compile_times = timer.get_times()
+        for module in sorted(self._compile_times):
+            sys.stdout.write('Compiled ' + module + ' in ' + ('%.2f' % self._compile_times[module]) + ' s\n')
         return status
 
-    def generate(self, specs, experiment = None, dirname = 'target'):
-        """Generate the project files."""
+    def generate(self, specs, experiment = None, dirname = 'target', split_modules = False, backend = None, compile_times = False):
+        """Generate the project files and return a list of the files that were rewritten.
+
+           The files whose contents have not changed are left untouched.
+           The model code is written in large chunks without keeping it
+           in memory as a whole.
+
+           If split_modules is true then the code of the main model and every
+           sub-model is written in a separate module under src/, so that GHC
+           could compile them in parallel. If compile_times is true too then
+           the next build measures the compile time of every module.
+
+           The backend that will build the project defines the toolchain
+           identity of the fingerprint. If it is None then the default
+           backend is used.
+        """
+        backend = get_backend_impl(backend)
         if not os.path.exists(dirname):
             os.makedirs(dirname)
         if not os.path.exists(dirname + '/app'):
@@ -186,39 +760,138 @@ class MainModel(Model):
             os.makedirs(dirname + '/src')
         if not (experiment is None):
             experiment.install(self)
-        self._generate_model(specs, experiment, dirname + '/app/Main.hs')
-        generate_cabal_file_impl(self, dirname + '/modeling-project.cabal')
-        generate_stack_file_impl(self, dirname + '/stack.yaml')
-        generate_license_file_impl(dirname + '/LICENSE.txt')
-        generate_readme_file_impl(dirname + '/README.md')
-        generate_setup_file_impl(dirname + '/Setup.hs')
-        generate_lib_file_impl(dirname + '/src/Lib.hs')
-
-    def _generate_model(self, specs, experiment = None, filename = 'dist/app/Model.hs'):
-        """Generate the model file."""
-        with open(filename, "w") as file:
-            self._write_model(file, specs, experiment = experiment)
-
-    def _write_model(self, file, specs, experiment = None):
-        """Write the model file."""
+        mirror = get_offline_mirror()
+        if not (mirror is None):
+            mirror.require_packages(self._extra_deps, self._package_imports)
+            mirror.install(self)
+        files = []
+        digests = []
+        self._split = split_modules
+        self._compile_times_enabled = split_modules and compile_times
+        template_modules = [t.get_module_name() for t in self._templates]
+        if split_modules:
+            self._prepare_code()
+            split = SplitModel(self._actions, self._action_parts, self._get_all_sources(), self._var_names, set(self._eliminated_var_names))
+            modules = split.get_modules() + template_modules
+            self._write_modules(dirname, split, files, digests)
+        elif len(self._templates) > 0:
+            split = None
+            modules = [TYPES_MODULE] + template_modules
+            self._write_types_module(dirname, files, digests)
+        else:
+            split = None
+            modules = None
+        self._write_templates(dirname, files, digests)
+        self._remove_stale_modules(dirname, modules)
+        write_model = lambda file: self._write_model(file, specs, experiment = experiment, split = split, modules = modules)
+        (model_changed, model_digest) = emit_file_impl(dirname + '/app/Main.hs', write_model)
+        cabal_code = render_cabal_file_impl(self, modules = modules, compile_times = self._compile_times_enabled)
+        stack_code = render_stack_file_impl(self, store = get_dependency_store(), mirror = mirror)
+        lib_code = render_lib_file_impl()
+        digests.extend([model_digest, digest_text(cabal_code), digest_text(stack_code), digest_text(lib_code)])
+        if mirror is None:
+            project_code = None
+        else:
+            project_code = render_cabal_project_file_impl(mirror)
+            digests.append(digest_text(project_code))
+        self._digests = digests
+        self._fingerprint = compute_fingerprint(digests, backend.get_identity())
+        if model_changed:
+            files.append(dirname + '/app/Main.hs')
+        if update_file_impl(dirname + '/modeling-project.cabal', cabal_code):
+            files.append(dirname + '/modeling-project.cabal')
+        if update_file_impl(dirname + '/stack.yaml', stack_code):
+            files.append(dirname + '/stack.yaml')
+        if project_code is None:
+            if os.path.exists(dirname + '/cabal.project'):
+                os.remove(dirname + '/cabal.project')
+                files.append(dirname + '/cabal.project')
+        elif update_file_impl(dirname + '/cabal.project', project_code):
+            files.append(dirname + '/cabal.project')
+        if generate_license_file_impl(dirname + '/LICENSE.txt'):
+            files.append(dirname + '/LICENSE.txt')
+        if generate_readme_file_impl(dirname + '/README.md'):
+            files.append(dirname + '/README.md')
+        if generate_setup_file_impl(dirname + '/Setup.hs'):
+            files.append(dirname + '/Setup.hs')
+        if update_file_impl(dirname + '/src/Lib.hs', lib_code):
+            files.append(dirname + '/src/Lib.hs')
+        return files
+
+    def _prepare_code(self):
+        """Require the model to be complete and find the variables to be eliminated from the code."""
         self.require_complete()
-        for pragma in self._pragmas:
+        self._eliminated_var_names = find_dead_vars_impl(self._actions, self._get_all_sources(), self._var_names, self._root_var_names)
+
+    def _write_modules(self, dirname, split, files, digests):
+        """Write the modules of the split model code, adding the rewritten files and content digests."""
+        pragmas = sorted(self._pragmas)
+        module_imports = sorted(self._module_imports) + ['import ' + t.get_module_name() for t in self._templates]
+        var_types = dict()
+        for port in self._ports:
+            var_types[port.get_mangled_name()] = encode_data_type(port.get_data_type())
+        self._write_types_module(dirname, files, digests)
+        for part in split.get_parts():
+            filename = dirname + '/src/' + part.get_module_name() + '.hs'
+            write_part = lambda file: part.write(file, self._base_comp, pragmas, module_imports, var_types)
+            (changed, digest) = emit_file_impl(filename, write_part)
+            digests.append(digest)
+            if changed:
+                files.append(filename)
+
+    def _write_types_module(self, dirname, files, digests):
+        """Write the module that defines the transact types, adding the rewritten file and content digest."""
+        module_imports = sorted(self._module_imports)
+        filename = dirname + '/src/' + TYPES_MODULE + '.hs'
+        write_types = lambda file: write_types_module_impl(file, module_imports, self._transact_types)
+        (changed, digest) = emit_file_impl(filename, write_types)
+        digests.append(digest)
+        if changed:
+            files.append(filename)
+
+    def _write_templates(self, dirname, files, digests):
+        """Write the modules of the sub-model templates, adding the rewritten files and content digests."""
+        for template in self._templates:
+            filename = dirname + '/src/' + template.get_module_name() + '.hs'
+            (changed, digest) = emit_file_impl(filename, template.write)
+            digests.append(digest)
+            if changed:
+                files.append(filename)
+
+    def _remove_stale_modules(self, dirname, modules):
+        """Remove the modules of the split model code left from the previous generation."""
+        if modules is None:
+            modules = []
+        for filename in sorted(os.listdir(dirname + '/src')):
+            (module, ext) = os.path.splitext(filename)
+            if (ext == '.hs') and (module == TYPES_MODULE or module.startswith(PART_MODULE_PREFIX) or module.startswith(TEMPLATE_MODULE_PREFIX)) and not (module in modules):
+                os.remove(dirname + '/src/' + filename)
+
+    def _write_model(self, file, specs, experiment = None, split = None, modules = None):
+        """Write the model file, where the model code can be split into modules and import the specified modules."""
+        if split is None:
+            self._prepare_code()
+        for pragma in sorted(self._pragmas):
             file.write(pragma)
             file.write('\n')
         if len(self._pragmas) > 0:
             file.write('\n')
         file.write('-- NOTE: This file was auto-generated by aivika-modeler 1.0\n')
         file.write('\n')
-        for module_import in self._module_imports:
+        for module_import in sorted(self._module_imports):
             file.write(module_import)
             file.write('\n')
-        if len(self._module_imports) > 0:
+        if not (modules is None):
+            for module in modules:
+                file.write('import ' + module + '\n')
+        if (len(self._module_imports) > 0) or not (modules is None):
             file.write('\n')
         file.write('specs =\n')
         specs.write(file, '  ')
         file.write('\n')
-        self._write_transact_types(file)
-        self._write_model_def(file)
+        if modules is None:
+            self._write_transact_types(file)
+        self._write_model_def(file, split = split)
         file.write('\n')
         if experiment is None:
             file.write('main =\n')
@@ -230,11 +903,16 @@ class MainModel(Model):
             experiment.write(file)
             file.write('\n')
 
-    def _write_model_def(self, file):
+    def _write_model_def(self, file, split = None):
         """Write the model definition in the file."""
         file.write('model =')
         file.write('\n')
-        self._write_model_code(file, '  ')
+        if split is None:
+            self._write_model_code(file, '  ')
+        else:
+            split.write_model_code(file, '  ')
+            self._write_sources(file, '        ')
+            file.write('\n')
 
     def _write_model_code(self, file, indent = ''):
         """Write the code in the file."""
@@ -242,10 +920,11 @@ class MainModel(Model):
         file.write('mdo --')
         file.write('\n')
         indent2 = indent + '    '
+        eliminated = set(self._eliminated_var_names)
         for action in self._actions:
-            file.write(indent2)
-            file.write(action)
-            file.write('\n')
+            if (len(eliminated) > 0) and (get_action_var_impl(action) in eliminated):
+                continue
+            file.write(indent2 + action + '\n')
         file.write(indent2)
         file.write('return $\n')
         file.write(indent2)
@@ -253,9 +932,16 @@ class MainModel(Model):
         self._write_sources(file, indent2 + '  ')
         file.write('\n')
 
+    def _get_all_sources(self):
+        """Return an iterator over the result sources and result source lists."""
+        return itertools.chain(self._sources, self._source_lists)
+
     def _write_sources(self, file, indent):
         """Write the result source list in file."""
         file.write(indent)
+        if len(self._source_lists) > 0:
+            file.write('(')
+            indent += ' '
         file.write('[')
         first = True
         for source in self._sources:
@@ -268,6 +954,12 @@ class MainModel(Model):
                 file.write(' ')
                 file.write(source)
         file.write(']')
+        for sources in self._source_lists:
+            file.write(' ++\n')
+            file.write(indent)
+            file.write(sources)
+        if len(self._source_lists) > 0:
+            file.write(')')
 
     def _write_transact_types(self, file):
         """Add the transact types."""
@@ -275,18 +967,38 @@ class MainModel(Model):
             tp.write(file)
             file.write('\n')
 
+def prewarm(store = None, backend = None):
+    """Build once the dependencies of the models and all experiment renderers in the shared store.
+
+       If it succeeds then the store is used by every project generated
+       afterwards, which is why their first build takes much less time.
+       Return the exit status.
+    """
+    if store is None:
+        store = DependencyStore()
+    model = MainModel()
+    for renderer in [ExperimentRendererUsingDiagrams([])]:
+        renderer.install(model)
+    status = store.prewarm(model._extra_deps, model._package_imports, backend = backend)
+    if status == 0:
+        set_dependency_store(store)
+    return status
+
+def _require_profile(profile):
+    """Raise an exception if the build profile is unknown."""
+    if not (profile in BUILD_PROFILES):
+        raise InvalidProfileException('Unknown build profile ' + str(profile) + ', expected one of: ' + ', '.join(BUILD_PROFILES))
+
 class SubModel(Model):
     """The sub-model."""
 
-    _next_id = 1
-
     def __init__(self, model, name = None):
         """Initializes a new sub-model."""
         self._main_model = model.get_main_model()
         self._model = model
         self._name = name
-        self._var_prefix = '_sub_' + str(SubModel._next_id)
-        SubModel._next_id += 1
+        self._part = model.new_submodel_id()
+        self._var_prefix = '_sub_' + str(self._part)
         if (name is None) or model.is_source_prefix_mangled():
             self._source_prefix_mangled = True
             self._source_prefix = self._var_prefix
@@ -318,6 +1030,18 @@ class SubModel(Model):
         """Return the source name prefix."""
         return self._source_prefix
 
+    def new_port_id(self):
+        """Allocate a new port identifier unique within the model."""
+        return self._model.new_port_id()
+
+    def new_submodel_id(self):
+        """Allocate a new sub-model identifier unique within the model."""
+        return self._model.new_submodel_id()
+
+    def new_expr_id(self, key = None):
+        """Return the expression identifier by the specified structural key."""
+        return self._main_model.new_expr_id(key)
+
     def add_pragma(self, pragma):
         """Add the specified pragma."""
         self._main_model.add_pragma(pragma)
@@ -338,25 +1062,61 @@ class SubModel(Model):
         """Add the specified module to import."""
         self._main_model.add_module_import(module)
 
-    def add_var(self, name, comp):
-        """Add a new variable with the specified definition."""
-        self._main_model.add_var(name, comp)
+    def add_var(self, name, comp, part = None):
+        """Add a new variable with the specified definition and optional part of the model code."""
+        if part is None:
+            part = self._part
+        self._model.add_var(name, comp, part = part)
+
+    def hoist_expr(self, expr_id, comp):
+        """Bind the Event computation of the expression, evaluated once in the start time, and return the variable name."""
+        return self._model.hoist_expr(expr_id, comp)
+
+    def add_root_var(self, name):
+        """Mark the variable as a root, which is never eliminated even if it is not used."""
+        self._model.add_root_var(name)
 
     def add_lazy_var(self, name):
         """Add a new variable that will be defined lazily."""
-        self._main_model.add_lazy_var(name)
+        self._model.add_lazy_var(name)
+
+    def remove_lazy_var(self, name):
+        """Remove the lazy variable that will never be defined, for its definition was fused with another one."""
+        self._model.remove_lazy_var(name)
 
-    def add_action(self, action):
-        """Add the specified action."""
-        self._main_model.add_action(action)
+    def add_action(self, action, part = None):
+        """Add the specified action and optional part of the model code."""
+        if part is None:
+            part = self._part
+        self._model.add_action(action, part = part)
+
+    def add_template_import(self, template):
+        """Import the module of the specified template, whose instance is created within the sub-model."""
+        self._model.add_template_import(template)
 
     def add_port(self, port):
         """Add the specified port for completeness test."""
         self._main_model.add_port(port)
 
+    def add_pending_port(self, port):
+        """Add the specified port whose definition is deferred until it is read."""
+        self._model.add_pending_port(port)
+
     def add_result_source(self, source):
         """Add the specified result source."""
-        self._main_model.add_result_source(source)
+        self._model.add_result_source(source)
+
+    def add_result_sources(self, sources):
+        """Add the code of the result source list computed by the model."""
+        self._model.add_result_sources(sources)
+
+    def encode_source_name(self, name):
+        """Return the code of the specified result source name."""
+        return self._model.encode_source_name(name)
+
+    def add_param(self, param):
+        """Add the specified model parameter."""
+        self._main_model.add_param(param)
 
     def add_transact_type(self, transact_type):
         """Add the specified transact type."""
@@ -0,0 +1,559 @@
+# Copyright (c) 2017 David Sorokin <david.sorokin@gmail.com>
+#
+# Licensed under BSD3. See the LICENSE.txt file in the root of this distribution.
+
+import io
+import os
+import abc
+import re
+import sys
+import asyncio
+import threading
+import subprocess
+
+from simulation.aivika.modeler.model_project import DEFAULT_BUILD_PROFILE
+from simulation.aivika.modeler.model_project import build_profile_options
+
+class InvalidBackendException(Exception):
+    """Raised when the build backend is invalid."""
+
+    def __init__(self, message):
+        """Initializes a new instance."""
+        self.message = message
+
+class CapturedOutput:
+    """The output of the commands captured line by line with the exit status."""
+
+    def __init__(self, write = None):
+        """Initializes a new instance by the optional function that receives the stream name and line as they arrive."""
+        self._write = write
+        self._lines = []
+        self._status = None
+
+    def write(self, stream, line):
+        """Capture the line of the specified stream, which is either 'stdout' or 'stderr'."""
+        self._lines.append((stream, line))
+        if not (self._write is None):
+            self._write(stream, line)
+
+    def get_status(self):
+        """Return the exit status or None if it is unknown yet."""
+        return self._status
+
+    def set_status(self, status):
+        """Set the exit status."""
+        self._status = status
+
+    def get_lines(self):
+        """Return the list of pairs of the stream name and line in the order they arrived."""
+        return list(self._lines)
+
+    def get_stdout(self):
+        """Return the captured standard output."""
+        return ''.join(line for (stream, line) in self._lines if stream == 'stdout')
+
+    def get_stderr(self):
+        """Return the captured standard error."""
+        return ''.join(line for (stream, line) in self._lines if stream == 'stderr')
+
+class BuildBackend(abc.ABC):
+    """The toolchain that builds, type checks, interprets and runs the generated project.
+
+       The commands are run in the project directory. The subclasses
+       must define every abstract method.
+    """
+
+    def __init__(self):
+        """Initializes a new instance."""
+        self._identity = None
+
+    @abc.abstractmethod
+    def get_name(self):
+        """Return the backend name."""
+        pass
+
+    def get_identity(self):
+        """Return a string that identifies the toolchain, which is a part of the build fingerprint."""
+        if self._identity is None:
+            try:
+                output = subprocess.check_output(self.get_identity_command(), stderr = subprocess.STDOUT)
+                self._identity = self.get_name() + ' ' + output.decode('utf-8', 'replace').strip()
+            except (OSError, subprocess.CalledProcessError):
+                self._identity = self.get_name()
+        return self._identity
+
+    @abc.abstractmethod
+    def get_identity_command(self):
+        """Return the command that prints the toolchain version."""
+        pass
+
+    @abc.abstractmethod
+    def get_work_dir(self, profile):
+        """Return the directory with the build output of the specified profile."""
+        pass
+
+    @abc.abstractmethod
+    def get_build_command(self, profile, split_modules = False, compile_times = False):
+        """Return the command that builds the project with the specified profile."""
+        pass
+
+    @abc.abstractmethod
+    def get_exec_command(self, profile, args = None):
+        """Return the command that runs the project built with the specified profile passing the arguments."""
+        pass
+
+    @abc.abstractmethod
+    def get_dependencies_command(self):
+        """Return the command that builds only the dependencies of the project or None if they are ready."""
+        pass
+
+    @abc.abstractmethod
+    def find_executable(self, profile, cwd = None):
+        """Return the absolute path to the executable built with the specified profile or None if it is not found."""
+        pass
+
+    @abc.abstractmethod
+    def get_check_command(self):
+        """Return the command that only type checks the model code."""
+        pass
+
+    @abc.abstractmethod
+    def get_interpreter_command(self):
+        """Return the command that starts GHCi able to load the model code."""
+        pass
+
+    def call(self, args, cwd = None):
+        """Run the command and return its exit status."""
+        try:
+            return subprocess.call(args, cwd = cwd)
+        except OSError as e:
+            sys.stderr.write(args[0] + ': ' + str(e.strerror) + '\n')
+            return 127
+
+    async def call_async(self, args, cwd = None, write = None):
+        """Run the command asynchronously passing every output line to write with the stream name and return the exit status.
+
+           If the task is cancelled then the command is killed.
+        """
+        try:
+            process = await asyncio.create_subprocess_exec(*args, cwd = cwd, stdout = subprocess.PIPE, stderr = subprocess.PIPE)
+        except OSError as e:
+            if not (write is None):
+                write('stderr', args[0] + ': ' + str(e.strerror) + '\n')
+            return 127
+        async def pump(stream, name):
+            while True:
+                line = await stream.readline()
+                if len(line) == 0:
+                    return
+                if not (write is None):
+                    write(name, line.decode('utf-8', 'replace'))
+        try:
+            await asyncio.gather(pump(process.stdout, 'stdout'), pump(process.stderr, 'stderr'))
+            return await process.wait()
+        except BaseException:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            raise
+
+    def popen(self, args, cwd = None, interactive = False):
+        """Start the command whose merged output can be read as text."""
+        if interactive:
+            stdin = subprocess.PIPE
+        else:
+            stdin = None
+        return subprocess.Popen(args, cwd = cwd, stdin = stdin, stdout = subprocess.PIPE, stderr = subprocess.STDOUT,
+                                universal_newlines = True, bufsize = 1)
+
+class StackBackend(BuildBackend):
+    """The backend that uses Stack, where every build profile has its own work directory."""
+
+    def get_name(self):
+        """Return the backend name."""
+        return 'stack'
+
+    def get_identity_command(self):
+        """Return the command that prints the toolchain version."""
+        return ['stack', '--version']
+
+    def get_work_dir(self, profile):
+        """Return the directory with the build output of the specified profile."""
+        if profile == DEFAULT_BUILD_PROFILE:
+            return '.stack-work'
+        else:
+            return '.stack-work-' + profile
+
+    def get_build_command(self, profile, split_modules = False, compile_times = False):
+        """Return the command that builds the project with the specified profile."""
+        args = self._get_stack_command(profile) + ['build']
+        if profile != DEFAULT_BUILD_PROFILE:
+            args.extend(['--flag', 'modeling-project:' + profile])
+        return args
+
+    def get_exec_command(self, profile, args = None):
+        """Return the command that runs the project built with the specified profile passing the arguments."""
+        if not args:
+            return self._get_stack_command(profile) + ['exec', 'modeling-project-exe']
+        else:
+            return self._get_stack_command(profile) + ['exec', 'modeling-project-exe', '--'] + list(args)
+
+    def get_dependencies_command(self):
+        """Return the command that builds only the dependencies of the project."""
+        return ['stack', 'build', '--only-dependencies']
+
+    def find_executable(self, profile, cwd = None):
+        """Return the absolute path to the executable under the local install root of the specified profile."""
+        root = _read_output(self, self._get_stack_command(profile) + ['path', '--local-install-root'], cwd)
+        if root is None:
+            return None
+        return _get_existing_file(os.path.join(root, 'bin', _get_executable_name()))
+
+    def get_check_command(self):
+        """Return the command that only type checks the model code."""
+        return ['stack', 'ghc', '--', '-fno-code', '-isrc', 'app/Main.hs']
+
+    def get_interpreter_command(self):
+        """Return the command that starts GHCi able to load the model code."""
+        return ['stack', 'exec', '--', 'ghci', '-v0', '-ignore-dot-ghci', '-isrc']
+
+    def _get_stack_command(self, profile):
+        """Return the Stack command with the work directory of the specified profile."""
+        if profile == DEFAULT_BUILD_PROFILE:
+            return ['stack']
+        else:
+            return ['stack', '--work-dir', self.get_work_dir(profile)]
+
+class CabalBackend(BuildBackend):
+    """The backend that uses cabal-install, where every build profile has its own build directory.
+
+       The packages are resolved by cabal-install itself, while the extra
+       dependencies and package locations from the stack file are ignored.
+    """
+
+    def get_name(self):
+        """Return the backend name."""
+        return 'cabal'
+
+    def get_identity_command(self):
+        """Return the command that prints the toolchain version."""
+        return ['cabal', '--version']
+
+    def get_work_dir(self, profile):
+        """Return the directory with the build output of the specified profile."""
+        if profile == DEFAULT_BUILD_PROFILE:
+            return 'dist-newstyle'
+        else:
+            return 'dist-newstyle-' + profile
+
+    def get_build_command(self, profile, split_modules = False, compile_times = False):
+        """Return the command that builds the project with the specified profile."""
+        return ['cabal', 'new-build'] + self._get_profile_args(profile)
+
+    def get_exec_command(self, profile, args = None):
+        """Return the command that runs the project built with the specified profile passing the arguments."""
+        if not args:
+            return ['cabal', 'new-run'] + self._get_profile_args(profile) + ['-v0', 'modeling-project-exe']
+        else:
+            return ['cabal', 'new-run'] + self._get_profile_args(profile) + ['-v0', 'modeling-project-exe', '--'] + list(args)
+
+    def get_dependencies_command(self):
+        """Return the command that builds only the dependencies of the project."""
+        return ['cabal', 'new-build', '--only-dependencies']
+
+    def find_executable(self, profile, cwd = None):
+        """Return the absolute path to the executable reported by cabal-install for the specified profile."""
+        path = _read_output(self, ['cabal', 'list-bin'] + self._get_profile_args(profile) + ['modeling-project-exe'], cwd)
+        if path is None:
+            return None
+        return _get_existing_file(path)
+
+    def get_check_command(self):
+        """Return the command that only type checks the model code."""
+        return ['cabal', 'new-exec', '--', 'ghc', '-fno-code', '-isrc', 'app/Main.hs']
+
+    def get_interpreter_command(self):
+        """Return the command that starts GHCi able to load the model code."""
+        return ['cabal', 'new-exec', '--', 'ghci', '-v0', '-ignore-dot-ghci', '-isrc']
+
+    def _get_profile_args(self, profile):
+        """Return the arguments that select the build directory and flags of the specified profile."""
+        if profile == DEFAULT_BUILD_PROFILE:
+            return []
+        else:
+            return ['--builddir', self.get_work_dir(profile), '--flags', profile]
+
+class GhcBackend(BuildBackend):
+    """The backend that calls ghc --make directly against the pre-populated package databases.
+
+       It avoids the startup cost of the build tools, but all packages
+       that the model imports must be already installed in the databases.
+    """
+
+    def __init__(self, package_dbs = None, ghc = 'ghc'):
+        """Initializes a new instance by the package databases and the compiler executable."""
+        BuildBackend.__init__(self)
+        self._package_dbs = list(package_dbs or [])
+        self._ghc = ghc
+
+    def get_name(self):
+        """Return the backend name."""
+        return 'ghc'
+
+    def get_identity_command(self):
+        """Return the command that prints the toolchain version."""
+        return [self._ghc, '--version']
+
+    def get_work_dir(self, profile):
+        """Return the directory with the build output of the specified profile."""
+        return '.ghc-work-' + profile
+
+    def get_build_command(self, profile, split_modules = False, compile_times = False):
+        """Return the command that builds the project with the specified profile."""
+        work_dir = self.get_work_dir(profile)
+        args = [self._ghc, '--make', '-threaded', '-rtsopts', '-with-rtsopts=-N']
+        args.extend(build_profile_options[profile].split())
+        if split_modules:
+            args.append('-j')
+            if compile_times:
+                args.append('-dshow-passes')
+        args.extend(['-isrc', '-outputdir', work_dir, '-o', os.path.join(work_dir, 'modeling-project-exe')])
+        args.extend(self._get_package_db_args())
+        args.append('app/Main.hs')
+        return args
+
+    def get_exec_command(self, profile, args = None):
+        """Return the command that runs the project built with the specified profile passing the arguments."""
+        return [os.path.join('.', self.get_work_dir(profile), _get_executable_name())] + list(args or [])
+
+    def get_dependencies_command(self):
+        """Return None, for the dependencies must be already installed."""
+        return None
+
+    def find_executable(self, profile, cwd = None):
+        """Return the absolute path to the executable in the work directory of the specified profile."""
+        path = os.path.join(self.get_work_dir(profile), _get_executable_name())
+        if not (cwd is None):
+            path = os.path.join(cwd, path)
+        return _get_existing_file(path)
+
+    def get_check_command(self):
+        """Return the command that only type checks the model code."""
+        return [self._ghc, '-fno-code', '-isrc'] + self._get_package_db_args() + ['app/Main.hs']
+
+    def get_interpreter_command(self):
+        """Return the command that starts GHCi able to load the model code."""
+        return [self._ghc, '--interactive', '-v0', '-ignore-dot-ghci', '-isrc'] + self._get_package_db_args()
+
+    def _get_package_db_args(self):
+        """Return the arguments that add the package databases."""
+        args = []
+        for package_db in self._package_dbs:
+            args.extend(['-package-db', package_db])
+        return args
+
+class FakeBackend(StackBackend):
+    """The backend that only records the commands instead of running them, which is useful for tests.
+
+       Every command returns the specified status and output, which is
+       captured instead of being printed. The fake interpreter prints
+       the first string passed to putStrLn in every command, as if
+       the evaluation succeeded.
+    """
+
+    def __init__(self, status = 0, output = '', delay = 0):
+        """Initializes a new instance by the status and output of every command and the delay of the asynchronous commands in seconds."""
+        StackBackend.__init__(self)
+        self._status = status
+        self._output = output
+        self._delay = delay
+        self._commands = []
+        self._captured = []
+        self._input = []
+
+    def get_name(self):
+        """Return the backend name."""
+        return 'fake'
+
+    def get_identity(self):
+        """Return the fake toolchain identity."""
+        return 'fake'
+
+    def get_commands(self):
+        """Return the list of pairs of the directory and command that were run."""
+        return self._commands
+
+    def get_interpreter_input(self):
+        """Return the list of commands sent to the fake interpreter."""
+        return self._input
+
+    def get_output(self):
+        """Return the output of the commands run by call, which is captured instead of being printed."""
+        return ''.join(self._captured)
+
+    def call(self, args, cwd = None):
+        """Record the command, capture the fake output and return the fake status."""
+        self._commands.append((_get_cwd(cwd), args))
+        if len(self._output) > 0:
+            self._captured.append(self._output)
+        return self._status
+
+    async def call_async(self, args, cwd = None, write = None):
+        """Record the command and return the fake status after the delay."""
+        self._commands.append((_get_cwd(cwd), args))
+        await asyncio.sleep(self._delay)
+        if (len(self._output) > 0) and not (write is None):
+            for line in io.StringIO(self._output):
+                write('stdout', line)
+        return self._status
+
+    def popen(self, args, cwd = None, interactive = False):
+        """Record the command and return the fake process."""
+        self._commands.append((_get_cwd(cwd), args))
+        return _FakeProcess(self._status, self._output, interactive, self._input)
+
+def _read_output(backend, args, cwd):
+    """Run the command and return the last line of its output or None if it fails."""
+    process = backend.popen(args, cwd = cwd)
+    output = process.communicate()[0]
+    status = process.wait()
+    lines = [line.strip() for line in output.splitlines() if len(line.strip()) > 0]
+    if (status != 0) or (len(lines) == 0):
+        return None
+    return lines[-1]
+
+def _get_executable_name():
+    """Return the file name of the executable on the current platform."""
+    if sys.platform == 'win32':
+        return 'modeling-project-exe.exe'
+    else:
+        return 'modeling-project-exe'
+
+def _get_existing_file(path):
+    """Return the absolute path if the file exists or None otherwise."""
+    if os.path.isfile(path):
+        return os.path.abspath(path)
+    else:
+        return None
+
+def _get_cwd(cwd):
+    """Return the absolute directory where the command is run."""
+    if cwd is None:
+        return os.getcwd()
+    else:
+        return os.path.abspath(cwd)
+
+_put_str_pattern = re.compile(r'putStrLn "([^"]*)"')
+
+class _FakeProcess:
+    """The fake process returned by the fake backend."""
+
+    def __init__(self, status, output, interactive, input = None):
+        """Initializes a new instance, where the commands sent to the interactive process are added to the input list."""
+        self._status = status
+        self._lines = io.StringIO(output).readlines()
+        self._running = interactive
+        self._input = input
+        if interactive:
+            self.stdin = _FakeInput(self)
+        else:
+            self.stdin = None
+        self.stdout = self
+
+    def __iter__(self):
+        """Iterate the output lines."""
+        while len(self._lines) > 0:
+            yield self._lines.pop(0)
+
+    def readline(self):
+        """Read the next output line or return an empty string if there is no more output."""
+        if len(self._lines) > 0:
+            return self._lines.pop(0)
+        else:
+            return ''
+
+    def communicate(self):
+        """Read all output."""
+        output = ''.join(self._lines)
+        self._lines = []
+        return (output, None)
+
+    def poll(self):
+        """Return None while the interactive process is running or the exit status otherwise."""
+        if self._running:
+            return None
+        else:
+            return self._status
+
+    def wait(self):
+        """Return the exit status."""
+        self._running = False
+        return self._status
+
+class _FakeInput:
+    """The input of the fake interactive process."""
+
+    def __init__(self, process):
+        """Initializes a new instance."""
+        self._process = process
+
+    def write(self, text):
+        """Process the commands."""
+        for command in text.splitlines():
+            if not (self._process._input is None):
+                self._process._input.append(command)
+            if command.startswith(':quit'):
+                self._process._running = False
+            m = _put_str_pattern.search(command)
+            if not (m is None):
+                self._process._lines.append(m.group(1) + '\n')
+
+    def flush(self):
+        """Do nothing."""
+        pass
+
+    def close(self):
+        """Stop the process."""
+        self._process._running = False
+
+_backends = dict()
+
+_backends_lock = threading.Lock()
+
+_default_backend = None
+
+def get_backend_impl(backend = None):
+    """Return the backend by the specified instance or name or the default backend if it is None."""
+    if backend is None:
+        return get_default_backend()
+    elif isinstance(backend, BuildBackend):
+        return backend
+    with _backends_lock:
+        if backend in _backends:
+            return _backends[backend]
+        elif backend == 'stack':
+            _backends[backend] = StackBackend()
+        elif backend == 'cabal':
+            _backends[backend] = CabalBackend()
+        elif backend == 'ghc':
+            _backends[backend] = GhcBackend()
+        elif backend == 'fake':
+            _backends[backend] = FakeBackend()
+        else:
+            raise InvalidBackendException('Unknown build backend ' + str(backend) + ', expected one of: stack, cabal, ghc, fake')
+        return _backends[backend]
+
+def get_default_backend():
+    """Return the backend used when no backend is specified, which is Stack unless set otherwise."""
+    global _default_backend
+    if _default_backend is None:
+        _default_backend = get_backend_impl('stack')
+    return _default_backend
+
+def set_default_backend(backend):
+    """Set the backend by its instance or name used when no backend is specified, where None restores Stack."""
+    global _default_backend
+    if backend is None:
+        _default_backend = None
+    else:
+        _default_backend = get_backend_impl(backend)
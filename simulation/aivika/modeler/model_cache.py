@@ -0,0 +1,69 @@
+# Copyright (c) 2017 David Sorokin <david.sorokin@gmail.com>
+#
+# Licensed under BSD3. See the LICENSE.txt file in the root of this distribution.
+
+import os
+import hashlib
+
+FINGERPRINT_FILE = 'aivika-modeler.fingerprint'
+
+EXECUTABLE_FILE = 'aivika-modeler.executable'
+
+DEFAULT_WORK_DIR = '.stack-work'
+
+def compute_fingerprint(digests, toolchain = ''):
+    """Compute the fingerprint of the specified file content digests and toolchain identity."""
+    h = hashlib.sha256()
+    h.update(toolchain.encode('utf-8'))
+    for digest in digests:
+        h.update(b'\0')
+        h.update(digest.encode('utf-8'))
+    return h.hexdigest()
+
+def read_fingerprint(dirname, work_dir = DEFAULT_WORK_DIR):
+    """Read the fingerprint stored in the work directory after the last successful build or return None."""
+    filename = os.path.join(dirname, work_dir, FINGERPRINT_FILE)
+    if not os.path.exists(filename):
+        return None
+    with open(filename, 'r') as file:
+        return file.read().strip()
+
+def write_fingerprint(dirname, fingerprint, work_dir = DEFAULT_WORK_DIR):
+    """Store the fingerprint next to the build output in the work directory."""
+    filename = os.path.join(dirname, work_dir, FINGERPRINT_FILE)
+    parent = os.path.dirname(filename)
+    if not os.path.exists(parent):
+        os.makedirs(parent)
+    with open(filename, 'w') as file:
+        file.write(fingerprint)
+        file.write('\n')
+
+def remove_fingerprint(dirname, work_dir = DEFAULT_WORK_DIR):
+    """Remove the fingerprint stored in the work directory, which forces the next build."""
+    filename = os.path.join(dirname, work_dir, FINGERPRINT_FILE)
+    if os.path.exists(filename):
+        os.remove(filename)
+
+def read_executable_path(dirname, work_dir = DEFAULT_WORK_DIR):
+    """Read the executable path resolved after the last successful build or return None."""
+    filename = os.path.join(dirname, work_dir, EXECUTABLE_FILE)
+    if not os.path.exists(filename):
+        return None
+    with open(filename, 'r') as file:
+        return file.read().strip()
+
+def write_executable_path(dirname, path, work_dir = DEFAULT_WORK_DIR):
+    """Store the resolved executable path in the work directory."""
+    filename = os.path.join(dirname, work_dir, EXECUTABLE_FILE)
+    parent = os.path.dirname(filename)
+    if not os.path.exists(parent):
+        os.makedirs(parent)
+    with open(filename, 'w') as file:
+        file.write(path)
+        file.write('\n')
+
+def remove_executable_path(dirname, work_dir = DEFAULT_WORK_DIR):
+    """Remove the stored executable path, which forces resolving it again."""
+    filename = os.path.join(dirname, work_dir, EXECUTABLE_FILE)
+    if os.path.exists(filename):
+        os.remove(filename)
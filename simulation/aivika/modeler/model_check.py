@@ -0,0 +1,123 @@
+# Copyright (c) 2017 David Sorokin <david.sorokin@gmail.com>
+#
+# Licensed under BSD3. See the LICENSE.txt file in the root of this distribution.
+
+import os
+import re
+
+from simulation.aivika.modeler.model_reachability import get_action_var_impl
+from simulation.aivika.modeler.model_reachability import get_referenced_vars_impl
+
+_location_pattern = re.compile(r"^(\S[^:]*):(?:(\d+):(\d+)(?:-\d+)?|\((\d+),(\d+)\)-\(\d+,\d+\)):\s*(?:(error|warning)[^:]*:)?\s*(.*)$")
+
+class Diagnostic:
+    """The diagnostic message reported by the Haskell compiler for the generated code."""
+
+    def __init__(self, filename, line, column, severity, message):
+        """Initializes a new instance."""
+        self._filename = filename
+        self._line = line
+        self._column = column
+        self._severity = severity
+        self._message = message
+        self._var_names = []
+        self._port_names = []
+
+    def get_filename(self):
+        """Return the name of the generated file."""
+        return self._filename
+
+    def get_line(self):
+        """Return the line number."""
+        return self._line
+
+    def get_column(self):
+        """Return the column number."""
+        return self._column
+
+    def get_severity(self):
+        """Return either 'error' or 'warning'."""
+        return self._severity
+
+    def is_error(self):
+        """Test whether the diagnostic is an error."""
+        return self._severity == 'error'
+
+    def get_message(self):
+        """Return the compiler message."""
+        return self._message
+
+    def get_var_names(self):
+        """Return the model variables used in the line, where the bound variable goes first."""
+        return self._var_names
+
+    def get_port_names(self):
+        """Return the names of the ports used in the line, where the bound port goes first."""
+        return self._port_names
+
+    def __str__(self):
+        """Return the diagnostic as text."""
+        text = self._filename + ':' + str(self._line) + ':' + str(self._column) + ': ' + self._severity
+        if len(self._port_names) > 0:
+            text += ' in port ' + ', '.join(self._port_names)
+        return text + ':\n' + self._message
+
+def parse_diagnostics_impl(output):
+    """Parse the compiler output and return a list of diagnostics."""
+    diagnostics = []
+    diagnostic = None
+    lines = []
+    for line in output.splitlines():
+        m = _location_pattern.match(line)
+        if not (m is None):
+            _add_diagnostic(diagnostics, diagnostic, lines)
+            if m.group(2) is None:
+                (line_no, column) = (m.group(4), m.group(5))
+            else:
+                (line_no, column) = (m.group(2), m.group(3))
+            severity = m.group(6)
+            if severity is None:
+                severity = 'error'
+            diagnostic = Diagnostic(m.group(1), int(line_no), int(column), severity, None)
+            lines = [m.group(7).strip()]
+        elif (not (diagnostic is None)) and line.startswith(' '):
+            lines.append(line.strip())
+        else:
+            _add_diagnostic(diagnostics, diagnostic, lines)
+            diagnostic = None
+            lines = []
+    _add_diagnostic(diagnostics, diagnostic, lines)
+    return diagnostics
+
+def _add_diagnostic(diagnostics, diagnostic, lines):
+    """Complete the diagnostic by the message lines and add it to the list."""
+    if not (diagnostic is None):
+        diagnostic._message = '\n'.join(line for line in lines if len(line) > 0)
+        diagnostics.append(diagnostic)
+
+def locate_diagnostics_impl(diagnostics, dirname, var_names, port_names):
+    """Find the model variables and ports in the lines of the generated code that the diagnostics refer to."""
+    files = dict()
+    for diagnostic in diagnostics:
+        filename = diagnostic.get_filename()
+        if not (filename in files):
+            files[filename] = _read_lines(os.path.join(dirname, filename))
+        lines = files[filename]
+        if (diagnostic.get_line() < 1) or (diagnostic.get_line() > len(lines)):
+            continue
+        line = lines[diagnostic.get_line() - 1].strip()
+        names = []
+        name = get_action_var_impl(line)
+        if not (name is None):
+            names.append(name)
+            line = line[len(name):]
+        names.extend(sorted(get_referenced_vars_impl(line, var_names)))
+        diagnostic._var_names = names
+        diagnostic._port_names = [port_names[name] for name in names if name in port_names]
+
+def _read_lines(filename):
+    """Return the lines of the specified file or an empty list if there is no such file."""
+    if not os.path.exists(filename):
+        return []
+    with open(filename, 'r', encoding = 'utf-8') as file:
+        return file.read().splitlines()
@@ -0,0 +1,163 @@
+# Copyright (c) 2017 David Sorokin <david.sorokin@gmail.com>
+#
+# Licensed under BSD3. See the LICENSE.txt file in the root of this distribution.
+
+import os
+import hashlib
+import tempfile
+
+CHUNK_SIZE = 1 << 16
+
+SPOOL_SIZE = 1 << 20
+
+MASK = b'\0masked\0'
+
+class ChunkedWriter:
+    """The text writer that collects small writes and passes them to the file in large chunks.
+
+       It also computes the SHA-256 digest of everything written.
+    """
+
+    def __init__(self, file, chunk_size = CHUNK_SIZE):
+        """Initializes a new instance."""
+        self._file = file
+        self._chunk_size = chunk_size
+        self._chunk = []
+        self._chunk_length = 0
+        self._hash = hashlib.sha256()
+
+    def write(self, text):
+        """Write the specified text."""
+        self._chunk.append(text)
+        self._chunk_length += len(text)
+        if self._chunk_length >= self._chunk_size:
+            self.flush()
+
+    def write_masked(self, text):
+        """Write the specified text, which the digest replaces with a mask.
+
+           It allows the values that the compiled model can override at
+           launch time to change without changing the digest.
+        """
+        self.flush()
+        self._file.write(text)
+        self._hash.update(MASK)
+
+    def flush(self):
+        """Pass the collected text to the file."""
+        if len(self._chunk) > 0:
+            text = ''.join(self._chunk)
+            self._chunk = []
+            self._chunk_length = 0
+            self._hash.update(text.encode('utf-8'))
+            self._file.write(text)
+
+    def hexdigest(self):
+        """Return the digest of the text written so far."""
+        self.flush()
+        return self._hash.hexdigest()
+
+class StringSpool:
+    """The append-only sequence of strings that spills to a temporary file when it grows large.
+
+       Only the most recent strings are kept in memory, which bounds
+       the memory used by very large models.
+    """
+
+    def __init__(self, spool_size = SPOOL_SIZE):
+        """Initializes a new instance."""
+        self._spool_size = spool_size
+        self._items = []
+        self._items_length = 0
+        self._count = 0
+        self._spilled_count = 0
+        self._file = None
+
+    def __len__(self):
+        """Return the number of strings."""
+        return self._count
+
+    def __iter__(self):
+        """Iterate the strings in the order they were added.
+
+           The strings can be appended during the iteration, which then
+           yields them too, even if they spill to the temporary file.
+        """
+        index = 0
+        pos = 0
+        file_index = 0
+        while index < self._count:
+            if index < self._spilled_count:
+                self._file.seek(pos)
+                while True:
+                    item = self._file.read(int(self._file.readline()))
+                    file_index += 1
+                    if file_index > index:
+                        break
+                pos = self._file.tell()
+                self._file.seek(0, os.SEEK_END)
+            else:
+                item = self._items[index - self._spilled_count]
+            index += 1
+            yield item
+
+    def append(self, item):
+        """Add the specified string."""
+        self._items.append(item)
+        self._items_length += len(item)
+        self._count += 1
+        if self._items_length >= self._spool_size:
+            self._spill()
+
+    def _spill(self):
+        """Move the strings kept in memory to the temporary file."""
+        if self._file is None:
+            self._file = tempfile.TemporaryFile('w+', encoding = 'utf-8', newline = '')
+        self._file.seek(0, os.SEEK_END)
+        chunk = []
+        for item in self._items:
+            chunk.append(str(len(item)))
+            chunk.append('\n')
+            chunk.append(item)
+        self._file.write(''.join(chunk))
+        self._spilled_count += len(self._items)
+        self._items = []
+        self._items_length = 0
+
+def digest_text(text):
+    """Return the SHA-256 digest of the specified text."""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def emit_file_impl(filename, write_func):
+    """Write the file contents by the specified function in large chunks.
+
+       The file is replaced only if its contents change. Return a pair of
+       the flag indicating whether the file was rewritten and the digest
+       of the contents.
+    """
+    tmp_filename = filename + '.tmp'
+    try:
+        with open(tmp_filename, 'w', encoding = 'utf-8', newline = '') as file:
+            writer = ChunkedWriter(file)
+            write_func(writer)
+            digest = writer.hexdigest()
+        if os.path.exists(filename) and same_files_impl(filename, tmp_filename):
+            return (False, digest)
+        os.replace(tmp_filename, filename)
+        return (True, digest)
+    finally:
+        if os.path.exists(tmp_filename):
+            os.remove(tmp_filename)
+
+def same_files_impl(filename1, filename2):
+    """Test whether two files have the same contents, comparing them chunk by chunk."""
+    if os.path.getsize(filename1) != os.path.getsize(filename2):
+        return False
+    with open(filename1, 'rb') as file1, open(filename2, 'rb') as file2:
+        while True:
+            chunk1 = file1.read(CHUNK_SIZE)
+            chunk2 = file2.read(CHUNK_SIZE)
+            if chunk1 != chunk2:
+                return False
+            if len(chunk1) == 0:
+                return True
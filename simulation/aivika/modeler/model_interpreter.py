@@ -0,0 +1,138 @@
+# Copyright (c) 2017 David Sorokin <david.sorokin@gmail.com>
+#
+# Licensed under BSD3. See the LICENSE.txt file in the root of this distribution.
+
+import os
+import sys
+import atexit
+
+from simulation.aivika.modeler.util import *
+
+_sentinel = '<<aivika-modeler-done>>'
+
+_sessions = dict()
+
+class InterpreterSession:
+    """The GHCi session that interprets the generated project and is kept alive between runs."""
+
+    def __init__(self, dirname, backend):
+        """Initializes a new session in the specified project directory using the build backend."""
+        self._dirname = dirname
+        self._backend = backend
+        self._loaded = False
+        self._process = None
+
+    def start(self):
+        """Build the dependencies of the project and start the interpreter, returning the exit status.
+
+           The top-level values are reverted after every evaluation by +r,
+           for the model parameters are read once by the modelParams value
+           from the arguments, which differ from run to run.
+        """
+        args = self._backend.get_dependencies_command()
+        if not (args is None):
+            status = self._backend.call(args, cwd = self._dirname)
+            if status != 0:
+                return status
+        self._loaded = False
+        self._process = self._backend.popen(self._backend.get_interpreter_command(), cwd = self._dirname, interactive = True)
+        self._send(':set prompt ""')
+        self._send(':set +r')
+        return 0
+
+    def get_backend(self):
+        """Return the build backend."""
+        return self._backend
+
+    def is_loaded(self):
+        """Test whether the model module is loaded."""
+        return self._loaded
+
+    def is_alive(self):
+        """Test whether the interpreter process is still running."""
+        return (not (self._process is None)) and (self._process.poll() is None)
+
+    def load(self, write = None):
+        """Load the model module or reload it if it was loaded before, returning the exit status."""
+        if write is None:
+            write = sys.stdout.write
+        if self._loaded:
+            self._send(':reload')
+        else:
+            self._send(':load app/Main.hs')
+        self._send(':module + *Main')
+        (status, errors) = (0, False)
+        for line in self._read_until_sentinel():
+            if ': error' in line:
+                errors = True
+            write(line)
+        if errors:
+            status = 1
+        self._loaded = (status == 0)
+        return status
+
+    def run_main(self, write = None, args = None):
+        """Run the main function of the model with the specified arguments and return the exit status."""
+        if write is None:
+            write = sys.stdout.write
+        if args is None:
+            args = []
+        main = '(System.Environment.withArgs [' + ', '.join(encode_str(arg) for arg in args) + '] main)'
+        self._send('Control.Exception.catch (' + main + ' >> putStrLn "' + _sentinel + ' 0") ' +
+                   '(\\e -> putStrLn (show (e :: Control.Exception.SomeException)) >> putStrLn "' + _sentinel + ' 1")')
+        status = 1
+        for line in self._read_until_sentinel(echo_sentinel = False):
+            if line.startswith(_sentinel + ' '):
+                status = int(line[len(_sentinel) + 1:].strip())
+            else:
+                write(line)
+        return status
+
+    def close(self):
+        """Close the session."""
+        if self.is_alive():
+            try:
+                self._process.stdin.write(':quit\n')
+                self._process.stdin.close()
+            except (OSError, ValueError):
+                pass
+            self._process.wait()
+
+    def _send(self, command):
+        """Send the command to the interpreter."""
+        self._process.stdin.write(command + '\n')
+        self._process.stdin.flush()
+
+    def _read_until_sentinel(self, echo_sentinel = True):
+        """Iterate the output lines until the sentinel is printed."""
+        if echo_sentinel:
+            self._send('putStrLn "' + _sentinel + '"')
+        while True:
+            line = self._process.stdout.readline()
+            if line == '':
+                raise OSError('The interpreter has terminated unexpectedly')
+            if line.rstrip('\n') == _sentinel:
+                return
+            yield line
+            if (not echo_sentinel) and line.startswith(_sentinel + ' '):
+                return
+
+def get_interpreter_session_impl(dirname, backend, restart = False):
+    """Return the interpreter session for the specified project directory and backend, which may need starting."""
+    key = os.path.abspath(dirname)
+    session = _sessions.get(key)
+    if (not (session is None)) and (restart or (not session.is_alive()) or (not (session.get_backend() is backend))):
+        session.close()
+        session = None
+    if session is None:
+        session = InterpreterSession(dirname, backend)
+        _sessions[key] = session
+    return session
+
+def close_interpreter_sessions():
+    """Close all interpreter sessions kept alive between runs."""
+    for session in _sessions.values():
+        session.close()
+    _sessions.clear()
+
+atexit.register(close_interpreter_sessions)
@@ -0,0 +1,198 @@
+# Copyright (c) 2017 David Sorokin <david.sorokin@gmail.com>
+#
+# Licensed under BSD3. See the LICENSE.txt file in the root of this distribution.
+
+import os
+import re
+import tarfile
+
+from simulation.aivika.modeler.model_project import GLOBAL_PACKAGES
+from simulation.aivika.modeler.model_project import DEFAULT_RESOLVER
+
+SNAPSHOT_FILE = 'snapshot.yaml'
+
+_tarball_pattern = re.compile(r"^(.+)-([0-9]+(?:\.[0-9]+)*)\.tar\.gz$")
+
+_extra_dep_pattern = re.compile(r"^(.+)-([0-9]+(?:\.[0-9]+)*)$")
+
+_cabal_file_pattern = re.compile(r"^[^/]+/[^/]+\.cabal$")
+
+_dependency_pattern = re.compile(r"^\s*([A-Za-z0-9][A-Za-z0-9-]*)")
+
+class MissingPackagesException(Exception):
+    """Raised when the offline mirror has no packages that the model depends on."""
+
+    def __init__(self, message, packages):
+        """Initializes a new instance."""
+        self.message = message
+        self.packages = packages
+
+class OfflineMirror:
+    """The local directory of package tarballs such as aivika-5.2.tar.gz used instead of Hackage.
+
+       The directory may also contain the snapshot.yaml file of a custom Stack
+       snapshot that replaces the Stackage snapshot, or the snapshot file can
+       be specified explicitly.
+    """
+
+    def __init__(self, dirname, snapshot = None):
+        """Initializes a new instance by the mirror directory and optional snapshot file."""
+        self._dirname = os.path.abspath(dirname)
+        if snapshot is None:
+            snapshot = os.path.join(self._dirname, SNAPSHOT_FILE)
+            if not os.path.isfile(snapshot):
+                snapshot = None
+        if snapshot is None:
+            self._snapshot = None
+        else:
+            self._snapshot = os.path.abspath(snapshot)
+        self._dependencies = {}
+
+    def get_dirname(self):
+        """Return the mirror directory."""
+        return self._dirname
+
+    def get_snapshot(self):
+        """Return the path to the snapshot file or None if the Stackage snapshot is used."""
+        return self._snapshot
+
+    def get_resolver(self):
+        """Return the resolver value of the stack file, which starts with a space or new line."""
+        if self._snapshot is None:
+            return ' ' + DEFAULT_RESOLVER
+        else:
+            return '\n  name: aivika-modeler-mirror\n  location: "' + self._snapshot + '"'
+
+    def get_tarballs(self):
+        """Return the sorted list of paths to the package tarballs."""
+        if not os.path.isdir(self._dirname):
+            return []
+        names = [name for name in os.listdir(self._dirname) if not (_tarball_pattern.match(name) is None)]
+        return [os.path.join(self._dirname, name) for name in sorted(names)]
+
+    def install(self, model):
+        """Add the package tarballs to the package locations of the model."""
+        for tarball in self.get_tarballs():
+            model.add_package_location(tarball)
+
+    def get_dependencies(self, tarball):
+        """Return the packages that the library of the package tarball depends on, as its .cabal file says."""
+        if not (tarball in self._dependencies):
+            self._dependencies[tarball] = _read_dependencies(tarball)
+        return self._dependencies[tarball]
+
+    def find_missing_packages(self, extra_deps, packages):
+        """Return the sorted list of the extra dependencies and packages that the mirror has no tarballs for.
+
+           The extra dependencies must match exactly, while any version of
+           the other packages will do, the latest one being used. The packages
+           that the found ones depend on are checked too. The packages that
+           come with GHC are never missing.
+        """
+        tarballs = {}
+        for tarball in self.get_tarballs():
+            m = _tarball_pattern.match(os.path.basename(tarball))
+            tarballs.setdefault(m.group(1), []).append((_get_version_key(m.group(2)), m.group(2), tarball))
+        missing = set()
+        found = {}
+        for dep in extra_deps:
+            m = _extra_dep_pattern.match(dep)
+            versions = [] if m is None else [x for x in tarballs.get(m.group(1), []) if x[1] == m.group(2)]
+            if len(versions) == 0:
+                missing.add(dep)
+            if not (m is None):
+                found[m.group(1)] = None if len(versions) == 0 else versions[0][2]
+        names = list(packages)
+        while len(names) > 0:
+            name = names.pop()
+            if (name in found) or (name in missing) or (name in GLOBAL_PACKAGES):
+                continue
+            if name in tarballs:
+                found[name] = max(tarballs[name])[2]
+            else:
+                missing.add(name)
+        pending = [x for x in found.values() if not (x is None)]
+        while len(pending) > 0:
+            for name in self.get_dependencies(pending.pop()):
+                if (name in found) or (name in missing) or (name in GLOBAL_PACKAGES):
+                    continue
+                if name in tarballs:
+                    found[name] = max(tarballs[name])[2]
+                    pending.append(found[name])
+                else:
+                    missing.add(name)
+        return sorted(missing)
+
+    def require_packages(self, extra_deps, packages):
+        """Raise an exception listing the missing packages if the mirror has not all of them."""
+        missing = self.find_missing_packages(extra_deps, packages)
+        if len(missing) > 0:
+            raise MissingPackagesException('The offline mirror ' + self._dirname + ' has no packages: ' + ', '.join(missing), missing)
+
+def _get_version_key(version):
+    """Return the key that orders the versions."""
+    return tuple(int(x) for x in version.split('.'))
+
+def _read_dependencies(tarball):
+    """Read the packages that the library of the package tarball depends on.
+
+       Only the unconditional build-depends fields of the library are taken,
+       for the conditional ones may be disabled on this platform.
+    """
+    with tarfile.open(tarball, 'r:gz') as archive:
+        members = [x for x in archive.getmembers() if x.isfile() and not (_cabal_file_pattern.match(x.name) is None)]
+        if len(members) == 0:
+            return []
+        text = archive.extractfile(members[0]).read().decode('utf-8', 'replace')
+    deps = []
+    section = None
+    conditions = []
+    field = None
+    for line in text.splitlines():
+        stripped = line.strip()
+        if (len(stripped) == 0) or stripped.startswith('--'):
+            continue
+        indent = len(line) - len(line.lstrip())
+        if (not (field is None)) and indent > field[0]:
+            field[1].append(stripped)
+            continue
+        if not (field is None):
+            deps.extend(_get_dependency_names(' '.join(field[1])))
+            field = None
+        while (len(conditions) > 0) and indent <= conditions[-1]:
+            conditions.pop()
+        if indent == 0 and not (':' in stripped):
+            section = stripped.lower()
+            continue
+        if stripped.lower().startswith('if ') or stripped.lower() == 'else':
+            conditions.append(indent)
+            continue
+        (name, sep, value) = stripped.partition(':')
+        if sep == ':' and name.strip().lower() == 'build-depends' and len(conditions) == 0 and section in [None, 'library']:
+            field = (indent, [value.strip()])
+    if not (field is None):
+        deps.extend(_get_dependency_names(' '.join(field[1])))
+    return sorted(set(deps))
+
+def _get_dependency_names(value):
+    """Return the package names of the build-depends field value."""
+    names = []
+    for item in value.split(','):
+        m = _dependency_pattern.match(item)
+        if not (m is None):
+            names.append(m.group(1))
+    return names
+
+_offline_mirror = None
+
+def get_offline_mirror():
+    """Return the offline mirror used by the generated projects or None."""
+    return _offline_mirror
+
+def set_offline_mirror(mirror):
+    """Set the offline mirror by its instance or directory, where None means that the packages are downloaded."""
+    global _offline_mirror
+    if (mirror is None) or isinstance(mirror, OfflineMirror):
+        _offline_mirror = mirror
+    else:
+        _offline_mirror = OfflineMirror(mirror)
@@ -3,6 +3,7 @@
 # Licensed under BSD3. See the LICENSE.txt file in the root of this distribution.
 
 import os
+import io
 
 cabal_file_template = """
 name:                modeling-project
@@ -20,16 +21,23 @@ build-type:          Simple
 extra-source-files:  README.md
 cabal-version:       >=1.10
 
-library
-  hs-source-dirs:      src
-  exposed-modules:     Lib
-  build-depends:       base >= 4.7 && < 5
-  default-language:    Haskell2010
+flag dev
+  description:         Build quickly without optimisation for fast iteration
+  default:             False
+  manual:              True
+
+flag max
+  description:         Build with the most aggressive optimisation
+  default:             False
+  manual:              True
+
+{library_section}
 
 executable modeling-project-exe
   hs-source-dirs:      app
   main-is:             Main.hs
-  ghc-options:         -threaded -O2 -rtsopts -with-rtsopts=-N
+  ghc-options:         -threaded -rtsopts -with-rtsopts=-N
+{profile_options}
   build-depends:       base
                      , modeling-project
 {packages_to_import}
@@ -83,8 +91,120 @@ main = defaultMain
 
 """
 
-lib_code = """module Lib where
+library_section = """library
+  hs-source-dirs:      src
+  exposed-modules:     Lib
+  build-depends:       base >= 4.7 && < 5
+  default-language:    Haskell2010"""
+
+split_library_section_template = """library
+  hs-source-dirs:      src
+  exposed-modules:     Lib
+{modules_to_expose}
+  ghc-options:         {split_options}
+{profile_options}
+  build-depends:       base >= 4.7 && < 5
+{packages_to_import}
+  default-language:    Haskell2010"""
+
+profile_options_template = """  if flag(dev)
+    ghc-options:       {dev}
+  else
+    if flag(max)
+      ghc-options:     {max}
+    else
+      ghc-options:     {release}"""
+
+# NOTE: These packages come with GHC 8.0.2 of the Stackage snapshot and they are never built.
+
+GLOBAL_PACKAGES = set(['array', 'base', 'binary', 'bytestring', 'Cabal', 'containers', 'deepseq',
+                       'directory', 'filepath', 'ghc', 'ghc-boot', 'ghc-boot-th', 'ghc-prim', 'ghci',
+                       'haskeline', 'hoopl', 'hpc', 'integer-gmp', 'pretty', 'process', 'rts',
+                       'template-haskell', 'terminfo', 'time', 'transformers', 'unix', 'Win32', 'xhtml'])
+
+# NOTE: The Stackage snapshot used unless the offline mirror has its own.
+
+DEFAULT_RESOLVER = 'lts-8.13'
+
+BUILD_PROFILES = ['dev', 'release', 'max']
 
+DEFAULT_BUILD_PROFILE = 'release'
+
+build_profile_options = {
+    'dev': '-O0',
+    'release': '-O2',
+    'max': '-O2 -funbox-strict-fields -fexpose-all-unfoldings -funfolding-use-threshold=100 -fmax-simplifier-iterations=10' }
+
+cabal_project_file_template = """-- This file was automatically generated by aivika-modeler
+--
+-- The packages are taken only from the offline mirror.
+packages: .
+
+repository aivika-modeler-mirror
+  url: file+noindex://{mirror}
+
+active-repositories: aivika-modeler-mirror
+"""
+
+lib_code = """module Lib (modelParam, modelParamBy) where
+
+import Data.Char
+import System.Environment
+import System.IO.Unsafe
+
+-- | The model parameters given by the command line arguments
+-- --param NAME=VALUE and --params FILE, where FILE contains a flat
+-- JSON object. The later values override the former ones.
+{-# NOINLINE modelParams #-}
+modelParams :: [(String, String)]
+modelParams = unsafePerformIO $ fmap reverse $ getArgs >>= readParams
+
+-- | Return the value of the model parameter or the default one.
+modelParam :: Read a => String -> a -> a
+modelParam = modelParamBy readValue
+  where readValue value =
+          case reads value of
+            [(x, rest)] | all isSpace rest -> Just x
+            _ -> Nothing
+
+-- | Return the value of the model parameter read by the specified
+-- function or the default one.
+modelParamBy :: (String -> Maybe a) -> String -> a -> a
+modelParamBy f name def =
+  case lookup name modelParams of
+    Nothing -> def
+    Just value ->
+      case f value of
+        Just x -> x
+        Nothing -> error $ "Invalid value of the model parameter " ++ name ++ ": " ++ value
+
+readParams :: [String] -> IO [(String, String)]
+readParams ("--param" : x : xs) =
+  do ys <- readParams xs
+     let (name, value) = break (== '=') x
+     return ((name, drop 1 value) : ys)
+readParams ("--params" : file : xs) =
+  do contents <- readFile file
+     ys <- readParams xs
+     return (parseParams contents ++ ys)
+readParams (_ : xs) = readParams xs
+readParams [] = return []
+
+parseParams :: String -> [(String, String)]
+parseParams contents =
+  map parseField $ filter (any (not . isSpace)) $ splitFields $ filter (`notElem` "{}") contents
+    where splitFields s =
+            case break (== ',') s of
+              (x, []) -> [x]
+              (x, _ : s') -> x : splitFields s'
+          parseField x =
+            let (name, value) = break (== ':') x
+            in (unquote name, readValue $ unquote $ drop 1 value)
+          unquote = filter (/= '"') . trim
+          trim = dropWhile isSpace . reverse . dropWhile isSpace . reverse
+          readValue "true" = "True"
+          readValue "false" = "False"
+          readValue value = value
 """
 
 stack_file_template = """# This file was automatically generated by 'stack init'
@@ -104,7 +224,7 @@ stack_file_template = """# This file was automatically generated by 'stack init'
 # resolver:
 #  name: custom-snapshot
 #  location: "./custom-snapshot.yaml"
-resolver: lts-8.13
+resolver:{resolver}
 
 # User packages to be built.
 # Various formats can be used as shown in the example below.
@@ -136,7 +256,7 @@ extra-deps:
 flags: {}
 
 # Extra package databases containing global packages
-extra-package-dbs: []
+extra-package-dbs:{extra_package_dbs}
 
 # Control whether we use the GHC we find on the path
 # system-ghc: true
@@ -158,42 +278,93 @@ extra-package-dbs: []
 
 """
 
-def generate_cabal_file_impl(model, filename):
-    """Generate a cabal file."""
+def render_file_impl(write_file_impl, *args):
+    """Render the file contents in memory using the specified write function."""
+    file = io.StringIO()
+    write_file_impl(*(args + (file,)))
+    return file.getvalue()
+
+def update_file_impl(filename, contents):
+    """Write the contents in the file unless it already contains them.
+
+       Return whether the file was rewritten. The unchanged files keep
+       their modification time, so that Stack would not rebuild them.
+    """
+    if os.path.exists(filename):
+        with open(filename, "r") as file:
+            if file.read() == contents:
+                return False
     with open(filename, "w") as file:
-        write_cabal_file_impl(model, file)
+        file.write(contents)
+    return True
+
+def render_cabal_file_impl(model, modules = None, compile_times = False):
+    """Render the cabal file contents."""
+    file = io.StringIO()
+    write_cabal_file_impl(model, file, modules = modules, compile_times = compile_times)
+    return file.getvalue()
+
+def render_stack_file_impl(model, store = None, mirror = None):
+    """Render the stack file contents, where the optional store and mirror provide the dependencies."""
+    return render_file_impl(lambda file: write_stack_file_impl(model, file, store = store, mirror = mirror))
+
+def render_cabal_project_file_impl(mirror):
+    """Render the cabal.project file contents that restrict cabal-install to the offline mirror."""
+    return cabal_project_file_template.replace('{mirror}', mirror.get_dirname())
+
+def generate_cabal_file_impl(model, filename):
+    """Generate a cabal file and return whether it was rewritten."""
+    return update_file_impl(filename, render_cabal_file_impl(model))
 
 def generate_license_file_impl(filename):
-    """Generate the LICENSE file."""
-    with open(filename, "w") as file:
-        write_license_file_impl(file)
+    """Generate the LICENSE file and return whether it was rewritten."""
+    return update_file_impl(filename, render_file_impl(write_license_file_impl))
 
 def generate_readme_file_impl(filename):
-    """Generate the README.md file."""
-    with open(filename, "w") as file:
-        write_readme_file_impl(file)
+    """Generate the README.md file and return whether it was rewritten."""
+    return update_file_impl(filename, render_file_impl(write_readme_file_impl))
 
 def generate_setup_file_impl(filename):
-    """Generate the Setup.hs file."""
-    with open(filename, "w") as file:
-        write_setup_file_impl(file)
+    """Generate the Setup.hs file and return whether it was rewritten."""
+    return update_file_impl(filename, render_file_impl(write_setup_file_impl))
 
 def generate_lib_file_impl(filename):
-    """Generate the library file."""
-    with open(filename, "w") as file:
-        write_lib_file_impl(file)
+    """Generate the library file, which defines modelParam, and return whether it was rewritten."""
+    return update_file_impl(filename, render_lib_file_impl())
+
+def render_lib_file_impl():
+    """Render the library file contents, which define modelParam."""
+    return render_file_impl(write_lib_file_impl)
 
 def generate_stack_file_impl(model, filename):
-    """Generate a stack file."""
-    with open(filename, "w") as file:
-        write_stack_file_impl(model, file)
+    """Generate a stack file and return whether it was rewritten."""
+    return update_file_impl(filename, render_stack_file_impl(model))
 
-def write_cabal_file_impl(model, file):
-    """Write the cabal file."""
+def write_cabal_file_impl(model, file, modules = None, compile_times = False):
+    """Write the cabal file, where the optional modules are added to the library.
+
+       If compile_times is true then GHC reports the compiler passes of
+       the modules, by which their compile times are measured.
+    """
     indent = '                     , '
-    lines = '\n'.join(map(lambda x: indent + x, model._package_imports))
+    lines = '\n'.join(map(lambda x: indent + x, sorted(model._package_imports)))
+    if modules is None:
+        library = library_section
+    else:
+        library = split_library_section_template
+        library = library.replace('{modules_to_expose}', '\n'.join(map(lambda x: '                     ' + x, modules)))
+        library = library.replace('{packages_to_import}', lines)
+        if compile_times:
+            library = library.replace('{split_options}', '-j -dshow-passes')
+        else:
+            library = library.replace('{split_options}', '-j')
+    profile = profile_options_template
+    for name in BUILD_PROFILES:
+        profile = profile.replace('{' + name + '}', build_profile_options[name])
     contents = cabal_file_template
+    contents = contents.replace('{library_section}', library)
     contents = contents.replace('{packages_to_import}', lines)
+    contents = contents.replace('{profile_options}', profile)
     file.write(contents)
 
 def write_license_file_impl(file):
@@ -212,8 +383,13 @@ def write_lib_file_impl(file):
     """Write the library file."""
     file.write(lib_code)
 
-def write_stack_file_impl(model, file):
-    """Write the stack file."""
+def write_stack_file_impl(model, file, store = None, mirror = None):
+    """Write the stack file, where the extra dependencies already built in the optional store are omitted.
+
+       If the offline mirror is specified then its tarballs must have been added to
+       the package locations of the model. They replace the extra dependencies, which
+       are no longer downloaded, and the snapshot of the mirror replaces the resolver.
+    """
     indent = '- '
     def get_location(location):
         return '- location:\n   ' + location + '\n  extra-dep: true'
@@ -221,7 +397,25 @@ def write_stack_file_impl(model, file):
         return '\n'.join(map(get_location, locations))
     def get_extra_deps(extra_deps):
         return '\n'.join(map(lambda x: '- ' + x, extra_deps))
+    def get_package_dbs(package_dbs):
+        if len(package_dbs) == 0:
+            return ' []'
+        else:
+            return ''.join(map(lambda x: '\n- ' + x, package_dbs))
+    extra_deps = set(model._extra_deps)
+    locations = set(model._package_locations)
+    resolver = ' ' + DEFAULT_RESOLVER
+    if not (mirror is None):
+        extra_deps = set()
+        resolver = mirror.get_resolver()
+    package_dbs = []
+    if not (store is None):
+        package_dbs = store.get_package_dbs()
+        if len(package_dbs) > 0:
+            extra_deps = extra_deps.difference(store.get_extra_deps())
     contents = stack_file_template
-    contents = contents.replace('{package_locations}', get_locations(model._package_locations))
-    contents = contents.replace('{extra_deps}', get_extra_deps(model._extra_deps))
+    contents = contents.replace('{resolver}', resolver)
+    contents = contents.replace('{package_locations}', get_locations(sorted(locations)))
+    contents = contents.replace('{extra_deps}', get_extra_deps(sorted(extra_deps)))
+    contents = contents.replace('{extra_package_dbs}', get_package_dbs(package_dbs))
     file.write(contents)
@@ -0,0 +1,55 @@
+# Copyright (c) 2017 David Sorokin <david.sorokin@gmail.com>
+#
+# Licensed under BSD3. See the LICENSE.txt file in the root of this distribution.
+
+import re
+
+_binding_pattern = re.compile(r"([A-Za-z_][A-Za-z0-9_']*) <- ")
+
+# NOTE: The model variables always start with the underscore, which
+#       allows skipping the most of other identifiers quickly. A false
+#       match can only keep an unused variable alive, which is safe.
+
+_var_pattern = re.compile(r"_[A-Za-z0-9_']*")
+
+def get_action_var_impl(action):
+    """Return the variable bound by the specified action or None if the action is performed for its side effect."""
+    m = _binding_pattern.match(action)
+    if m is None:
+        return None
+    else:
+        return m.group(1)
+
+def get_referenced_vars_impl(code, var_names):
+    """Return the tuple of variables referenced in the specified code."""
+    return tuple(set(token for token in _var_pattern.findall(code) if token in var_names))
+
+def find_dead_vars_impl(actions, sources, var_names, root_var_names):
+    """Return the list of variables whose values never reach a root in the order of their definition.
+
+       The roots are the actions performed for their side effects, the result
+       sources and the specified root variables. Everything they reference,
+       directly or not, is alive.
+    """
+    deps = dict()
+    order = []
+    live = set()
+    stack = []
+    for action in actions:
+        name = get_action_var_impl(action)
+        if name is None:
+            stack.extend(get_referenced_vars_impl(action, var_names))
+        elif name in root_var_names:
+            live.add(name)
+            stack.extend(get_referenced_vars_impl(action[len(name):], var_names))
+        else:
+            deps[name] = get_referenced_vars_impl(action[len(name):], var_names)
+            order.append(name)
+    for source in sources:
+        stack.extend(get_referenced_vars_impl(source, var_names))
+    while len(stack) > 0:
+        name = stack.pop()
+        if not (name in live):
+            live.add(name)
+            stack.extend(deps.get(name, ()))
+    return [name for name in order if not (name in live)]
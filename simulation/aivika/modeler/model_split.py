@@ -0,0 +1,253 @@
+# Copyright (c) 2017 David Sorokin <david.sorokin@gmail.com>
+#
+# Licensed under BSD3. See the LICENSE.txt file in the root of this distribution.
+
+import re
+
+from simulation.aivika.modeler.model_emitter import StringSpool
+from simulation.aivika.modeler.model_reachability import get_action_var_impl
+from simulation.aivika.modeler.model_reachability import get_referenced_vars_impl
+
+TYPES_MODULE = 'ModelTypes'
+
+PART_MODULE_PREFIX = 'ModelPart'
+
+TEMPLATE_MODULE_PREFIX = 'ModelTemplate'
+
+class ModelPart:
+    """The part of the model code that is written in a separate Haskell module."""
+
+    def __init__(self, index):
+        """Initializes a new instance by the index of the part."""
+        self._index = index
+        self._statements = StringSpool()
+        self._refs = set()
+        self._inputs = []
+        self._outputs = []
+
+    def get_module_name(self):
+        """Return the module name."""
+        return PART_MODULE_PREFIX + str(self._index)
+
+    def get_function_name(self):
+        """Return the name of the function that creates the part."""
+        return 'part' + str(self._index)
+
+    def get_inputs(self):
+        """Return the sorted list of variables that the part receives from other parts."""
+        return self._inputs
+
+    def get_outputs(self):
+        """Return the list of variables that the part returns to other parts."""
+        return self._outputs
+
+    def write(self, file, base_comp, pragmas, module_imports, var_types):
+        """Write the module code in the specified file."""
+        for pragma in pragmas:
+            file.write(pragma)
+            file.write('\n')
+        file.write('{-# LANGUAGE PartialTypeSignatures #-}\n')
+        file.write('{-# OPTIONS_GHC -fno-warn-partial-type-signatures #-}\n')
+        file.write('\n')
+        file.write('-- NOTE: This file was auto-generated by aivika-modeler 1.0\n')
+        file.write('\n')
+        file.write('module ' + self.get_module_name() + ' (' + self.get_function_name() + ') where\n')
+        file.write('\n')
+        for module_import in module_imports:
+            file.write(module_import)
+            file.write('\n')
+        file.write('import ' + TYPES_MODULE + '\n')
+        file.write('\n')
+        func = self.get_function_name()
+        types = [ _get_var_type(name, var_types) for name in self._inputs ]
+        types.append(_get_comp_type(base_comp, _get_tuple_type([ _get_var_type(name, var_types) for name in self._outputs ])))
+        file.write(func + ' :: ' + ' -> '.join(types) + '\n')
+        file.write(' '.join([func] + self._inputs) + ' =\n')
+        file.write('  mdo --\n')
+        for statement in self._statements:
+            file.write('      ' + statement + '\n')
+        file.write('      return ' + _get_tuple_value(self._outputs) + '\n')
+
+class SplitModel:
+    """The model code split into parts, each of which is written in a separate module."""
+
+    def __init__(self, actions, action_parts, sources, var_names, eliminated_var_names):
+        """Split the actions by the specified part keys of them.
+
+           The actions performed for their side effect are returned by the parts
+           as computations, which the main module runs in the original order.
+        """
+        self._parts = []
+        self._runs = []
+        parts = dict()
+        var_parts = dict()
+        run = None
+        run_part = None
+        for (action, key) in zip(actions, action_parts):
+            part = parts.get(key)
+            if part is None:
+                part = ModelPart(len(self._parts) + 1)
+                parts[key] = part
+                self._parts.append(part)
+            name = get_action_var_impl(action)
+            if name is None:
+                if not (run_part is part):
+                    self._flush_run(run, run_part)
+                    run = []
+                    run_part = part
+                run.append(action)
+                part._refs.update(get_referenced_vars_impl(action, var_names))
+            elif not (name in eliminated_var_names):
+                var_parts[name] = part
+                part._statements.append(action)
+                part._refs.update(get_referenced_vars_impl(action[len(name):], var_names))
+        self._flush_run(run, run_part)
+        outputs = dict()
+        for part in self._parts:
+            inputs = set()
+            for name in part._refs:
+                p = var_parts.get(name)
+                if not ((p is None) or (p is part)):
+                    inputs.add(name)
+                    outputs.setdefault(p, set()).add(name)
+            part._inputs = sorted(inputs)
+            part._refs = None
+        for source in sources:
+            for name in get_referenced_vars_impl(source, var_names):
+                p = var_parts.get(name)
+                if not (p is None):
+                    outputs.setdefault(p, set()).add(name)
+        for part in self._parts:
+            part._outputs = sorted(outputs.get(part, set())) + part._outputs
+
+    def _flush_run(self, run, part):
+        """Add the run of actions to the specified part."""
+        if not (run is None):
+            name = '_act_' + str(len(self._runs) + 1)
+            self._runs.append(name)
+            part._statements.append('let { ' + name + ' = do { ' + '; '.join(run) + ' } }')
+            part._outputs.append(name)
+
+    def get_parts(self):
+        """Return the model parts."""
+        return self._parts
+
+    def get_modules(self):
+        """Return the names of all modules that the model code is split into."""
+        return [TYPES_MODULE] + [ part.get_module_name() for part in self._parts ]
+
+    def write_model_code(self, file, indent = ''):
+        """Write the model code that creates all parts and runs the actions in order."""
+        file.write(indent)
+        file.write('mdo --')
+        file.write('\n')
+        indent2 = indent + '    '
+        for part in self._parts:
+            outputs = part.get_outputs()
+            call = ' '.join([part.get_function_name()] + part.get_inputs())
+            file.write(indent2)
+            if len(outputs) > 0:
+                file.write(_get_tuple_value(outputs) + ' <- ')
+            file.write(call + '\n')
+        for run in self._runs:
+            file.write(indent2 + run + '\n')
+        file.write(indent2)
+        file.write('return $\n')
+        file.write(indent2)
+        file.write('  results\n')
+
+def write_types_module_impl(file, module_imports, transact_types):
+    """Write the module that defines the transact types for all parts."""
+    file.write('-- NOTE: This file was auto-generated by aivika-modeler 1.0\n')
+    file.write('\n')
+    file.write('module ' + TYPES_MODULE + ' where\n')
+    file.write('\n')
+    for module_import in module_imports:
+        file.write(module_import)
+        file.write('\n')
+    file.write('\n')
+    for tp in transact_types:
+        tp.write(file)
+        file.write('\n')
+
+def _get_var_type(name, var_types):
+    """Return the type of the variable or a wildcard if it is unknown."""
+    return var_types.get(name, '_')
+
+def _get_comp_type(base_comp, tp):
+    """Return the type of the Simulation computation with the specified result."""
+    comp = 'Simulation'
+    if not (base_comp is None):
+        comp += ' ' + base_comp
+    if (' ' in tp) and not tp.startswith('('):
+        tp = '(' + tp + ')'
+    return comp + ' ' + tp
+
+def _get_tuple_type(types):
+    """Return the type of the tuple of the specified types."""
+    if len(types) == 1:
+        return types[0]
+    else:
+        return '(' + ', '.join(types) + ')'
+
+def _get_tuple_value(names):
+    """Return the tuple of the specified variables."""
+    if len(names) == 1:
+        return names[0]
+    else:
+        return '(' + ', '.join(names) + ')'
+
+_compile_pattern = re.compile(r"\[\s*\d+ of \d+\] Compiling (\S+)")
+
+_timing_pattern = re.compile(r"!!! .*\[(\S+)\]: finished in ([0-9.]+) milliseconds")
+
+class CompileTimer:
+    """It collects the compile times of modules from the output of GHC.
+
+       The times are summed over the compiler passes reported by -dshow-passes.
+       If the compiler does not report them, then the time between the starts
+       of compiling the modules is used, which is precise only for the
+       sequential compilation.
+    """
+
+    def __init__(self, clock):
+        """Initializes a new instance by the function that returns the current time in seconds."""
+        self._clock = clock
+        self._pass_times = dict()
+        self._start_times = dict()
+        self._last_module = None
+        self._last_time = None
+
+    def feed(self, line):
+        """Process the output line and return whether it should be shown to the user."""
+        m = _timing_pattern.search(line)
+        if not (m is None):
+            module = m.group(1)
+            self._pass_times[module] = self._pass_times.get(module, 0.0) + float(m.group(2)) / 1000.0
+            return False
+        m = _compile_pattern.search(line)
+        if not (m is None):
+            self._stop()
+            self._last_module = m.group(1)
+            self._last_time = self._clock()
+            return True
+        if 'Linking' in line:
+            self._stop()
+        for text in [line.strip(), line.split(': ', 1)[-1].strip()]:
+            if text.startswith('***') or text.startswith('Result size of') or text.startswith('= {terms:'):
+                return False
+        return True
+
+    def _stop(self):
+        """Stop measuring the time of the last module."""
+        if not (self._last_module is None):
+            self._start_times[self._last_module] = self._clock() - self._last_time
+            self._last_module = None
+
+    def get_times(self):
+        """Return a dictionary of the compile times of modules in seconds."""
+        self._stop()
+        if len(self._pass_times) > 0:
+            return dict(self._pass_times)
+        else:
+            return dict(self._start_times)
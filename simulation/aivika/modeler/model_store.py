@@ -0,0 +1,128 @@
+# Copyright (c) 2017 David Sorokin <david.sorokin@gmail.com>
+#
+# Licensed under BSD3. See the LICENSE.txt file in the root of this distribution.
+
+import os
+
+from simulation.aivika.modeler.model_backend import StackBackend
+from simulation.aivika.modeler.model_backend import InvalidBackendException
+from simulation.aivika.modeler.model_backend import get_backend_impl
+from simulation.aivika.modeler.model_project import GLOBAL_PACKAGES
+from simulation.aivika.modeler.model_project import DEFAULT_RESOLVER
+from simulation.aivika.modeler.model_mirror import get_offline_mirror
+
+STORE_ENV_VAR = 'AIVIKA_MODELER_STORE'
+
+_store_file_template = """# This file was automatically generated by aivika-modeler
+#
+# The project has no packages of its own. It only builds the dependencies
+# shared by the generated projects.
+resolver:{resolver}
+
+packages:{package_locations}
+
+extra-deps:
+{extra_deps}
+"""
+
+class DependencyStore:
+    """The shared store of the dependencies built once and reused by every generated project.
+
+       The packages from the Stackage snapshot are already shared by Stack.
+       The store also builds the extra dependencies, which Stack would build
+       again in every project. The projects find them in the local package
+       database of the store.
+    """
+
+    def __init__(self, dirname = None):
+        """Initializes a new instance by the store directory."""
+        if dirname is None:
+            dirname = get_default_store_dir()
+        self._dirname = os.path.abspath(dirname)
+
+    def get_dirname(self):
+        """Return the store directory."""
+        return self._dirname
+
+    def get_package_dbs(self):
+        """Return the package databases that contain the built dependencies."""
+        return self._read_list('package-dbs')
+
+    def get_extra_deps(self):
+        """Return the extra dependencies already built in the store."""
+        return self._read_list('extra-deps')
+
+    def get_packages(self):
+        """Return the packages already built in the store."""
+        return self._read_list('packages')
+
+    def prewarm(self, extra_deps, packages, backend = None):
+        """Build the specified extra dependencies and packages in addition to those built before.
+
+           If the offline mirror is set then the packages and snapshot are taken from it.
+           Return the exit status.
+        """
+        backend = get_backend_impl(backend)
+        if not isinstance(backend, StackBackend):
+            raise InvalidBackendException('The dependency store can be built only by Stack')
+        extra_deps = sorted(set(extra_deps).union(self.get_extra_deps()))
+        packages = sorted(set(packages).union(self.get_packages()).difference(GLOBAL_PACKAGES))
+        mirror = get_offline_mirror()
+        if mirror is None:
+            (resolver, locations, deps) = (' ' + DEFAULT_RESOLVER, ' []', extra_deps)
+        else:
+            mirror.require_packages(extra_deps, packages)
+            (resolver, locations, deps) = (mirror.get_resolver(), ''.join('\n- location:\n   ' + x + '\n  extra-dep: true' for x in mirror.get_tarballs()), [])
+        if not os.path.exists(self._dirname):
+            os.makedirs(self._dirname)
+        with open(os.path.join(self._dirname, 'stack.yaml'), 'w') as file:
+            contents = _store_file_template
+            contents = contents.replace('{resolver}', resolver)
+            contents = contents.replace('{package_locations}', locations)
+            contents = contents.replace('{extra_deps}', '\n'.join('- ' + x for x in deps))
+            file.write(contents)
+        status = backend.call(['stack', 'build'] + packages, cwd = self._dirname)
+        if status != 0:
+            return status
+        process = backend.popen(['stack', 'path', '--local-pkg-db'], cwd = self._dirname)
+        output = process.communicate()[0]
+        status = process.wait()
+        if status != 0:
+            return status
+        self._write_list('package-dbs', [line.strip() for line in output.splitlines() if len(line.strip()) > 0])
+        self._write_list('extra-deps', extra_deps)
+        self._write_list('packages', packages)
+        return 0
+
+    def _read_list(self, name):
+        """Read the list of lines stored in the specified file."""
+        filename = os.path.join(self._dirname, name)
+        if not os.path.exists(filename):
+            return []
+        with open(filename, 'r') as file:
+            return [line.strip() for line in file if len(line.strip()) > 0]
+
+    def _write_list(self, name, items):
+        """Store the list of lines in the specified file."""
+        with open(os.path.join(self._dirname, name), 'w') as file:
+            for item in items:
+                file.write(item)
+                file.write('\n')
+
+def get_default_store_dir():
+    """Return the store directory given by the environment variable or the default one in the home directory."""
+    dirname = os.environ.get(STORE_ENV_VAR)
+    if dirname is None:
+        dirname = os.path.join(os.path.expanduser('~'), '.aivika-modeler', 'store')
+    return dirname
+
+_dependency_store = None
+
+def get_dependency_store():
+    """Return the dependency store used by the generated projects or None."""
+    return _dependency_store
+
+def set_dependency_store(store):
+    """Set the dependency store used by the generated projects, where None means that every project builds its own dependencies."""
+    global _dependency_store
+    _dependency_store = store
@@ -0,0 +1,69 @@
+# Copyright (c) 2017 David Sorokin <david.sorokin@gmail.com>
+#
+# Licensed under BSD3. See the LICENSE.txt file in the root of this distribution.
+
+import os
+import sys
+import csv
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
+# NOTE: It is the default header of the run column written by FinalTableView.
+
+RUN_TEXT = 'Run'
+
+OUTPUT_FILE = 'output.log'
+
+def run_sweep_impl(backend, commands, dirnames, cwd = None, processes = None, label = 'Point'):
+    """Run the commands at most by the specified number of processes at once and return their exit statuses.
+
+       The output of every command is saved in the corresponding directory.
+    """
+    if processes is None:
+        processes = os.cpu_count() or 1
+    lock = threading.Lock()
+    def run(i):
+        if not os.path.exists(dirnames[i]):
+            os.makedirs(dirnames[i])
+        process = backend.popen(commands[i], cwd = cwd)
+        output = process.communicate()[0]
+        status = process.wait()
+        with open(os.path.join(dirnames[i], OUTPUT_FILE), 'w') as file:
+            file.write(output)
+        with lock:
+            sys.stdout.write(label + ' ' + str(i) + ' has finished with status ' + str(status) + '\n')
+        return status
+    with ThreadPoolExecutor(max_workers = max(1, processes)) as executor:
+        return list(executor.map(run, range(len(commands))))
+
+def read_final_tables_impl(dirname):
+    """Read the CSV files saved by FinalTableView in the directory and return a dictionary of the rows by the run indices."""
+    rows = dict()
+    if not os.path.isdir(dirname):
+        return rows
+    for name in sorted(os.listdir(dirname)):
+        if not name.endswith('.csv'):
+            continue
+        with open(os.path.join(dirname, name), newline = '') as file:
+            lines = [line for line in csv.reader(file) if len(line) > 0]
+        if (len(lines) == 0) or (lines[0][0].strip() != RUN_TEXT):
+            continue
+        header = [x.strip() for x in lines[0]]
+        for line in lines[1:]:
+            run = int(line[0])
+            row = rows.setdefault(run, dict())
+            for (column, value) in zip(header[1:], line[1:]):
+                row[column] = decode_value_impl(value)
+    return rows
+
+def decode_value_impl(value):
+    """Return the number if the value read from the CSV file can be converted or the text otherwise."""
+    value = value.strip()
+    try:
+        return int(value)
+    except ValueError:
+        try:
+            return float(value)
+        except ValueError:
+            return value
@@ -0,0 +1,109 @@
+# Copyright (c) 2017 David Sorokin <david.sorokin@gmail.com>
+#
+# Licensed under BSD3. See the LICENSE.txt file in the root of this distribution.
+
+import re
+import json
+
+from simulation.aivika.modeler.util import *
+
+_name_pattern = re.compile(r"^[A-Za-z_][A-Za-z0-9_.\-]*$")
+
+# NOTE: These prefixes are reserved for the specs and experiment settings overridden at launch time.
+
+RESERVED_PREFIXES = ['specs.', 'experiment.']
+
+class InvalidParamException(Exception):
+    """Raised when the model parameter is invalid."""
+
+    def __init__(self, message):
+        """Initializes a new instance."""
+        self.message = message
+
+class Param:
+    """The model parameter whose value is read when the compiled model starts.
+
+       It can be used wherever a number is expected, for example, as a queue
+       capacity or a mean delay. Then the same executable can be run with
+       different parameter values without recompiling.
+    """
+
+    def __init__(self, model, name, value, descr = None):
+        """Initializes a new instance by the model, name, default value and optional description."""
+        if _name_pattern.match(name) is None:
+            raise InvalidParamException('Invalid parameter name: ' + name)
+        if any(name.startswith(prefix) for prefix in RESERVED_PREFIXES):
+            raise InvalidParamException('Reserved parameter name: ' + name)
+        self._model = model
+        self._name = name
+        self._value = value
+        self._descr = descr
+        model.add_param(self)
+
+    def get_model(self):
+        """Return the model."""
+        return self._model
+
+    def get_name(self):
+        """Return the parameter name."""
+        return self._name
+
+    def get_value(self):
+        """Return the default value."""
+        return self._value
+
+    def get_descr(self):
+        """Return the description."""
+        return self._descr
+
+    def __str__(self):
+        """Return the code that reads the parameter value."""
+        return '(modelParam ' + encode_str(self._name) + ' (' + str(self._value) + '))'
+
+def get_param_args(values):
+    """Return the command line arguments that pass the specified dictionary of parameter values."""
+    args = []
+    for name in sorted(values):
+        args.append('--param')
+        args.append(name + '=' + _encode_param_value(values[name]))
+    return args
+
+# NOTE: The compiled model reads the parameter file by a simple reader of the flat JSON object,
+#       which does not know the escape sequences and the nested values.
+
+_unsafe_json_chars = set('{}[],:"\\')
+
+def write_params_file(filename, values):
+    """Write the dictionary of parameter values in the JSON file that can be passed by --params.
+
+       Only the flat object of scalar values can be written: the names
+       are strings and the values are booleans, numbers or strings.
+       The names and strings must be printable ASCII without any of
+       the characters {}[],:"\\ that the compiled model cannot read back.
+    """
+    for name in values:
+        _require_flat_json_str(name, name)
+        value = values[name]
+        if isinstance(value, str):
+            _require_flat_json_str(name, value)
+        elif not isinstance(value, (bool, int, float)):
+            raise InvalidParamException('Expected a boolean, number or string value of parameter ' + str(name) + ': ' + repr(value))
+    with open(filename, 'w') as file:
+        json.dump(values, file, sort_keys = True)
+
+def _encode_param_value(value):
+    """Return the text of the parameter value that Haskell can read."""
+    if value is True:
+        return 'True'
+    elif value is False:
+        return 'False'
+    else:
+        return str(value)
+
+def _require_flat_json_str(name, text):
+    """Raise an exception unless the string can be read back from the flat JSON object by the compiled model."""
+    if not isinstance(text, str):
+        raise InvalidParamException('Expected a string name of parameter: ' + repr(text))
+    for c in text:
+        if (c in _unsafe_json_chars) or (c < ' ') or (c > '~'):
+            raise InvalidParamException('Unsupported character ' + repr(c) + ' in the parameter file for ' + name)
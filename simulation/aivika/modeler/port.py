@@ -16,17 +16,14 @@ class InvalidPortException(Exception):
 class Port:
     """The simulation port."""
 
-    _next_id = 1
-
     def __init__(self, model, data_type, name = None, descr = None, comp = None):
         """Initializes a new port."""
         self._model = model
         self._data_type = data_type
         if name is None:
-            self._name = '_port_' + str(Port._next_id)
+            self._name = '_port_' + str(model.new_port_id())
             self._source_name = self._name
             self._mangled_name = model.get_var_prefix() + self._name
-            Port._next_id += 1
         else:
             self._name = name
             self._source_name = model.get_source_prefix() + self._name
@@ -91,7 +88,7 @@ class Port:
 
     def _add_result_source(self):
         """Add this port to the result sources."""
-        name = encode_str(self._source_name)
+        name = self._model.encode_source_name(self._source_name)
         descr = encode_str(self._descr)
         code = 'resultSource ' + name + ' ' + descr + ' ' + self._mangled_name
         self._model.add_result_source(code)
@@ -176,11 +173,56 @@ class StreamPort(PortOnce):
             data_type.append(base_comp)
         data_type.append(item_data_type)
         PortOnce.__init__(self, model, data_type, name, descr, comp)
+        self._fusable = name is None
+        self._stage = None
+        self._fused = False
 
     def get_item_data_type(self):
         """Get the item data type"""
         return self._item_data_type
 
+    def read(self):
+        """Read the variable value."""
+        if self._fused:
+            raise InvalidPortException('Port ' + self._name + ' is already fused with another stream')
+        self.flush()
+        return PortOnce.read(self)
+
+    def write_stage(self, stream_port, func):
+        """Define the port as the stream that applies the per-item Process function to the specified stream.
+
+           The definition is deferred until the port is read. If the input stream is
+           also such a pending anonymous stage of the same model then both stages are
+           fused in one mapStreamM layer and the input port disappears from the code.
+        """
+        s = stream_port
+        if not ((self._comp is None) and (self._stage is None)):
+            raise InvalidPortException('Port ' + self._name + ' is already defined')
+        if s._is_fusable_with(self):
+            (source, funcs) = s._stage
+            s._stage = None
+            s._fused = True
+            s._model.remove_lazy_var(s._mangled_name)
+            self._stage = (source, funcs + [func])
+        else:
+            self._stage = (s.read(), [func])
+        self._model.add_pending_port(self)
+
+    def flush(self):
+        """Write the deferred stream definition if any."""
+        if not (self._stage is None):
+            (source, funcs) = self._stage
+            self._stage = None
+            if len(funcs) == 1:
+                func = funcs[0]
+            else:
+                func = '(' + ' >=> '.join(funcs) + ')'
+            self.write('return $ mapStreamM ' + func + ' ' + source)
+
+    def _is_fusable_with(self, port):
+        """Whether this pending stage can be fused with the stage of the specified port."""
+        return self._fusable and (not (self._stage is None)) and (self._model is port._model)
+
 def expect_stream(stream_port):
     """Expect the port to be a stream."""
     s = stream_port
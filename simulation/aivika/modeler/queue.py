@@ -26,6 +26,7 @@ def create_unbounded_queue(model, item_data_type, name, descr = None, storing_qu
     code = 'IQ.newQueue ' + storing_queue_strategy + ' ' + output_queue_strategy
     code = '(runEventInStartTime $ ' + code + ') :: ' + encode_data_type (comp_type)
     y.write(code)
+    model.add_root_var(y.get_mangled_name())
     return y
 
 def create_queue(model, item_data_type, capacity, name, descr = None, input_queue_strategy = 'FCFS', storing_queue_strategy = 'FCFS', output_queue_strategy = 'FCFS'):
@@ -47,6 +48,7 @@ def create_queue(model, item_data_type, capacity, name, descr = None, input_queu
     code = 'Q.newQueue ' + input_queue_strategy + ' ' + storing_queue_strategy + ' ' + output_queue_strategy + ' ' + str(capacity)
     code = '(runEventInStartTime $ ' + code + ') :: ' + encode_data_type (comp_type)
     y.write(code)
+    model.add_root_var(y.get_mangled_name())
     return y
 
 def unbounded_enqueue_stream(unbounded_queue_port, stream_port):
@@ -126,7 +128,7 @@ def queue_capacity(queue_port):
     expect_queue(q)
     model = q.get_model()
     code = '(\\a -> return $ Q.queueMaxCount ' + q.read() + ')'
-    return Expr(model, code)
+    return Expr(model, code, pure = True)
 
 def queue_size(queue_port):
     """Return an expression that evaluates to the bounded queue size."""
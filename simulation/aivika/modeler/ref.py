@@ -38,8 +38,7 @@ def write_ref(ref_port, expr):
     if r.get_model().get_main_model() != e.get_model().get_main_model():
         raise InvalidPortException('Expected both the reference ' + r.get_name() + ' and the expression to belong to the same model')
     model = r.get_model()
-    code = '(\\a -> ' + e.read('a') + ' >>= writeRef ' + r.read() + ')'
-    return Expr(model, code)
+    return BindExpr(model, 'writeRef ' + r.read(), [e])
 
 def inc_ref(ref_port, increment_expr = 1):
     """Return an expression that increases the reference contents."""
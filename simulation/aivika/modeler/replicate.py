@@ -0,0 +1,216 @@
+# Copyright (c) 2017 David Sorokin <david.sorokin@gmail.com>
+#
+# Licensed under BSD3. See the LICENSE.txt file in the root of this distribution.
+
+from simulation.aivika.modeler.model import *
+from simulation.aivika.modeler.port import *
+from simulation.aivika.modeler.data_type import *
+from simulation.aivika.modeler.util import *
+
+class ReplicatedSubModel(SubModel):
+    """The sub-model whose code is written once as a function of the replica index and applied to every index.
+
+       The actions of the sub-model are kept aside instead of being added
+       to the parent model. When the sub-model is built, they become the body
+       of one station function, so that the size of the generated code does
+       not depend on the number of replicas. The result sources are named
+       by the replica index, for example, ``line[3].queue``.
+    """
+
+    def __init__(self, model, count, name = None):
+        """Initializes a new sub-model replicated the specified number of times."""
+        SubModel.__init__(self, model, name)
+        self._count = count
+        self._var_prefix = '_rep_' + str(self._part)
+        if self._source_prefix_mangled:
+            self._source_head = self._var_prefix
+            self._source_prefix = self._var_prefix
+        else:
+            self._source_head = model.get_source_prefix() + name
+            self._source_prefix = self._source_head + '.'
+        self._actions = []
+        self._sources = []
+        self._source_lists = []
+        self._var_names = set()
+        self._lazy_var_names = set()
+        self._pending_ports = []
+        self._built = False
+
+    def get_count(self):
+        """Return the number of replicas."""
+        return self._count
+
+    def get_index_var(self):
+        """Return the variable that holds the replica index starting from 1."""
+        return self._var_prefix + '_index'
+
+    def get_station_var(self):
+        """Return the variable of the function that creates one replica."""
+        return self._var_prefix + '_station'
+
+    def get_replicas_var(self):
+        """Return the variable of the list of (output, result sources) pairs returned by the replicas."""
+        return self._var_prefix
+
+    def add_var(self, name, comp, part = None):
+        """Add a new variable with the specified definition to the replica code."""
+        self._require_not_built()
+        if name in self._var_names:
+            raise InvalidVariableException('Variable ' + name + ' is already defined')
+        self._lazy_var_names.discard(name)
+        self._var_names.add(name)
+        self._actions.append(name + ' <- ' + comp)
+
+    def add_root_var(self, name):
+        """Do nothing, for every variable of the replica code is kept."""
+        pass
+
+    def add_lazy_var(self, name):
+        """Add a new variable that will be defined lazily."""
+        if name in self._var_names:
+            raise InvalidVariableException('Variable ' + name + ' is already defined')
+        elif name in self._lazy_var_names:
+            raise InvalidVariableException('Variable ' + name + ' is already added as lazy')
+        else:
+            self._lazy_var_names.add(name)
+
+    def remove_lazy_var(self, name):
+        """Remove the lazy variable that will never be defined, for its definition was fused with another one."""
+        self._lazy_var_names.remove(name)
+
+    def add_action(self, action, part = None):
+        """Add the specified action to the replica code."""
+        self._require_not_built()
+        self._actions.append(action)
+
+    def add_pending_port(self, port):
+        """Add the specified port whose definition is deferred until it is read or the sub-model is built."""
+        self._pending_ports.append(port)
+
+    def add_result_source(self, source):
+        """Add the specified result source of the replica."""
+        self._require_not_built()
+        self._sources.append(source)
+
+    def add_result_sources(self, sources):
+        """Add the code of the result source list computed by the replica."""
+        self._require_not_built()
+        self._source_lists.append(sources)
+
+    def encode_source_name(self, name):
+        """Return the code of the specified result source name, where the replica index is inserted."""
+        if name.startswith(self._source_prefix):
+            head = self._source_head
+            rest = name[len(head):]
+        else:
+            head = name
+            rest = ''
+        code = self._model.encode_source_name(head)
+        return '(' + code + ' ++ "[" ++ show (' + self.get_index_var() + ' :: Int) ++ ' + encode_str(']' + rest) + ')'
+
+    def build(self, input_var = None, output_port = None):
+        """Add the station function to the parent model, where the replica receives the specified input stream and returns the output port if any."""
+        self._require_not_built()
+        ports = self._pending_ports
+        self._pending_ports = []
+        for port in ports:
+            port.flush()
+        for name in sorted(self._lazy_var_names):
+            raise InvalidVariableException('Variable ' + name + ' is used but not defined')
+        if output_port is None:
+            output = '()'
+        else:
+            output_port.bind_to_output()
+            output = output_port.read()
+        self._built = True
+        sources = '[' + ', '.join(self._sources) + ']'
+        for code in self._source_lists:
+            sources += ' ++ ' + code
+        args = [self.get_index_var()]
+        if not (input_var is None):
+            args.append(input_var)
+        body = self._actions + ['return (' + output + ', ' + sources + ')']
+        comp = 'return $ \\ ' + ' '.join(args) + ' -> mdo { ' + '; '.join(body) + ' }'
+        self._model.add_var(self.get_station_var(), comp, part = self._part)
+
+    def has_result_sources(self):
+        """Whether the replicas return any result sources."""
+        return (len(self._sources) > 0) or (len(self._source_lists) > 0)
+
+    def _require_not_built(self):
+        """Raise an exception if the sub-model is already built."""
+        if self._built:
+            raise ModelException('The replicated sub-model ' + self._var_prefix + ' is already built')
+
+def replicate_submodel(model, count, builder, stream_port = None, name = None, chained = False):
+    """Replicate the sub-model the specified number of times and return the output stream if any.
+
+       The builder is called only once. It receives a new sub-model and
+       the input stream of the replica, if the stream is specified, and
+       returns the output stream of the replica or None. The generated code
+       defines one station function that is applied to every replica index
+       from 1 to count by forM, so that it does not grow with count.
+
+       If the stream is specified then it is split between the replicas,
+       whose outputs are merged in the resulting stream. If chained is true
+       then the replicas are connected in series instead: the stream enters
+       the first replica and the output of every replica is the input of
+       the next one.
+
+       The result sources added within the sub-model are named by
+       the replica index, for example, ``line[3].queue``. The servers and
+       random streams of every replica are created by the transact type
+       bound to the sub-model with bind_to_model, otherwise they would be
+       shared by all replicas.
+    """
+    if (not isinstance(count, int)) or count < 1:
+        raise ModelException('Expected a positive number of replicas: ' + str(count))
+    if chained and (stream_port is None):
+        raise ModelException('The chained replicas require the input stream')
+    submodel = ReplicatedSubModel(model, count, name)
+    replicas = submodel.get_replicas_var()
+    station = submodel.get_station_var()
+    n = str(count) + ' :: Int'
+    if stream_port is None:
+        y = builder(submodel)
+        if not (y is None):
+            expect_stream(y)
+        submodel.build(output_port = y)
+        comp = 'forM [1 .. ' + n + '] ' + station
+    else:
+        s = stream_port
+        expect_stream(s)
+        input_var = submodel.get_var_prefix() + '_input'
+        x = StreamPort(submodel, s.get_item_data_type())
+        x.write('return ' + input_var)
+        x.bind_to_input()
+        y = builder(submodel, x)
+        if not (y is None):
+            expect_stream(y)
+        if chained:
+            if y is None:
+                raise ModelException('The chained replicas must return the output stream')
+            expect_same_data_type([s, y])
+        submodel.build(input_var = input_var, output_port = y)
+        s.bind_to_output()
+        if chained:
+            comp = 'foldM (\\ (s, xs) i -> fmap (second (xs ++)) (' + station + ' i s)) (' + s.read() + ', []) [1 .. ' + n + ']'
+        else:
+            comp = 'splitStream ' + str(count) + ' ' + s.read() + ' >>= \\ ys -> forM (zip [1 .. ' + n + '] ys) (uncurry ' + station + ')'
+    model.add_var(replicas, comp)
+    model.add_root_var(replicas)
+    if submodel.has_result_sources():
+        if chained:
+            model.add_result_sources('snd ' + replicas)
+        else:
+            model.add_result_sources('concatMap snd ' + replicas)
+    if y is None:
+        return None
+    if chained:
+        code = 'return $ fst ' + replicas
+    else:
+        code = 'return $ concatStreams (map fst ' + replicas + ')'
+    z = StreamPort(model, y.get_item_data_type())
+    z.write(code)
+    z.bind_to_input()
+    return z
@@ -54,12 +54,11 @@ def request_resource(resource_port, stream_port):
         raise InvalidPortException('Expected port ' + r.get_name() + ' to have a non-priority queue strategy: ' + r.queue_strategy)
     model = r.get_model()
     item_data_type = s.get_item_data_type()
-    code = 'return $ mapStreamM (\\a -> do { R.requestResource '
+    code = '(\\a -> do { R.requestResource '
     code += r.read()
-    code += '; return a }) '
-    code += s.read()
+    code += '; return a })'
     y = StreamPort(model, item_data_type)
-    y.write(code)
+    y.write_stage(s, code)
     y.bind_to_input()
     s.bind_to_output()
     return y
@@ -75,12 +74,11 @@ def request_resource_in_parallel(resource_port, stream_port):
         raise InvalidPortException('Expected port ' + r.get_name() + ' to have a non-priority queue strategy: ' + r.queue_strategy)
     model = r.get_model()
     item_data_type = s.get_item_data_type()
-    code = 'return $ mapStreamM (\\a -> do { liftEvent $ runProcess $ R.requestResource '
+    code = '(\\a -> do { liftEvent $ runProcess $ R.requestResource '
     code += r.read()
-    code += '; return a }) '
-    code += s.read()
+    code += '; return a })'
     y = StreamPort(model, item_data_type)
-    y.write(code)
+    y.write_stage(s, code)
     y.bind_to_input()
     s.bind_to_output()
     return y
@@ -101,14 +99,13 @@ def request_resource_with_priority(resource_port, priority_expr, stream_port):
         raise InvalidPortException('Expected port ' + r.get_name() + ' to have a priority queue strategy: ' + r.queue_strategy)
     model = r.get_model()
     item_data_type = s.get_item_data_type()
-    code = 'return $ mapStreamM (\\a -> do { p <- liftEvent $ '
+    code = '(\\a -> do { p <- liftEvent $ '
     code += priority_expr.read('a')
     code += '; R.requestResourceWithPriority '
     code += r.read()
-    code += ' p; return a }) '
-    code += s.read()
+    code += ' p; return a })'
     y = StreamPort(model, item_data_type)
-    y.write(code)
+    y.write_stage(s, code)
     y.bind_to_input()
     s.bind_to_output()
     return y
@@ -129,14 +126,13 @@ def request_resource_with_priority_in_parallel(resource_port, priority_expr, str
         raise InvalidPortException('Expected port ' + r.get_name() + ' to have a priority queue strategy: ' + r.queue_strategy)
     model = r.get_model()
     item_data_type = s.get_item_data_type()
-    code = 'return $ mapStreamM (\\a -> do { p <- liftEvent $ '
+    code = '(\\a -> do { p <- liftEvent $ '
     code += priority_expr.read('a')
     code += '; liftEvent $ runProcess $ R.requestResourceWithPriority '
     code += r.read()
-    code += ' p; return a }) '
-    code += s.read()
+    code += ' p; return a })'
     y = StreamPort(model, item_data_type)
-    y.write(code)
+    y.write_stage(s, code)
     y.bind_to_input()
     s.bind_to_output()
     return y
@@ -150,12 +146,11 @@ def release_resource(resource_port, stream_port):
     expect_same_model([r, s])
     model = r.get_model()
     item_data_type = s.get_item_data_type()
-    code = 'return $ mapStreamM (\\a -> do { R.releaseResource '
+    code = '(\\a -> do { R.releaseResource '
     code += r.read()
-    code += '; return a }) '
-    code += s.read()
+    code += '; return a })'
     y = StreamPort(model, item_data_type)
-    y.write(code)
+    y.write_stage(s, code)
     y.bind_to_input()
     s.bind_to_output()
     return y
@@ -173,14 +168,13 @@ def inc_resource(resource_port, expr, stream_port):
     if model.get_main_model() != e.get_model().get_main_model():
         raise InvalidPortException('Expected both the stream ' + s.get_name() + ' and the expression to belong to the same model')
     item_data_type = s.get_item_data_type()
-    code = 'return $ mapStreamM (\\a -> do { n <- liftEvent $ '
+    code = '(\\a -> do { n <- liftEvent $ '
     code += e.read('a')
     code += '; liftEvent $ R.incResourceCount '
     code += r.read()
-    code += ' n; return a }) '
-    code += s.read()
+    code += ' n; return a })'
     y = StreamPort(model, item_data_type)
-    y.write(code)
+    y.write_stage(s, code)
     y.bind_to_input()
     s.bind_to_output()
     return y
@@ -198,14 +192,13 @@ def dec_resource(resource_port, expr, stream_port):
     if model.get_main_model() != e.get_model().get_main_model():
         raise InvalidPortException('Expected both the stream ' + s.get_name() + ' and the expression to belong to the same model')
     item_data_type = s.get_item_data_type()
-    code = 'return $ mapStreamM (\\a -> do { n <- liftEvent $ '
+    code = '(\\a -> do { n <- liftEvent $ '
     code += e.read('a')
     code += '; R.decResourceCount '
     code += r.read()
-    code += ' n; return a }) '
-    code += s.read()
+    code += ' n; return a })'
     y = StreamPort(model, item_data_type)
-    y.write(code)
+    y.write_stage(s, code)
     y.bind_to_input()
     s.bind_to_output()
     return y
@@ -38,14 +38,13 @@ def request_preemptible_resource_with_priority(preemptible_resource_port, priori
     expect_same_model([r, s])
     model = r.get_model()
     item_data_type = s.get_item_data_type()
-    code = 'return $ mapStreamM (\\a -> do { p <- liftEvent $ '
+    code = '(\\a -> do { p <- liftEvent $ '
     code += priority_expr.read('a')
     code += '; PR.requestResourceWithPriority '
     code += r.read()
-    code += ' p; return a }) '
-    code += s.read()
+    code += ' p; return a })'
     y = StreamPort(model, item_data_type)
-    y.write(code)
+    y.write_stage(s, code)
     y.bind_to_input()
     s.bind_to_output()
     return y
@@ -62,14 +61,13 @@ def request_preemptible_resource_with_priority_in_parallel(preemptible_resource_
     expect_same_model([r, s])
     model = r.get_model()
     item_data_type = s.get_item_data_type()
-    code = 'return $ mapStreamM (\\a -> do { p <- liftEvent $ '
+    code = '(\\a -> do { p <- liftEvent $ '
     code += priority_expr.read('a')
     code += '; liftEvent $ runProcess $ PR.requestResourceWithPriority '
     code += r.read()
-    code += ' p; return a }) '
-    code += s.read()
+    code += ' p; return a })'
     y = StreamPort(model, item_data_type)
-    y.write(code)
+    y.write_stage(s, code)
     y.bind_to_input()
     s.bind_to_output()
     return y
@@ -83,12 +81,11 @@ def release_preemptible_resource(preemptible_resource_port, stream_port):
     expect_same_model([r, s])
     model = r.get_model()
     item_data_type = s.get_item_data_type()
-    code = 'return $ mapStreamM (\\a -> do { PR.releaseResource '
+    code = '(\\a -> do { PR.releaseResource '
     code += r.read()
-    code += '; return a }) '
-    code += s.read()
+    code += '; return a })'
     y = StreamPort(model, item_data_type)
-    y.write(code)
+    y.write_stage(s, code)
     y.bind_to_input()
     s.bind_to_output()
     return y
@@ -106,14 +103,13 @@ def inc_preemptible_resource(preemptible_resource_port, expr, stream_port):
     if model.get_main_model() != e.get_model().get_main_model():
         raise InvalidPortException('Expected both the stream ' + s.get_name() + ' and the expression to belong to the same model')
     item_data_type = s.get_item_data_type()
-    code = 'return $ mapStreamM (\\a -> do { n <- liftEvent $ '
+    code = '(\\a -> do { n <- liftEvent $ '
     code += e.read('a')
     code += '; liftEvent $ PR.incResourceCount '
     code += r.read()
-    code += ' n; return a }) '
-    code += s.read()
+    code += ' n; return a })'
     y = StreamPort(model, item_data_type)
-    y.write(code)
+    y.write_stage(s, code)
     y.bind_to_input()
     s.bind_to_output()
     return y
@@ -131,14 +127,13 @@ def dec_preemptible_resource(preemptible_resource_port, expr, stream_port):
     if model.get_main_model() != e.get_model().get_main_model():
         raise InvalidPortException('Expected both the stream ' + s.get_name() + ' and the expression to belong to the same model')
     item_data_type = s.get_item_data_type()
-    code = 'return $ mapStreamM (\\a -> do { n <- liftEvent $ '
+    code = '(\\a -> do { n <- liftEvent $ '
     code += e.read('a')
     code += '; liftEvent $ PR.decResourceCount '
     code += r.read()
-    code += ' n; return a }) '
-    code += s.read()
+    code += ' n; return a })'
     y = StreamPort(model, item_data_type)
-    y.write(code)
+    y.write_stage(s, code)
     y.bind_to_input()
     s.bind_to_output()
     return y
@@ -0,0 +1,227 @@
+# Copyright (c) 2017 David Sorokin <david.sorokin@gmail.com>
+#
+# Licensed under BSD3. See the LICENSE.txt file in the root of this distribution.
+
+import os
+import re
+import csv
+import math
+
+from simulation.aivika.modeler.model_sweep import decode_value_impl
+
+# NOTE: These views are added to the sharded experiment to save the data that can be merged.
+
+SHARD_FINAL_TABLE_TITLE = 'Shard Final Table'
+SHARD_TABLE_TITLE = 'Shard Table'
+
+_generator_seed_pattern = re.compile(r"^\(?\s*SimpleGeneratorWithSeed\s+(-?[0-9]+)\s*\)?$")
+
+def get_shard_ranges(run_count, shards):
+    """Return the list of (offset, count) pairs that split the runs into the specified number of shards."""
+    run_count = int(run_count)
+    shards = max(1, min(int(shards), run_count))
+    (size, rest) = divmod(run_count, shards)
+    ranges = []
+    offset = 0
+    for i in range(shards):
+        count = size + (1 if i < rest else 0)
+        ranges.append((offset, count))
+        offset += count
+    return ranges
+
+def get_shard_generator_type(generator_type, offset):
+    """Return the generator type of the shard, where the seed is shifted by the run offset so that shards differ."""
+    m = _generator_seed_pattern.match(generator_type.strip())
+    if m is None:
+        return generator_type
+    else:
+        return 'SimpleGeneratorWithSeed ' + str(int(m.group(1)) + offset)
+
+class SamplingStats:
+    """The statistics summary of the sampled values accumulated one by one."""
+
+    def __init__(self):
+        """Initializes a new instance."""
+        self.count = 0
+        self.mean = 0.0
+        self.sum2 = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        """Add the value to the statistics."""
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.sum2 += delta * (value - self.mean)
+        if (self.min is None) or (value < self.min):
+            self.min = value
+        if (self.max is None) or (value > self.max):
+            self.max = value
+
+    def get_variance(self):
+        """Return the unbiased variance."""
+        if self.count <= 1:
+            return 0.0
+        return self.sum2 / (self.count - 1)
+
+    def get_deviation(self):
+        """Return the standard deviation."""
+        return math.sqrt(self.get_variance())
+
+class ShardResults:
+    """The results of the experiment whose runs were split into shards, merged as if it were a single run.
+
+       The final values of all runs are numbered by their global run indices.
+       The statistics of the final values correspond to FinalStatsView and
+       the mean and deviation in every time point correspond to
+       DeviationChartView.
+    """
+
+    def __init__(self, ranges, statuses):
+        """Initializes a new instance by the run ranges and exit statuses of the shards."""
+        self._ranges = ranges
+        self._statuses = statuses
+        self._final_names = []
+        self._final_table = dict()
+        self._deviation_names = []
+        self._deviations = dict()
+
+    def get_ranges(self):
+        """Return the (offset, count) pairs of the shards."""
+        return self._ranges
+
+    def get_statuses(self):
+        """Return the exit statuses of the shards."""
+        return self._statuses
+
+    def get_failed_shards(self):
+        """Return the indices of the failed shards."""
+        return [i for (i, status) in enumerate(self._statuses) if status != 0]
+
+    def add_shard(self, shard, dirname):
+        """Add the data saved by the specified shard in the directory."""
+        (offset, count) = self._ranges[shard]
+        for (run, row) in _read_final_table(dirname).items():
+            for name in row:
+                if not (name in self._final_names):
+                    self._final_names.append(name)
+            self._final_table[offset + run] = row
+        for rows in _read_tables(dirname):
+            for (name, points) in rows.items():
+                if not (name in self._deviations):
+                    self._deviation_names.append(name)
+                    self._deviations[name] = dict()
+                for (t, value) in points:
+                    self._deviations[name].setdefault(t, SamplingStats()).add(value)
+
+    def get_final_names(self):
+        """Return the names of the final values."""
+        return list(self._final_names)
+
+    def get_final_table(self):
+        """Return a dictionary of the final values by the global run indices."""
+        return dict(self._final_table)
+
+    def get_final_stats(self, name):
+        """Return the statistics of the final values of the specified series in all runs."""
+        stats = SamplingStats()
+        for run in sorted(self._final_table):
+            value = self._final_table[run].get(name)
+            if isinstance(value, (int, float)):
+                stats.add(value)
+        return stats
+
+    def get_deviation_names(self):
+        """Return the names of the series whose deviation is known."""
+        return list(self._deviation_names)
+
+    def get_deviation(self, name):
+        """Return the list of (time, statistics) pairs of the specified series in all runs."""
+        points = self._deviations[name]
+        return [(t, points[t]) for t in sorted(points)]
+
+    def write(self, dirname, title = None):
+        """Write the merged report with the CSV files and index.html in the directory."""
+        if not os.path.exists(dirname):
+            os.makedirs(dirname)
+        with open(os.path.join(dirname, 'Final Table.csv'), 'w', newline = '') as file:
+            writer = csv.writer(file)
+            writer.writerow(['Run'] + self._final_names)
+            for run in sorted(self._final_table):
+                writer.writerow([run] + [self._final_table[run].get(name, '') for name in self._final_names])
+        with open(os.path.join(dirname, 'Final Stats.csv'), 'w', newline = '') as file:
+            writer = csv.writer(file)
+            writer.writerow(['Name', 'Count', 'Mean', 'Deviation', 'Min', 'Max'])
+            for name in self._final_names:
+                stats = self.get_final_stats(name)
+                writer.writerow([name, stats.count, stats.mean, stats.get_deviation(), stats.min, stats.max])
+        for (i, name) in enumerate(self._deviation_names):
+            with open(os.path.join(dirname, 'Deviation ' + str(i + 1) + '.csv'), 'w', newline = '') as file:
+                writer = csv.writer(file)
+                writer.writerow(['t', name + ' (mean)', name + ' (deviation)', name + ' (min)', name + ' (max)'])
+                for (t, stats) in self.get_deviation(name):
+                    writer.writerow([t, stats.mean, stats.get_deviation(), stats.min, stats.max])
+        with open(os.path.join(dirname, 'index.html'), 'w') as file:
+            self._write_html(file, title)
+
+    def _write_html(self, file, title):
+        """Write the HTML page of the merged report."""
+        if title is None:
+            title = 'Simulation Experiment'
+        file.write('<html>\n<head><meta charset="utf-8"><title>' + _escape_html(title) + '</title></head>\n<body>\n')
+        file.write('<h1>' + _escape_html(title) + '</h1>\n')
+        file.write('<p>The runs were split into ' + str(len(self._ranges)) + ' shards. ')
+        file.write('The reports of the shards are in the shard directories.</p>\n')
+        file.write('<h2>Final Statistics</h2>\n<table border="1">\n')
+        file.write('<tr><th>Name</th><th>Count</th><th>Mean</th><th>Deviation</th><th>Min</th><th>Max</th></tr>\n')
+        for name in self._final_names:
+            stats = self.get_final_stats(name)
+            cells = [name, str(stats.count), str(stats.mean), str(stats.get_deviation()), str(stats.min), str(stats.max)]
+            file.write('<tr>' + ''.join('<td>' + _escape_html(x) + '</td>' for x in cells) + '</tr>\n')
+        file.write('</table>\n')
+        file.write('<p><a href="Final Table.csv">Final Table</a>, <a href="Final Stats.csv">Final Statistics</a>')
+        for (i, name) in enumerate(self._deviation_names):
+            file.write(', <a href="Deviation ' + str(i + 1) + '.csv">Deviation of ' + _escape_html(name) + '</a>')
+        file.write('</p>\n</body>\n</html>\n')
+
+def _read_final_table(dirname):
+    """Read the final table saved by the shard and return a dictionary of the rows by the run indices."""
+    filename = os.path.join(dirname, SHARD_FINAL_TABLE_TITLE + '.csv')
+    rows = dict()
+    if not os.path.exists(filename):
+        return rows
+    lines = _read_csv(filename)
+    header = [x.strip() for x in lines[0]]
+    for line in lines[1:]:
+        rows[int(line[0]) - 1] = dict((name, decode_value_impl(value)) for (name, value) in zip(header[1:], line[1:]))
+    return rows
+
+def _read_tables(dirname):
+    """Read the tables saved by the shard for every run and return the lists of (time, value) pairs by the names."""
+    tables = []
+    if not os.path.isdir(dirname):
+        return tables
+    prefix = SHARD_TABLE_TITLE + ' - '
+    for name in sorted(os.listdir(dirname)):
+        if name.startswith(prefix) and name.endswith('.csv'):
+            lines = _read_csv(os.path.join(dirname, name))
+            header = [x.strip() for x in lines[0]]
+            rows = dict((x, []) for x in header[1:])
+            for line in lines[1:]:
+                t = float(line[0])
+                for (x, value) in zip(header[1:], line[1:]):
+                    value = decode_value_impl(value)
+                    if isinstance(value, (int, float)):
+                        rows[x].append((t, value))
+            tables.append(rows)
+    return tables
+
+def _read_csv(filename):
+    """Read the non-empty lines of the CSV file."""
+    with open(filename, newline = '') as file:
+        return [line for line in csv.reader(file) if len(line) > 0]
+
+def _escape_html(text):
+    """Escape the text inserted in HTML."""
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
@@ -2,8 +2,18 @@
 #
 # Licensed under BSD3. See the LICENSE.txt file in the root of this distribution.
 
+from simulation.aivika.modeler.util import *
+
 class Specs:
-    """The simulation specs."""
+    """The simulation specs.
+
+       The method and generator type can be overridden at launch time only
+       if the compiled model can read them back, i.e. the method is one of
+       Euler, RungeKutta2 and RungeKutta4 and the generator type is either
+       SimpleGenerator or SimpleGeneratorWithSeed with a non-negative seed,
+       possibly in parentheses. Other values such as a custom generator are
+       compiled into the model as is.
+    """
 
     def __init__(self, start_time, stop_time, dt,
                  method = 'RungeKutta4',
@@ -15,25 +25,70 @@ class Specs:
         self.method = method
         self.generator_type = generator_type
 
+    def get_launch_params(self):
+        """Return a dictionary of the parameter values that override the specs when the model is launched."""
+        params = { 'specs.start_time': self.start_time,
+                   'specs.stop_time': self.stop_time,
+                   'specs.dt': self.dt }
+        if can_launch_method(self.method):
+            params['specs.method'] = self.method
+        if can_launch_generator_type(self.generator_type):
+            params['specs.generator_type'] = self.generator_type
+        return params
+
     def write(self, file, indent = ''):
-        """Write the specs in the file."""
+        """Write the specs in the file, where the values can be overridden at launch time."""
         file.write(indent)
         file.write('Specs { spcStartTime = ')
-        file.write(str(self.start_time))
+        write_launch_param(file, 'specs.start_time', str(self.start_time))
         file.write(',\n')
         file.write(indent)
         file.write('        spcStopTime = ')
-        file.write(str(self.stop_time))
+        write_launch_param(file, 'specs.stop_time', str(self.stop_time))
         file.write(',\n')
         file.write(indent)
         file.write('        spcDT = ')
-        file.write(str(self.dt))
+        write_launch_param(file, 'specs.dt', str(self.dt))
         file.write(',\n')
         file.write(indent)
         file.write('        spcMethod = ')
-        file.write(self.method)
+        if can_launch_method(self.method):
+            write_launch_param(file, 'specs.method', self.method, read_func = _read_method)
+        else:
+            file.write(self.method)
         file.write(',\n')
         file.write(indent)
         file.write('        spcGeneratorType = ')
-        file.write(self.generator_type)
+        if can_launch_generator_type(self.generator_type):
+            write_launch_param(file, 'specs.generator_type', self.generator_type, read_func = _read_generator_type)
+        else:
+            file.write(self.generator_type)
         file.write(' }\n')
+
+def can_launch_method(method):
+    """Whether the integration method can be passed to the compiled model at launch time."""
+    return _get_launch_words(method) in [['Euler'], ['RungeKutta2'], ['RungeKutta4']]
+
+def can_launch_generator_type(generator_type):
+    """Whether the generator type can be passed to the compiled model at launch time."""
+    words = _get_launch_words(generator_type)
+    if words == ['SimpleGenerator']:
+        return True
+    elif (len(words) == 2) and (words[0] == 'SimpleGeneratorWithSeed'):
+        return words[1].isdigit()
+    else:
+        return False
+
+def _get_launch_words(value):
+    """Return the words of the value without parentheses as the compiled model reads them."""
+    return str(value).replace('(', ' ').replace(')', ' ').split()
+
+# NOTE: These functions read the values accepted by can_launch_method and can_launch_generator_type.
+
+_launch_words = '(words (map (\\c -> if c == \'(\' || c == \')\' then \' \' else c) x))'
+
+_read_method = ('(\\x -> case ' + _launch_words + ' of { ["Euler"] -> Just Euler; ["RungeKutta2"] -> Just RungeKutta2; ' +
+                '["RungeKutta4"] -> Just RungeKutta4; _ -> Nothing })')
+
+_read_generator_type = ('(\\x -> case ' + _launch_words + ' of { ["SimpleGenerator"] -> Just SimpleGenerator; ' +
+                        '["SimpleGeneratorWithSeed", n] | all (`elem` "0123456789") n -> Just (SimpleGeneratorWithSeed (read n)); _ -> Nothing })')
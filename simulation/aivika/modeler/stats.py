@@ -26,12 +26,7 @@ def add_sampling_stats(value_expr, stats_expr):
     model = v.get_model()
     if model.get_main_model() != s.get_model().get_main_model():
         raise InvalidExprException('Expected the both expressions to belong to the same model')
-    code = '(\\a -> do { v <- '
-    code += v.read('a')
-    code += '; stats <- '
-    code += s.read('a')
-    code += '; return $ addSamplingStats v stats })'
-    return Expr(model, code)
+    return ApplyExpr(model, 'addSamplingStats', [v, s])
 
 def add_timing_stats(value_expr, stats_expr):
     """Return an expression that adds the value to the specified time-persistent statistics."""
@@ -42,9 +37,4 @@ def add_timing_stats(value_expr, stats_expr):
     model = v.get_model()
     if model.get_main_model() != s.get_model().get_main_model():
         raise InvalidExprException('Expected the both expressions to belong to the same model')
-    code = '(\\a -> do { t <- liftDynamics time; v <- '
-    code += v.read('a')
-    code += '; stats <- '
-    code += s.read('a')
-    code += '; return $ addTimingStats t v stats })'
-    return Expr(model, code)
+    return ApplyExpr(model, 'addTimingStats', [time_expr(model), v, s])
@@ -78,7 +78,7 @@ def split_stream(count, stream_port):
     item_data_type = s.get_item_data_type()
     code0 = 'splitStream ' + str(count) + ' ' + s.read()
     code0 = 'fmap (listArray (0, ' + str(count) + ' - 1)) $ ' + code0
-    ys0 = StreamPort(model, item_data_type)
+    ys0 = PortOnce(model, ['Array', 'Int', s.get_data_type()])
     ys0.write(code0)
     ys0.bind_to_input()
     s.bind_to_output()
@@ -123,7 +123,7 @@ def clone_stream(count, stream_port):
     item_data_type = s.get_item_data_type()
     code0 = 'cloneStream ' + str(count) + ' ' + s.read()
     code0 = 'fmap (listArray (0, ' + str(count) + ' - 1)) $ ' + code0
-    ys0 = StreamPort(model, item_data_type)
+    ys0 = PortOnce(model, ['Array', 'Int', s.get_data_type()])
     ys0.write(code0)
     ys0.bind_to_input()
     s.bind_to_output()
@@ -171,12 +171,11 @@ def transform_stream(transform, stream_port):
     if model.get_main_model() != t.get_model().get_main_model():
         raise InvalidPortException('Expected both the stream ' + s.get_name() + ' and the transform to belong to the same model')
     item_data_type = s.get_item_data_type()
-    code = 'return $ mapStreamM (\\a -> liftEvent '
+    code = '(\\a -> liftEvent '
     code += t.read('a')
-    code += ') '
-    code += s.read()
+    code += ')'
     y = StreamPort(model, item_data_type)
-    y.write(code)
+    y.write_stage(s, code)
     y.bind_to_input()
     s.bind_to_output()
     return y
@@ -191,12 +190,11 @@ def within_stream(expr, stream_port):
     if model.get_main_model() != e.get_model().get_main_model():
         raise InvalidPortException('Expected both the stream ' + s.get_name() + ' and the expression to belong to the same model')
     item_data_type = s.get_item_data_type()
-    code = 'return $ mapStreamM (\\a -> liftEvent '
+    code = '(\\a -> liftEvent '
     code += e.read('a')
-    code += ' >> return a) '
-    code += s.read()
+    code += ' >> return a)'
     y = StreamPort(model, item_data_type)
-    y.write(code)
+    y.write_stage(s, code)
     y.bind_to_input()
     s.bind_to_output()
     return y
@@ -211,12 +209,11 @@ def hold_stream(expr, stream_port):
     if model.get_main_model() != e.get_model().get_main_model():
         raise InvalidPortException('Expected both the stream ' + s.get_name() + ' and the expression to belong to the same model')
     item_data_type = s.get_item_data_type()
-    code = 'return $ mapStreamM (\\a -> do { dt0 <- liftEvent $ '
+    code = '(\\a -> do { dt0 <- liftEvent $ '
     code += e.read('a')
-    code += '; holdProcess dt0; return a }) '
-    code += s.read()
+    code += '; holdProcess dt0; return a })'
     y = StreamPort(model, item_data_type)
-    y.write(code)
+    y.write_stage(s, code)
     y.bind_to_input()
     s.bind_to_output()
     return y
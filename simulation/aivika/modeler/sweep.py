@@ -0,0 +1,153 @@
+# Copyright (c) 2017 David Sorokin <david.sorokin@gmail.com>
+#
+# Licensed under BSD3. See the LICENSE.txt file in the root of this distribution.
+
+import csv
+import random
+import itertools
+
+class InvalidDesignException(Exception):
+    """Raised when the design of the parameter sweep is invalid."""
+
+    def __init__(self, message):
+        """Initializes a new instance."""
+        self.message = message
+
+def full_factorial_design(levels):
+    """Return the list of points that combine every level of every parameter.
+
+       The levels is a dictionary of the value lists by the parameter names.
+       The points are dictionaries of the parameter values.
+    """
+    names = sorted(levels)
+    for name in names:
+        if len(levels[name]) == 0:
+            raise InvalidDesignException('No levels of parameter ' + name)
+    return [dict(zip(names, values)) for values in itertools.product(*[levels[name] for name in names])]
+
+def latin_hypercube_design(ranges, count, seed = None):
+    """Return the list of points sampled by the Latin hypercube.
+
+       The ranges is a dictionary of the (low, high) pairs by the parameter
+       names. Every range is split into count intervals, each of which has
+       exactly one point. If both bounds are integers then the intervals are
+       made of the disjoint bins of integers, so that the values are distinct
+       as long as count does not exceed high - low + 1. Otherwise, every
+       integer is taken by almost the same number of points.
+    """
+    if count <= 0:
+        raise InvalidDesignException('The number of points must be positive: ' + str(count))
+    generator = random.Random(seed)
+    points = [dict() for i in range(count)]
+    for name in sorted(ranges):
+        (low, high) = ranges[name]
+        if low > high:
+            raise InvalidDesignException('Invalid range of parameter ' + name + ': ' + str((low, high)))
+        intervals = list(range(count))
+        generator.shuffle(intervals)
+        for (point, i) in zip(points, intervals):
+            if isinstance(low, int) and isinstance(high, int):
+                point[name] = low + _sample_int_bin(generator, high - low + 1, i, count)
+            else:
+                point[name] = low + (high - low) * (i + generator.random()) / count
+    return points
+
+def _sample_int_bin(generator, n, i, count):
+    """Return the integer from 0 to n - 1 sampled in the i-th of count bins."""
+    lo = - (- i * n // count)
+    hi = - (- (i + 1) * n // count)
+    if hi > lo:
+        return lo + generator.randrange(hi - lo)
+    else:
+        return i * n // count
+
+def explicit_design(points):
+    """Return the list of points given explicitly as dictionaries of the parameter values."""
+    points = [dict(point) for point in points]
+    if len(points) > 0:
+        names = set(points[0])
+        for point in points:
+            if set(point) != names:
+                raise InvalidDesignException('The points must define the same parameters: ' + str(sorted(names)))
+    return points
+
+class SweepResults:
+    """The columnar results of the parameter sweep.
+
+       Every row corresponds to one simulation run of one point. It contains
+       the point index, the parameter values, the run index and the final
+       values saved by FinalTableView.
+    """
+
+    def __init__(self, points, statuses):
+        """Initializes a new instance by the points and exit statuses."""
+        self._points = points
+        self._statuses = statuses
+        self._names = ['point'] + sorted(set(name for point in points for name in point)) + ['run']
+        self._columns = dict((name, []) for name in self._names)
+
+    def add_rows(self, point_index, rows):
+        """Add the rows of the final values by the run indices for the specified point."""
+        point = self._points[point_index]
+        for run in sorted(rows):
+            for name in rows[run]:
+                if not (name in self._columns):
+                    self._names.append(name)
+                    self._columns[name] = [None] * len(self)
+            for name in self._names:
+                if name == 'point':
+                    value = point_index
+                elif name == 'run':
+                    value = run
+                elif name in point:
+                    value = point[name]
+                else:
+                    value = rows[run].get(name)
+                self._columns[name].append(value)
+
+    def __len__(self):
+        """Return the number of rows."""
+        return len(self._columns['point'])
+
+    def get_points(self):
+        """Return the points of the sweep."""
+        return self._points
+
+    def get_statuses(self):
+        """Return the exit statuses of the points."""
+        return self._statuses
+
+    def get_failed_points(self):
+        """Return the indices of the points whose simulation failed."""
+        return [i for (i, status) in enumerate(self._statuses) if status != 0]
+
+    def get_names(self):
+        """Return the column names."""
+        return list(self._names)
+
+    def get_column(self, name):
+        """Return the column values by the name."""
+        return self._columns[name]
+
+    def get_columns(self):
+        """Return a dictionary of the columns by their names."""
+        return dict(self._columns)
+
+    def get_rows(self):
+        """Return the list of rows as dictionaries."""
+        return [dict((name, self._columns[name][i]) for name in self._names) for i in range(len(self))]
+
+    def write_csv(self, filename):
+        """Write the results in the CSV file."""
+        with open(filename, 'w', newline = '') as file:
+            writer = csv.writer(file)
+            writer.writerow(self._names)
+            for i in range(len(self)):
+                writer.writerow([_encode_csv_value(self._columns[name][i]) for name in self._names])
+
+def _encode_csv_value(value):
+    """Return the text of the value written in the CSV file."""
+    if value is None:
+        return ''
+    else:
+        return value
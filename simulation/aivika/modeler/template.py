@@ -0,0 +1,358 @@
+# Copyright (c) 2017 David Sorokin <david.sorokin@gmail.com>
+#
+# Licensed under BSD3. See the LICENSE.txt file in the root of this distribution.
+
+import re
+
+from simulation.aivika.modeler.model import *
+from simulation.aivika.modeler.port import *
+from simulation.aivika.modeler.data_type import *
+from simulation.aivika.modeler.util import *
+from simulation.aivika.modeler.model_reachability import get_referenced_vars_impl
+from simulation.aivika.modeler.model_split import TYPES_MODULE
+from simulation.aivika.modeler.model_split import TEMPLATE_MODULE_PREFIX
+
+_name_pattern = re.compile(r"^[A-Za-z][A-Za-z0-9_]*$")
+
+class SubModelTemplate(Model):
+    """The sub-model template written once as a typed function in its own Haskell module.
+
+       The builder is called only once with the template and its input
+       streams, returning the output stream, a list of output streams or None.
+       Every instance is a call of the function, whose code does not depend
+       on the rest of the model, so that the module of an unchanged template
+       is not recompiled when the model changes. Therefore, the template
+       cannot refer to the ports of the model, and its servers and random
+       streams are created by the transact type bound to the template with
+       bind_to_model.
+    """
+
+    def __init__(self, model, name, builder, input_types = []):
+        """Initializes a new template by the model, name, builder and item data types of the input streams."""
+        if _name_pattern.match(name) is None:
+            raise ModelException('Invalid template name: ' + name)
+        self._main_model = model.get_main_model()
+        self._name = name
+        self._input_types = list(input_types)
+        self._pragmas = set()
+        self._module_imports = set()
+        self._actions = []
+        self._sources = []
+        self._source_lists = []
+        self._var_names = set()
+        self._lazy_var_names = set()
+        self._pending_ports = []
+        self._hoisted_names = dict()
+        self._next_port_id = 1
+        self._next_submodel_id = 1
+        self._built = False
+        self._add_defaults()
+        self._build(builder)
+        self._main_model.add_template(self)
+
+    def _add_defaults(self):
+        """Add the defaults."""
+        self._pragmas.add('{-# LANGUAGE RecursiveDo #-}')
+        if self.get_base_comp() is None:
+            self._module_imports.add('import Simulation.Aivika')
+        else:
+            self._module_imports.add('import Simulation.Aivika.Trans')
+        self._module_imports.add('import Data.Monoid')
+        self._module_imports.add('import Data.Functor')
+        self._module_imports.add('import Control.Arrow')
+        self._module_imports.add('import Control.Monad')
+        self._module_imports.add('import Lib')
+
+    def get_name(self):
+        """Return the template name."""
+        return self._name
+
+    def get_module_name(self):
+        """Return the name of the module that defines the template."""
+        return TEMPLATE_MODULE_PREFIX + self._name[0].upper() + self._name[1:]
+
+    def get_function_name(self):
+        """Return the name of the function that creates an instance."""
+        return 'template' + self._name[0].upper() + self._name[1:]
+
+    def get_input_types(self):
+        """Return the item data types of the input streams."""
+        return self._input_types
+
+    def get_output_types(self):
+        """Return the item data types of the output streams."""
+        return [y.get_item_data_type() for y in self._outputs]
+
+    def get_main_model(self):
+        """Return the main model."""
+        return self._main_model
+
+    def get_base_comp(self):
+        """Return the basic computation type."""
+        return self._main_model.get_base_comp()
+
+    def get_var_prefix(self):
+        """Return the variable prefix."""
+        return '_tpl'
+
+    def is_source_prefix_mangled(self):
+        """Whether the source name prefix is mangled."""
+        return False
+
+    def get_source_prefix(self):
+        """Return the source name prefix, which the instance passes to the function."""
+        return ''
+
+    def new_port_id(self):
+        """Allocate a new port identifier unique within the template."""
+        port_id = self._next_port_id
+        self._next_port_id += 1
+        return port_id
+
+    def new_submodel_id(self):
+        """Allocate a new sub-model identifier unique within the template."""
+        submodel_id = self._next_submodel_id
+        self._next_submodel_id += 1
+        return submodel_id
+
+    def new_expr_id(self, key = None):
+        """Return the expression identifier by the specified structural key."""
+        return self._main_model.new_expr_id(key)
+
+    def add_pragma(self, pragma):
+        """Add the specified pragma."""
+        self._pragmas.add(pragma)
+        self._main_model.add_pragma(pragma)
+
+    def add_package_import(self, package):
+        """Add the specified package to import."""
+        self._main_model.add_package_import(package)
+
+    def add_package_location(self, package_location):
+        """Add the specified package location."""
+        self._main_model.add_package_location(package_location)
+
+    def add_extra_dep(self, extra_dep):
+        """Add the specified extra dependency."""
+        self._main_model.add_extra_dep(extra_dep)
+
+    def add_module_import(self, module):
+        """Add the specified module to import."""
+        self._module_imports.add(module)
+        self._main_model.add_module_import(module)
+
+    def add_var(self, name, comp, part = None):
+        """Add a new variable with the specified definition to the template code."""
+        self._require_not_built()
+        if name in self._var_names:
+            raise InvalidVariableException('Variable ' + name + ' is already defined')
+        self._lazy_var_names.discard(name)
+        self._var_names.add(name)
+        self._actions.append(name + ' <- ' + comp)
+
+    def hoist_expr(self, expr_id, comp):
+        """Bind the Event computation of the expression, evaluated once in the start time, and return the variable name."""
+        name = self._hoisted_names.get(expr_id)
+        if name is None:
+            name = '_tpl_expr_' + str(len(self._hoisted_names) + 1)
+            self._hoisted_names[expr_id] = name
+            self.add_var(name, 'runEventInStartTime $ ' + comp)
+        return name
+
+    def add_root_var(self, name):
+        """Do nothing, for every variable of the template code is kept."""
+        pass
+
+    def add_lazy_var(self, name):
+        """Add a new variable that will be defined lazily."""
+        if name in self._var_names:
+            raise InvalidVariableException('Variable ' + name + ' is already defined')
+        elif name in self._lazy_var_names:
+            raise InvalidVariableException('Variable ' + name + ' is already added as lazy')
+        else:
+            self._lazy_var_names.add(name)
+
+    def remove_lazy_var(self, name):
+        """Remove the lazy variable that will never be defined, for its definition was fused with another one."""
+        self._lazy_var_names.remove(name)
+
+    def add_action(self, action, part = None):
+        """Add the specified action to the template code."""
+        self._require_not_built()
+        self._actions.append(action)
+
+    def add_template_import(self, template):
+        """Import the module of the specified template, whose instance is created within this template."""
+        self._module_imports.add('import ' + template.get_module_name())
+
+    def add_port(self, port):
+        """Add the specified port for completeness test."""
+        self._main_model.add_port(port)
+
+    def add_pending_port(self, port):
+        """Add the specified port whose definition is deferred until it is read or the template is built."""
+        self._pending_ports.append(port)
+
+    def add_result_source(self, source):
+        """Add the specified result source of the template."""
+        self._require_not_built()
+        self._sources.append(source)
+
+    def add_result_sources(self, sources):
+        """Add the code of the result source list computed by the template."""
+        self._require_not_built()
+        self._source_lists.append(sources)
+
+    def encode_source_name(self, name):
+        """Return the code of the specified result source name prefixed by the instance name."""
+        return '(_tpl_prefix ++ ' + encode_str(name) + ')'
+
+    def add_param(self, param):
+        """Add the specified model parameter."""
+        self._main_model.add_param(param)
+
+    def add_transact_type(self, transact_type):
+        """Add the specified transact type."""
+        self._main_model.add_transact_type(transact_type)
+
+    def instantiate(self, model, stream_ports = [], name = None):
+        """Create an instance of the template in the model and return its output stream, list of output streams or None like the builder."""
+        ps = list(stream_ports)
+        if len(ps) != len(self._input_types):
+            raise ModelException('Expected template ' + self._name + ' to receive ' + str(len(self._input_types)) + ' input streams')
+        for (p, tp) in zip(ps, self._input_types):
+            expect_stream(p)
+            if encode_data_type(p.get_item_data_type()) != encode_data_type(tp):
+                raise InvalidPortException('Expected stream ' + p.get_name() + ' to have item data type ' + encode_data_type(tp))
+        for p in ps:
+            if p.get_model().get_main_model() != self._main_model:
+                raise InvalidPortException('Expected stream ' + p.get_name() + ' to belong to the model of template ' + self._name)
+        model.add_template_import(self)
+        var = model.get_var_prefix() + '_inst_' + str(model.new_submodel_id())
+        if (name is None) or model.is_source_prefix_mangled():
+            prefix = model.encode_source_name(var + '.')
+        else:
+            prefix = model.encode_source_name(model.get_source_prefix() + name + '.')
+        args = [self.get_function_name(), prefix]
+        for p in ps:
+            p.bind_to_output()
+            args.append(p.read())
+        model.add_var(var, ' '.join(args))
+        model.add_root_var(var)
+        count = len(self._outputs)
+        if count == 0:
+            sources = var
+        else:
+            sources = _get_selector(count, 0) + ' ' + var
+        if self.has_result_sources():
+            model.add_result_sources(sources)
+        ys = []
+        for (i, output) in enumerate(self._outputs):
+            y = StreamPort(model, output.get_item_data_type())
+            y.write('return $ ' + _get_selector(count, i + 1) + ' ' + var)
+            y.bind_to_input()
+            ys.append(y)
+        if self._output_kind is None:
+            return None
+        elif self._output_kind == 'list':
+            return ys
+        else:
+            return ys[0]
+
+    def has_result_sources(self):
+        """Whether the instances return any result sources."""
+        return (len(self._sources) > 0) or (len(self._source_lists) > 0)
+
+    def write(self, file):
+        """Write the module code of the template in the specified file."""
+        for pragma in sorted(self._pragmas):
+            file.write(pragma)
+            file.write('\n')
+        file.write('\n')
+        file.write('-- NOTE: This file was auto-generated by aivika-modeler 1.0\n')
+        file.write('\n')
+        file.write('module ' + self.get_module_name() + ' (' + self.get_function_name() + ') where\n')
+        file.write('\n')
+        for module_import in sorted(self._module_imports):
+            file.write(module_import)
+            file.write('\n')
+        file.write('import ' + TYPES_MODULE + '\n')
+        file.write('\n')
+        base_comp = self.get_base_comp()
+        source_type = 'ResultSource'
+        comp_type = 'Simulation'
+        if not (base_comp is None):
+            source_type += ' ' + base_comp
+            comp_type += ' ' + base_comp
+        types = ['String']
+        for p in self._inputs:
+            types.append(encode_data_type(p.get_data_type()))
+        result_types = ['[' + source_type + ']']
+        for y in self._outputs:
+            result_types.append(encode_data_type(y.get_data_type()))
+        if len(result_types) == 1:
+            types.append(comp_type + ' ' + result_types[0])
+        else:
+            types.append(comp_type + ' (' + ', '.join(result_types) + ')')
+        func = self.get_function_name()
+        file.write(func + ' :: ' + ' -> '.join(types) + '\n')
+        file.write(' '.join([func, '_tpl_prefix'] + self._input_vars) + ' =\n')
+        file.write('  mdo --\n')
+        for action in self._actions:
+            file.write('      ' + action + '\n')
+        sources = '[' + ', '.join(self._sources) + ']'
+        for code in self._source_lists:
+            sources += ' ++ ' + code
+        if len(self._outputs) == 0:
+            file.write('      return ' + sources + '\n')
+        else:
+            file.write('      return (' + ', '.join([sources] + [y.read() for y in self._outputs]) + ')\n')
+
+    def _build(self, builder):
+        """Call the builder and keep the template code."""
+        self._input_vars = ['_tpl_input_' + str(i + 1) for i in range(len(self._input_types))]
+        self._inputs = []
+        for (tp, var) in zip(self._input_types, self._input_vars):
+            x = StreamPort(self, tp)
+            x.write('return ' + var)
+            x.bind_to_input()
+            self._inputs.append(x)
+        ys = builder(self, *self._inputs)
+        if ys is None:
+            self._output_kind = None
+            ys = []
+        elif isinstance(ys, (list, tuple)):
+            self._output_kind = 'list'
+            ys = list(ys)
+        else:
+            self._output_kind = 'port'
+            ys = [ys]
+        for y in ys:
+            expect_stream(y)
+            if y.get_model() is not self:
+                raise ModelException('Expected the output stream ' + y.get_name() + ' to belong to template ' + self._name)
+        ports = self._pending_ports
+        self._pending_ports = []
+        for port in ports:
+            port.flush()
+        for name in sorted(self._lazy_var_names):
+            raise InvalidVariableException('Variable ' + name + ' is used but not defined')
+        for y in ys:
+            y.bind_to_output()
+        self._outputs = ys
+        for action in self._actions:
+            for name in get_referenced_vars_impl(action, self._main_model._var_names):
+                raise ModelException('Template ' + self._name + ' cannot refer to variable ' + name + ' of the model')
+        self._built = True
+
+    def _require_not_built(self):
+        """Raise an exception if the template is already built."""
+        if self._built:
+            raise ModelException('Template ' + self._name + ' is already built')
+
+def _get_selector(count, index):
+    """Return the function that selects the specified item of the tuple returned by the template function."""
+    if count == 1:
+        return 'fst' if index == 0 else 'snd'
+    else:
+        return '(\\ (' + ', '.join(['x' if i == index else '_' for i in range(count + 1)]) + ') -> x)'
@@ -12,6 +12,24 @@ def encode_str(str):
     str = '"' + str + '"'
     return str
 
+def write_masked(file, text):
+    """Write the text that the digest of the file ignores if the file computes it."""
+    if hasattr(file, 'write_masked'):
+        file.write_masked(text)
+    else:
+        file.write(text)
+
+def write_launch_param(file, name, value, read_func = None):
+    """Write the code that reads the parameter overridden at launch time, where the default value is masked."""
+    if read_func is None:
+        file.write('modelParam ')
+    else:
+        file.write('modelParamBy ' + read_func + ' ')
+    file.write(encode_str(name))
+    file.write(' (')
+    write_masked(file, value)
+    file.write(')')
+
 def encode_maybe(encode_func, value):
     """Encode the value."""
     if value is None:
@@ -0,0 +1,3 @@
+import Distribution.Simple
+main = defaultMain
+
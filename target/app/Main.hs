@@ -0,0 +1,126 @@
+{-# LANGUAGE RecursiveDo #-}
+
+-- NOTE: This file was auto-generated by aivika-modeler 1.0
+
+import Control.Arrow
+import Control.Monad
+import Data.Functor
+import Data.Maybe
+import Data.Monoid
+import Graphics.Rendering.Chart.Backend.Diagrams
+import Lib
+import Simulation.Aivika
+import Simulation.Aivika.Experiment
+import Simulation.Aivika.Experiment.Base
+import Simulation.Aivika.Experiment.Chart
+import Simulation.Aivika.Experiment.Chart.Backend.Diagrams
+import qualified Simulation.Aivika.Queue as Q
+
+specs =
+  Specs { spcStartTime = modelParam "specs.start_time" (0),
+          spcStopTime = modelParam "specs.stop_time" (100),
+          spcDT = modelParam "specs.dt" (0.1),
+          spcMethod = modelParamBy (\x -> lookup x [("Euler", Euler), ("RungeKutta2", RungeKutta2), ("RungeKutta4", RungeKutta4)]) "specs.method" (RungeKutta4),
+          spcGeneratorType = modelParamBy (\x -> case words x of { ["SimpleGenerator"] -> Just SimpleGenerator; ["SimpleGeneratorWithSeed", n] -> Just (SimpleGeneratorWithSeed (read n)); _ -> Nothing }) "specs.generator_type" (SimpleGenerator) }
+
+type Transact = Arrival Transact_Impl
+
+data Transact_Impl = Transact_Impl
+
+model =
+  mdo --
+      _port_1 <- return $ mapStream (\a -> (a { arrivalValue = Transact_Impl { } })) $ randomUniformStream 3 7
+      _user_queue <- (runEventInStartTime $ Q.newQueue FCFS FCFS FCFS 10) :: Simulation (Q.Queue FCFS FCFS FCFS Transact)
+      runProcessInStartTime $ consumeStream (liftEvent . Q.enqueueOrLost_ _user_queue) _port_1
+      _user_server <- newPreemptibleRandomUniformServer False 1 2
+      _user_arrivalTimer <- newArrivalTimer
+      _port_2 <- return $ repeatProcess (Q.dequeue _user_queue)
+      _port_3 <- return $ runProcessor (serverProcessor _user_server) _port_2
+      _port_4 <- return $ runProcessor (arrivalTimerProcessor _user_arrivalTimer) _port_3
+      runProcessInStartTime $ sinkStream _port_4
+      return $
+        results
+        [resultSource "queue" "The input queue" _user_queue,
+         resultSource "server" "The server" _user_server,
+         resultSource "arrivalTimer" "The arrival timer" _user_arrivalTimer]
+
+experiment =
+  defaultExperiment {
+    experimentSpecs = specs,
+    experimentRunCount = modelParam "experiment.run_count" (3) }
+
+generators :: ChartRendering r => [WebPageGenerator r]
+generators =
+  [outputView $ defaultExperimentSpecsView {
+     experimentSpecsTitle = "Testing Experiment Title",
+     experimentSpecsDescription = "Some long description follows..." },
+   outputView $ defaultInfoView {
+     infoTitle = "Testing InfoView Title",
+     infoDescription = "Testing InfoView Description",
+     infoSeries = (resultByName "arrivalTimer") <>
+       (resultByName "queue") <>
+       (resultByName "server") },
+   outputView $ defaultDeviationChartView {
+     deviationChartTitle = "Testing DeviationChartView Title",
+     deviationChartDescription = "Testing DeviationChartView Description",
+     deviationChartWidth = 800,
+     deviationChartHeight = 500,
+     deviationChartLeftYSeries = (resultByName "arrivalTimer" >>> resultById ArrivalProcessingTimeId),
+     deviationChartRightYSeries = (resultByName "server" >>> resultById ServerProcessingTimeId),
+     deviationChartPlotTitle = "Testing Plot Title" },
+   outputView $ defaultTimeSeriesView {
+     timeSeriesTitle = "Testing TimeSeriesView Title",
+     timeSeriesDescription = "Testing TimeSeriesView Description",
+     timeSeriesWidth = 800,
+     timeSeriesHeight = 500,
+     timeSeriesLeftYSeries = (resultByName "arrivalTimer" >>> resultById ArrivalProcessingTimeId >>> expandResults >>> resultById SamplingStatsMinId) <>
+       (resultByName "arrivalTimer" >>> resultById ArrivalProcessingTimeId >>> expandResults >>> resultById SamplingStatsMaxId),
+     timeSeriesRightYSeries = (resultByName "arrivalTimer" >>> resultById ArrivalProcessingTimeId >>> expandResults >>> resultById SamplingStatsMeanId),
+     timeSeriesPlotTitle = "Testing Plot Title",
+     timeSeriesRunPlotTitle = "$PLOT_TITLE / Run $RUN_INDEX of $RUN_COUNT" },
+   outputView $ defaultXYChartView {
+     xyChartTitle = "Testing XYChartView Title",
+     xyChartDescription = "Testing XYChartView Description",
+     xyChartWidth = 800,
+     xyChartHeight = 500,
+     xyChartXSeries = (resultByName "arrivalTimer" >>> resultById ArrivalProcessingTimeId >>> expandResults >>> resultById SamplingStatsMeanId),
+     xyChartLeftYSeries = (resultByName "arrivalTimer" >>> resultById ArrivalProcessingTimeId >>> expandResults >>> resultById SamplingStatsMinId) <>
+       (resultByName "arrivalTimer" >>> resultById ArrivalProcessingTimeId >>> expandResults >>> resultById SamplingStatsMaxId),
+     xyChartRightYSeries = (resultByName "arrivalTimer" >>> resultById ArrivalProcessingTimeId >>> expandResults >>> resultById SamplingStatsMeanId),
+     xyChartPlotTitle = "Testing Plot Title",
+     xyChartRunPlotTitle = "$PLOT_TITLE / Run $RUN_INDEX of $RUN_COUNT" },
+   outputView $ defaultFinalXYChartView {
+     finalXYChartTitle = "Testing FinalXYChartView Title",
+     finalXYChartDescription = "Testing FinalXYChartView Description",
+     finalXYChartWidth = 800,
+     finalXYChartHeight = 500,
+     finalXYChartXSeries = (resultByName "arrivalTimer" >>> resultById ArrivalProcessingTimeId >>> expandResults >>> resultById SamplingStatsMeanId),
+     finalXYChartLeftYSeries = (resultByName "arrivalTimer" >>> resultById ArrivalProcessingTimeId >>> expandResults >>> resultById SamplingStatsMinId) <>
+       (resultByName "arrivalTimer" >>> resultById ArrivalProcessingTimeId >>> expandResults >>> resultById SamplingStatsMaxId),
+     finalXYChartRightYSeries = (resultByName "arrivalTimer" >>> resultById ArrivalProcessingTimeId >>> expandResults >>> resultById SamplingStatsMeanId),
+     finalXYChartPlotTitle = "Testing Plot Title" },
+   outputView $ defaultHistogramView {
+     histogramTitle = "Testing HistogramView Title",
+     histogramDescription = "Testing HistogramView Description",
+     histogramWidth = 800,
+     histogramHeight = 500,
+     histogramSeries = (resultByName "arrivalTimer" >>> resultById ArrivalProcessingTimeId >>> expandResults >>> resultById SamplingStatsMeanId),
+     histogramPlotTitle = "Testing Plot Title",
+     histogramRunPlotTitle = "$PLOT_TITLE / Run $RUN_INDEX of $RUN_COUNT" },
+   outputView $ defaultFinalHistogramView {
+     finalHistogramTitle = "Testing FinalHistogramView Title",
+     finalHistogramDescription = "Testing FinalHistogramView Description",
+     finalHistogramWidth = 800,
+     finalHistogramHeight = 500,
+     finalHistogramSeries = (resultByName "arrivalTimer" >>> resultById ArrivalProcessingTimeId >>> expandResults >>> resultById SamplingStatsMeanId),
+     finalHistogramPlotTitle = "Testing Plot Title" }]
+
+main =
+  do putStrLn "Loading SVG fonts..."
+     fonts <- loadCommonFonts
+     putStrLn "Loaded."
+     putStrLn "Started running the simulation and saving the results..."
+     let renderer = DiagramsRenderer SVG (return fonts)
+         path     = WritableFilePath (modelParamBy Just "experiment.path" ("/root/package/experiment(2)"))
+     runExperimentParallel experiment generators (WebPageRenderer renderer path) model
+
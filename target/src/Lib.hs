@@ -0,0 +1,59 @@
+module Lib (modelParam, modelParamBy) where
+
+import Data.Char
+import System.Environment
+import System.IO.Unsafe
+
+-- | The model parameters given by the command line arguments
+-- --param NAME=VALUE and --params FILE, where FILE contains a flat
+-- JSON object. The later values override the former ones.
+{-# NOINLINE modelParams #-}
+modelParams :: [(String, String)]
+modelParams = unsafePerformIO $ fmap reverse $ getArgs >>= readParams
+
+-- | Return the value of the model parameter or the default one.
+modelParam :: Read a => String -> a -> a
+modelParam = modelParamBy readValue
+  where readValue value =
+          case reads value of
+            [(x, rest)] | all isSpace rest -> Just x
+            _ -> Nothing
+
+-- | Return the value of the model parameter read by the specified
+-- function or the default one.
+modelParamBy :: (String -> Maybe a) -> String -> a -> a
+modelParamBy f name def =
+  case lookup name modelParams of
+    Nothing -> def
+    Just value ->
+      case f value of
+        Just x -> x
+        Nothing -> error $ "Invalid value of the model parameter " ++ name ++ ": " ++ value
+
+readParams :: [String] -> IO [(String, String)]
+readParams ("--param" : x : xs) =
+  do ys <- readParams xs
+     let (name, value) = break (== '=') x
+     return ((name, drop 1 value) : ys)
+readParams ("--params" : file : xs) =
+  do contents <- readFile file
+     ys <- readParams xs
+     return (parseParams contents ++ ys)
+readParams (_ : xs) = readParams xs
+readParams [] = return []
+
+parseParams :: String -> [(String, String)]
+parseParams contents =
+  map parseField $ filter (any (not . isSpace)) $ splitFields $ filter (`notElem` "{}") contents
+    where splitFields s =
+            case break (== ',') s of
+              (x, []) -> [x]
+              (x, _ : s') -> x : splitFields s'
+          parseField x =
+            let (name, value) = break (== ':') x
+            in (unquote name, readValue $ unquote $ drop 1 value)
+          unquote = filter (/= '"') . trim
+          trim = dropWhile isSpace . reverse . dropWhile isSpace . reverse
+          readValue "true" = "True"
+          readValue "false" = "False"
+          readValue value = value
@@ -0,0 +1,88 @@
+#!/usr/local/bin/python3
+
+# NOTE: It checks that the models are built and run concurrently by the
+#       asynchronous API without changing the current directory. The
+#       fake backend only records the commands, which is why the test
+#       does not require Stack.
+
+import os
+import sys
+import asyncio
+import tempfile
+
+from simulation.aivika.modeler import *
+
+def create_model(mean_delay):
+    """Create a simple model."""
+    model = MainModel()
+    data_type = TransactType(model, 'Transact')
+    input_stream = exponential_random_stream(data_type, mean_delay)
+    terminate_stream(input_stream)
+    return model
+
+specs = Specs(0, 100, 0.1)
+
+tmpdir = tempfile.mkdtemp()
+cwd = os.getcwd()
+
+backend = FakeBackend(output = 'done\n', delay = 0.1)
+
+loop = asyncio.new_event_loop()
+asyncio.set_event_loop(loop)
+
+async def run_models():
+    models = [create_model(0.5 + i) for i in range(8)]
+    dirnames = [tmpdir + '/target' + str(i) for i in range(8)]
+    tasks = [model.run_async(specs, dirname = dirname, backend = backend) for (model, dirname) in zip(models, dirnames)]
+    return await asyncio.gather(*tasks)
+
+outputs = loop.run_until_complete(run_models())
+
+assert os.getcwd() == cwd, 'Expected the current directory to be kept'
+assert all(output.get_status() == 0 for output in outputs), 'Expected the successful runs'
+assert all(output.get_stdout() == 'done\n' * 2 for output in outputs), 'Expected the captured output'
+
+builds = [cwd for (cwd, args) in backend.get_commands() if args == ['stack', 'build']]
+assert sorted(builds) == [tmpdir + '/target' + str(i) for i in range(8)], 'Expected every project to be built in its directory'
+
+slow_backend = FakeBackend(delay = 10)
+try:
+    loop.run_until_complete(create_model(1.0).compile_async(specs, dirname = tmpdir + '/slow', backend = slow_backend, timeout = 0.2))
+    assert False, 'Expected the timeout'
+except asyncio.TimeoutError:
+    pass
+
+lines = []
+
+async def capture():
+    args = [sys.executable, '-c', 'import sys; print("out"); sys.stderr.write("err\\n")']
+    return await StackBackend().call_async(args, cwd = tmpdir, write = lambda stream, line: lines.append((stream, line)))
+
+assert loop.run_until_complete(capture()) == 0, 'Expected the successful command'
+assert sorted(lines) == [('stderr', 'err\n'), ('stdout', 'out\n')], 'Expected the captured streams'
+
+async def cancel():
+    marker = tmpdir + '/finished'
+    args = [sys.executable, '-c', 'import time; time.sleep(5); open(' + repr(marker) + ', "w").close()']
+    task = asyncio.ensure_future(StackBackend().call_async(args))
+    await asyncio.sleep(0.5)
+    task.cancel()
+    try:
+        await task
+        assert False, 'Expected the cancellation'
+    except asyncio.CancelledError:
+        pass
+    await asyncio.sleep(0.1)
+    return os.path.exists(marker)
+
+assert not loop.run_until_complete(cancel()), 'Expected the command to be killed'
+
+experiment = Experiment(ExperimentRendererUsingDiagrams([InfoView()]), run_count = 10, shards = 2)
+
+try:
+    loop.run_until_complete(create_model(1.0).run_async(specs, experiment, dirname = tmpdir + '/shards', backend = backend))
+    assert False, 'Expected the experiment split into shards to be rejected'
+except ModelException as e:
+    assert 'run_shards' in e.message
+
+loop.close()
@@ -0,0 +1,87 @@
+#!/usr/local/bin/python3
+
+# NOTE: It checks the commands that the model passes to the build
+#       backend. The fake backend only records them, which is why
+#       the test does not require Stack.
+
+import os
+import tempfile
+
+from simulation.aivika.modeler import *
+
+model = MainModel()
+
+data_type = TransactType(model, 'Transact')
+
+input_stream = uniform_random_stream(data_type, 3, 7)
+terminate_stream(input_stream)
+
+specs = Specs(0, 100, 0.1)
+
+tmpdir = tempfile.mkdtemp()
+dirname = tmpdir + '/target'
+
+# the fake install root, which every fake command prints
+install_root = tmpdir + '/install'
+os.makedirs(install_root + '/bin')
+executable = install_root + '/bin/modeling-project-exe'
+open(executable, 'w').close()
+
+backend = FakeBackend(output = install_root + '\n')
+
+model.run(specs, dirname = dirname, backend = backend)
+model.run(specs, dirname = dirname, backend = backend)
+model.compile(specs, dirname = dirname, profile = 'dev', backend = backend)
+
+commands = [args for (cwd, args) in backend.get_commands()]
+assert commands == [['stack', 'build'],
+                    ['stack', 'path', '--local-install-root'],
+                    [executable] + get_param_args(specs.get_launch_params()),
+                    [executable] + get_param_args(specs.get_launch_params()),
+                    ['stack', '--work-dir', '.stack-work-dev', 'build', '--flag', 'modeling-project:dev']], 'Expected the build to be skipped when the project has not changed'
+
+assert model.executable_path(dirname = dirname, backend = backend) == executable, 'Expected the cached executable path'
+
+set_default_backend(FakeBackend(status = 1))
+assert model.compile(specs, dirname = dirname, profile = 'max') == 1, 'Expected the status of the default backend'
+set_default_backend(None)
+
+ghc = GhcBackend(package_dbs = ['/packages'])
+assert ghc.get_build_command('dev')[-3:] == ['-package-db', '/packages', 'app/Main.hs'], 'Expected the package database'
+assert '-O0' in ghc.get_build_command('dev'), 'Expected the options of the profile'
+
+assert backend.get_output().startswith(install_root + '\n'), 'Expected the output of the fake commands to be captured'
+
+class IdentityBackend(FakeBackend):
+    """The fake backend with its own toolchain identity."""
+
+    def get_identity(self):
+        """Return the toolchain identity."""
+        return 'identity'
+
+model.generate(specs, dirname = dirname, backend = backend)
+fingerprint = model.get_fingerprint()
+model.generate(specs, dirname = dirname, backend = IdentityBackend())
+assert model.get_fingerprint() != fingerprint, 'Expected the fingerprint of the backend that builds the project'
+
+assert len(ghc.get_exec_command('dev')) == 1, 'Expected no arguments by default'
+assert ghc.get_exec_command('dev', ['--param', 'x=1'])[1:] == ['--param', 'x=1'], 'Expected the arguments'
+
+try:
+    BuildBackend()
+    assert False, 'Expected the abstract backend not to be instantiated'
+except TypeError:
+    pass
+
+assert not ('-dshow-passes' in ghc.get_build_command('dev', split_modules = True)), 'Expected the compile times not to be measured by default'
+assert '-dshow-passes' in ghc.get_build_command('dev', split_modules = True, compile_times = True), 'Expected the compile times to be measured on request'
+
+model.generate(specs, dirname = dirname, split_modules = True)
+with open(dirname + '/modeling-project.cabal') as file:
+    cabal_code = file.read()
+assert '  ghc-options:         -j\n' in cabal_code, 'Expected the modules compiled in parallel without reporting the passes'
+
+model.compile(specs, dirname = dirname, split_modules = True, backend = FakeBackend(), compile_times = True)
+with open(dirname + '/modeling-project.cabal') as file:
+    cabal_code = file.read()
+assert '  ghc-options:         -j -dshow-passes\n' in cabal_code, 'Expected the passes reported for the compile times'
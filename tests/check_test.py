@@ -0,0 +1,63 @@
+#!/usr/local/bin/python3
+
+# NOTE: It checks that the compiler diagnostics are mapped back to
+#       the ports of the model. The compiler output is given as is,
+#       which is why the test does not require Stack.
+
+import tempfile
+
+from simulation.aivika.modeler import *
+from simulation.aivika.modeler.model_check import parse_diagnostics_impl
+from simulation.aivika.modeler.model_check import locate_diagnostics_impl
+
+model = MainModel()
+
+data_type = TransactType(model, 'Transact')
+
+input_stream = uniform_random_stream(data_type, 3, 7)
+
+queue = create_queue(model, data_type, 10, name = 'queue')
+queue_source = queue.add_result_source()
+
+enqueue_stream_or_remove_item(queue, input_stream)
+
+output_stream = dequeue_stream(queue)
+terminate_stream(output_stream)
+
+specs = Specs(0, 100, 0.1)
+
+dirname = tempfile.mkdtemp()
+model.generate(specs, dirname = dirname)
+
+with open(dirname + '/app/Main.hs') as file:
+    lines = file.read().splitlines()
+
+line_no = 1 + [i for (i, line) in enumerate(lines) if line.strip().startswith('_user_queue <- ')][0]
+
+output = """[1 of 1] Compiling Main             ( app/Main.hs, nothing )
+
+app/Main.hs:""" + str(line_no) + """:7: error:
+    • Couldn't match type ‘Int’ with ‘Transact’
+      Expected type: Simulation (Q.Queue FCFS FCFS FCFS Transact)
+    • In a stmt of an 'mdo' block
+
+app/Main.hs:(3,1)-(4,10): warning: [-Wmissing-signatures]
+    Top-level binding with no type signature
+"""
+
+diagnostics = parse_diagnostics_impl(output)
+assert len(diagnostics) == 2, 'Expected two diagnostics'
+
+locate_diagnostics_impl(diagnostics, dirname, model._var_names, model._get_port_names())
+
+error = diagnostics[0]
+assert error.is_error(), 'Expected an error'
+assert error.get_line() == line_no, 'Expected the line of the queue'
+assert error.get_column() == 7, 'Expected the column of the error'
+assert error.get_port_names() == ['queue'], 'Expected the queue port'
+assert error.get_message().startswith('• Couldn\'t match type'), 'Expected the compiler message'
+
+warning = diagnostics[1]
+assert not warning.is_error(), 'Expected a warning'
+assert warning.get_line() == 3, 'Expected the start line of the span'
+assert warning.get_port_names() == [], 'Expected no ports'
@@ -0,0 +1,71 @@
+#!/usr/local/bin/python3
+
+# NOTE: It checks that the same model is always translated into the same
+#       Haskell code, whether it is built twice in one Python session or
+#       in two sessions with different hash seeds.
+
+import os
+import sys
+import subprocess
+import tempfile
+
+from simulation.aivika.modeler import *
+
+def build_model():
+    """Build the model to be translated."""
+    model = MainModel()
+    submodel = SubModel(model, name = 'submodel')
+
+    data_type = TransactType(model, 'Transact')
+    field = Attr(data_type, 'field', 0)
+    optional_field = OptionalAttr(data_type, 'optional_field')
+
+    input_stream = exponential_random_stream(data_type, 0.4)
+    input_stream = transform_stream(field.expr_transform(time_expr(model)), input_stream)
+
+    queue = create_queue(submodel, data_type, 4, name = 'queue')
+    queue_source = queue.add_result_source()
+    enqueue_stream_or_remove_item(queue, input_stream)
+
+    resource = create_resource(model, 2, name = 'resource')
+    resource_source = resource.add_result_source()
+
+    server = exponential_random_server(data_type, 0.25, name = 'server')
+    server_source = server.add_result_source()
+
+    stream = dequeue_stream(queue)
+    stream = request_resource(resource, stream)
+    stream = server_stream(server, stream)
+    stream = release_resource(resource, stream)
+    (stream1, stream2) = split_stream(2, stream)
+    terminate_stream(stream1)
+    stream2 = transform_stream(optional_field.assign_transform(1), stream2)
+    terminate_stream(stream2)
+
+    return model
+
+def generate_code(dirname):
+    """Generate the model code in the specified directory and return it."""
+    model = build_model()
+    specs = Specs(0, 100, 0.1)
+    model.generate(specs, dirname = dirname)
+    with open(dirname + '/app/Main.hs') as file:
+        return file.read()
+
+if len(sys.argv) > 2 and sys.argv[1] == '--print':
+    sys.stdout.write(generate_code(sys.argv[2]))
+    sys.exit(0)
+
+tmpdir = tempfile.mkdtemp()
+
+code1 = generate_code(tmpdir + '/session1')
+build_model()
+code2 = generate_code(tmpdir + '/session2')
+assert code1 == code2, 'Expected the same code when building the model twice'
+
+for seed in ['1', '2']:
+    env = dict(os.environ)
+    env['PYTHONHASHSEED'] = seed
+    dirname = tmpdir + '/process' + seed
+    output = subprocess.check_output([sys.executable, __file__, '--print', dirname], env = env)
+    assert output.decode('utf-8') == code1, 'Expected the same code in another process'
@@ -0,0 +1,88 @@
+#!/usr/local/bin/python3
+
+# NOTE: It checks that the executor ships the compiled model to the
+#       workers, retries the failed shards and merges the results. The
+#       local processes stand in for the hosts and the compiled model is
+#       a script that writes the tables of the shard views, which is why
+#       the test does not require Stack.
+
+import os
+import sys
+import stat
+import tempfile
+
+from simulation.aivika.modeler import *
+
+model_script = """#!{python}
+import os, sys
+params = dict(sys.argv[i + 1].split('=', 1) for i in range(len(sys.argv) - 1) if sys.argv[i] == '--param')
+path = params['experiment.path']
+seed = int(params['specs.generator_type'].split()[1])
+marker = os.path.join({tmpdir!r}, 'failed-' + str(seed))
+if seed == 104 and not os.path.exists(marker):
+    open(marker, 'w').close()
+    sys.exit(1)
+os.makedirs(path, exist_ok = True)
+with open(os.path.join(path, {title!r} + '.csv'), 'w') as file:
+    file.write('"Run","queue.count"\\n')
+    for run in range(int(params['experiment.run_count'])):
+        file.write(str(run + 1) + ',' + str(seed + run) + '\\n')
+"""
+
+model = MainModel()
+
+data_type = TransactType(model, 'Transact')
+
+input_stream = exponential_random_stream(data_type, 0.4)
+
+queue = create_queue(model, data_type, 10, name = 'queue')
+queue_source = queue.add_result_source()
+
+enqueue_stream_or_remove_item(queue, input_stream)
+
+output_stream = dequeue_stream(queue)
+terminate_stream(output_stream)
+
+specs = Specs(0, 100, 0.1, generator_type = 'SimpleGeneratorWithSeed 100')
+
+tmpdir = tempfile.mkdtemp()
+os.chdir(tmpdir)
+
+# the fake install root, which every fake command prints
+install_root = tmpdir + '/install'
+os.makedirs(install_root + '/bin')
+executable = install_root + '/bin/modeling-project-exe'
+with open(executable, 'w') as file:
+    file.write(model_script.format(python = sys.executable, tmpdir = tmpdir, title = SHARD_FINAL_TABLE_TITLE))
+os.chmod(executable, os.stat(executable).st_mode | stat.S_IXUSR)
+
+backend = FakeBackend(output = install_root + '\n')
+
+remote_dirname = tmpdir + '/remote'
+workers = [LocalTransport('local'),
+           CommandTransport('host', run_command = ['sh', '-c', '{command}'], copy_command = ['cp', '{src}', '{dst}'],
+                            fetch_command = ['cp', '-r', '{src}', '{dst}'], remote_dirname = remote_dirname),
+           CommandTransport('broken', run_command = ['sh', '-c', '{command}'], copy_command = ['false'],
+                            remote_dirname = remote_dirname)]
+executor = Executor(workers, retries = 1)
+
+views = [FinalStatsView(series = [queue_source.count])]
+renderer = ExperimentRendererUsingDiagrams(views)
+experiment = Experiment(renderer, run_count = 8, shards = 4)
+
+results = model.run_shards(specs, experiment, backend = backend, executor = executor)
+
+assert os.path.exists(remote_dirname + '/modeling-project-exe'), 'Expected the model to be shipped to the host'
+assert os.path.exists(tmpdir + '/failed-104'), 'Expected the shard to fail once'
+assert results.get_failed_shards() == [], 'Expected the failed shard to be retried'
+assert [row['queue.count'] for (run, row) in sorted(results.get_final_table().items())] == [100, 101, 102, 103, 104, 105, 106, 107], 'Expected the merged runs'
+assert os.path.exists(experiment.get_path() + '/index.html'), 'Expected the merged report'
+
+failing = Executor([LocalTransport()], retries = 0)
+assert failing.execute('/nonexistent/modeling-project-exe', [([], tmpdir + '/job')]) == [127], 'Expected the failed job'
+
+try:
+    Transport()
+    assert False, 'Expected the abstract transport not to be instantiated'
+except TypeError:
+    pass
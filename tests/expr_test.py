@@ -0,0 +1,87 @@
+#!/usr/local/bin/python3
+
+# NOTE: It checks that the expressions are written in A-normal form,
+#       where the equal pure subexpressions are hash-consed and bound
+#       only once, the constants are folded as Haskell would compute
+#       them and the parametric subexpressions are hoisted to the model.
+
+from simulation.aivika.modeler import *
+
+def build_expr(model):
+    """Build the expression with shared subexpressions."""
+    t = time_expr(model)
+    return (t * t + t * t) / (t * t)
+
+model = MainModel()
+t = time_expr(model)
+
+assert (t * t)._id == (t * t)._id, 'Expected the equal pure expressions to share the identifier'
+assert (t * t)._id != (t + t)._id, 'Expected the different expressions to have different identifiers'
+
+code = build_expr(model).read('transact')
+assert code == '(do { _e1 <- (const (liftDynamics time) transact); ' + \
+               'let { _e2 = ((*) _e1 _e1) }; ' + \
+               'let { _e3 = ((+) _e2 _e2) }; ' + \
+               'let { _e4 = ((/) _e3 _e2) }; ' + \
+               'return _e4 })', 'Expected every shared subexpression bound once'
+
+assert code.count('liftDynamics time') == 1, 'Expected the time read once'
+assert build_expr(model).read('transact') == code, 'Expected the same code when the expression is rebuilt'
+assert build_expr(MainModel()).read('transact') == code, 'Expected the same code in another model'
+
+code = (t * t).read('transact')
+assert code == '(do { _e1 <- (const (liftDynamics time) transact); let { _e2 = ((*) _e1 _e1) }; return _e2 })'
+
+code = time_expr(model).read('transact')
+assert code == '(const (liftDynamics time) transact)', 'Expected the leaf expression not to be bound'
+
+effect = Expr(model, 'const (liftIO $ putStrLn "x")')
+assert Expr(model, 'const (liftIO $ putStrLn "x")')._id != effect._id, 'Expected the expressions with side effects not to be shared'
+
+# the constant folding
+
+from simulation.aivika.modeler.expr import _fold_binary, _fold_unary
+
+assert _fold_binary('+', 2, 3) == 5
+assert _fold_binary('*', 2 ** 31, 2 ** 31) == 2 ** 62
+assert _fold_binary('*', 2 ** 62, 4) is None, 'Expected the overflow of Int not to be folded'
+assert _fold_binary('+', 2 ** 63 - 1, 1) is None, 'Expected the overflow of Int not to be folded'
+assert _fold_binary('-', - 2 ** 63, 1) is None, 'Expected the underflow of Int not to be folded'
+assert _fold_binary('-', - 2 ** 62, 2 ** 62) == - 2 ** 63
+assert _fold_unary('negate', - 2 ** 63) is None, 'Expected the negated minimal Int not to be folded'
+assert _fold_unary('abs', - 2 ** 63) is None, 'Expected the absolute minimal Int not to be folded'
+assert _fold_unary('round', 1e30) is None, 'Expected the rounded large number not to be folded'
+assert _fold_unary('round', 2.5) == 2, 'Expected the rounding half to even as in Haskell'
+assert _fold_unary('negate', 3) == -3
+
+assert _fold_binary('/', 1, 4) == 0.25
+assert _fold_binary('/', 1, 0) is None, 'Expected the division by zero not to be folded'
+assert _fold_binary('/', 1.0, 0.0) is None, 'Expected the division by zero not to be folded'
+assert _fold_binary('mod', -7, 2) == 1, 'Expected the remainder rounded to negative infinity as in Haskell'
+assert _fold_binary('mod', 7, 0) is None, 'Expected the remainder of the division by zero not to be folded'
+assert _fold_binary('mod', 7.5, 2) is None, 'Expected the remainder of the floating-point numbers not to be folded'
+assert _fold_binary('**', 10.0, 400) is None, 'Expected the infinite power not to be folded'
+assert _fold_binary('<', 1, 2) is True
+assert _fold_binary('&&', True, False) is False
+assert _fold_binary('+', True, 1) is None, 'Expected the mixed boolean and number not to be folded'
+
+assert (return_expr(model, 2) * 3).get_literal() == 6, 'Expected the constant expression folded'
+assert not (isinstance(return_expr(model, 2 ** 62) * 4, ConstExpr)), 'Expected the overflowing expression left as is'
+
+# the parametric expressions are hoisted to the model
+
+model = MainModel()
+t = time_expr(model)
+s = start_time_expr(model)
+e = (s + 1) * 2
+
+assert e.read('transact') == '(return $ _expr_' + str(e._id) + ')', 'Expected the parametric expression hoisted'
+assert ((s + 1) * 2 + t).read('transact') == \
+    '(do { _e1 <- (const (liftDynamics time) transact); let { _e2 = ((+) _expr_' + str(e._id) + ' _e1) }; return _e2 })', \
+    'Expected the hoisted expression referred to by name'
+actions = [action for action in model._actions if action.startswith('_expr_')]
+x = '_expr_' + str((s + 1)._id)
+y = '_expr_' + str(e._id)
+assert actions == [x + ' <- runEventInStartTime $ (do { _e1 <- (const (liftParameter starttime) ()); let { _e2 = ((+) _e1 (1)) }; return _e2 })',
+                   y + ' <- runEventInStartTime $ (do { let { _e1 = ((*) ' + x + ' (2)) }; return _e1 })'], \
+    'Expected every parametric subexpression bound once in the start time'
@@ -0,0 +1,36 @@
+#!/usr/local/bin/python3
+
+# NOTE: It checks that the adjacent per-item stages of the stream are
+#       fused in one mapStreamM layer, while a stage of another kind
+#       breaks the chain.
+
+import tempfile
+
+from simulation.aivika.modeler import *
+
+model = MainModel()
+data_type = TransactType(model, 'Transact')
+
+stream = exponential_random_stream(data_type, 1)
+stream = transform_stream(identity_transform(model), stream)
+stream = hold_stream(return_expr(model, 2), stream)
+stream = within_stream(return_expr(model, 1), stream)
+stream = prefetch_stream(stream)
+stream = hold_stream(return_expr(model, 3), stream)
+terminate_stream(stream)
+
+dirname = tempfile.mkdtemp()
+model.generate(Specs(0, 100, 0.1), dirname = dirname)
+with open(dirname + '/app/Main.hs') as file:
+    code = file.read()
+
+f = '(\\a -> liftEvent (return a))'
+g = '(\\a -> do { dt0 <- liftEvent $ (const (return $ 2) a); holdProcess dt0; return a })'
+h = '(\\a -> liftEvent (const (return $ 1) a) >> return a)'
+k = '(\\a -> do { dt0 <- liftEvent $ (const (return $ 3) a); holdProcess dt0; return a })'
+
+assert '_port_4 <- return $ mapStreamM (' + f + ' >=> ' + g + ' >=> ' + h + ') _port_1' in code, 'Expected the adjacent stages fused'
+assert not ('_port_2 <-' in code) and not ('_port_3 <-' in code), 'Expected the fused ports to disappear from the code'
+assert '_port_5 <- return $ prefetchStream _port_4' in code, 'Expected the chain broken by the stage of another kind'
+assert '_port_6 <- return $ mapStreamM ' + k + ' _port_5' in code, 'Expected a new chain after the broken one'
+assert code.count('mapStreamM') == 2, 'Expected one layer per chain'
@@ -0,0 +1,116 @@
+#!/usr/local/bin/python3
+
+# NOTE: It checks that the offline mirror lists the packages missing from
+#       the dependency closure of the model and that the generated stack
+#       and cabal files take the packages only from the mirror. The mirror
+#       consists of fake tarballs with the .cabal files alone, which is why
+#       the test does not require Stack.
+
+import os
+import io
+import tarfile
+import tempfile
+
+from simulation.aivika.modeler import *
+
+def write_tarball(dirname, name, version, build_depends):
+    """Write the fake package tarball that contains only the .cabal file."""
+    text = 'name: ' + name + '\nversion: ' + version + '\n\n' + build_depends
+    data = text.encode('utf-8')
+    info = tarfile.TarInfo(name + '-' + version + '/' + name + '.cabal')
+    info.size = len(data)
+    with tarfile.open(os.path.join(dirname, name + '-' + version + '.tar.gz'), 'w:gz') as archive:
+        archive.addfile(info, io.BytesIO(data))
+
+def create_model():
+    """Create a simple model."""
+    model = MainModel()
+    data_type = TransactType(model, 'Transact')
+    input_stream = exponential_random_stream(data_type, 1)
+    terminate_stream(input_stream)
+    return model
+
+def read_file(filename):
+    """Return the file contents."""
+    with open(filename) as file:
+        return file.read()
+
+specs = Specs(0, 100, 0.1)
+
+tmpdir = tempfile.mkdtemp()
+mirror_dirname = tmpdir + '/mirror'
+os.makedirs(mirror_dirname)
+
+write_tarball(mirror_dirname, 'aivika', '5.2', """library
+  exposed-modules: Simulation.Aivika
+  build-depends:   base >= 3 && < 6,
+                   containers >= 0.4.0.0,
+                   random >= 1.0.0.3
+  if os(windows)
+    build-depends: Win32-extra
+  else
+    build-depends: unix-extra
+
+executable aivika-demo
+  build-depends:   demo-only
+""")
+write_tarball(mirror_dirname, 'aivika-transformers', '5.1', """library
+  build-depends: base, aivika >= 5.2, mtl
+""")
+with open(os.path.join(mirror_dirname, 'README.txt'), 'w') as file:
+    file.write('Not a tarball\n')
+
+mirror = OfflineMirror(mirror_dirname)
+assert [os.path.basename(x) for x in mirror.get_tarballs()] == ['aivika-5.2.tar.gz', 'aivika-transformers-5.1.tar.gz'], 'Expected only the tarballs'
+assert mirror.get_snapshot() is None, 'Expected no snapshot file'
+assert mirror.get_dependencies(mirror_dirname + '/aivika-5.2.tar.gz') == ['base', 'containers', 'random'], 'Expected the unconditional dependencies of the library'
+assert mirror.find_missing_packages(['aivika-5.2', 'aivika-transformers-5.2'], ['aivika', 'aivika-transformers']) == ['aivika-transformers-5.2', 'random'], 'Expected the missing extra dependency and the missing dependency of the found package'
+assert mirror.find_missing_packages([], ['aivika-transformers']) == ['mtl', 'random'], 'Expected the transitive dependencies to be checked'
+
+set_offline_mirror(mirror_dirname)
+try:
+    create_model().generate(specs, dirname = tmpdir + '/target')
+    assert False, 'Expected the missing packages to be reported'
+except MissingPackagesException as e:
+    assert e.packages == ['aivika-transformers-5.2', 'random'], 'Expected the list of the missing packages'
+    assert 'aivika-transformers-5.2, random' in e.message
+assert not os.path.exists(tmpdir + '/target/stack.yaml'), 'Expected the generation to fail before writing the files'
+
+write_tarball(mirror_dirname, 'aivika-transformers', '5.2', """library
+  build-depends: base, aivika >= 5.2, mtl
+""")
+write_tarball(mirror_dirname, 'random', '1.1', """library
+  build-depends: base, time
+""")
+write_tarball(mirror_dirname, 'mtl', '2.2.1', """library
+  build-depends: base, transformers
+""")
+
+create_model().generate(specs, dirname = tmpdir + '/target')
+stack_file = read_file(tmpdir + '/target/stack.yaml')
+assert '\nresolver: lts-8.13\n' in stack_file, 'Expected the Stackage snapshot without the snapshot file'
+for name in ['aivika-5.2', 'aivika-transformers-5.1', 'aivika-transformers-5.2', 'random-1.1', 'mtl-2.2.1']:
+    assert '- location:\n   ' + mirror_dirname + '/' + name + '.tar.gz\n  extra-dep: true' in stack_file, 'Expected the tarball location ' + name
+assert 'extra-deps:\n\n' in stack_file, 'Expected no extra dependencies to download'
+project_file = read_file(tmpdir + '/target/cabal.project')
+assert 'url: file+noindex://' + mirror_dirname + '\n' in project_file, 'Expected cabal-install to be restricted to the mirror'
+
+snapshot_file = mirror_dirname + '/snapshot.yaml'
+with open(snapshot_file, 'w') as file:
+    file.write('resolver: ghc-8.0.2\nname: mirror\npackages: []\n')
+set_offline_mirror(mirror_dirname)
+assert get_offline_mirror().get_snapshot() == snapshot_file, 'Expected the snapshot file of the mirror'
+create_model().generate(specs, dirname = tmpdir + '/target')
+stack_file = read_file(tmpdir + '/target/stack.yaml')
+assert '\nresolver:\n  name: aivika-modeler-mirror\n  location: "' + snapshot_file + '"\n' in stack_file, 'Expected the snapshot file of the mirror'
+
+custom_file = tmpdir + '/custom.yaml'
+assert OfflineMirror(mirror_dirname, snapshot = custom_file).get_snapshot() == custom_file, 'Expected the explicit snapshot file'
+
+set_offline_mirror(None)
+create_model().generate(specs, dirname = tmpdir + '/target')
+stack_file = read_file(tmpdir + '/target/stack.yaml')
+assert '\nresolver: lts-8.13\n' in stack_file, 'Expected the Stackage snapshot without the mirror'
+assert '- aivika-5.2\n' in stack_file, 'Expected the extra dependencies to download without the mirror'
+assert not (mirror_dirname in stack_file), 'Expected no tarball locations without the mirror'
+assert not os.path.exists(tmpdir + '/target/cabal.project'), 'Expected the cabal.project file to be removed without the mirror'
@@ -0,0 +1,128 @@
+#!/usr/local/bin/python3
+
+# NOTE: It checks that the model parameters are read by the compiled
+#       model instead of being baked into the code. The fake backend
+#       only records the commands, which is why the test does not
+#       require Stack.
+
+import tempfile
+
+from simulation.aivika.modeler import *
+
+model = MainModel()
+
+data_type = TransactType(model, 'Transact')
+
+mean_delay = Param(model, 'mean_delay', 0.4)
+capacity = Param(model, 'capacity', 10)
+
+input_stream = exponential_random_stream(data_type, mean_delay)
+
+queue = create_queue(model, data_type, capacity, name = 'queue')
+queue_source = queue.add_result_source()
+
+enqueue_stream_or_remove_item(queue, input_stream)
+
+output_stream = dequeue_stream(queue)
+terminate_stream(output_stream)
+
+specs = Specs(0, 100, 0.1)
+
+dirname = tempfile.mkdtemp() + '/target'
+
+backend = FakeBackend()
+
+model.run(specs, dirname = dirname, backend = backend)
+model.run(specs, dirname = dirname, backend = backend, params = {'capacity': 20})
+model.run(Specs(0, 200, 0.1), dirname = dirname, backend = backend)
+
+with open(dirname + '/app/Main.hs') as file:
+    code = file.read()
+
+assert 'randomExponentialStream (modelParam "mean_delay" (0.4))' in code, 'Expected the mean delay parameter'
+assert 'Q.newQueue FCFS FCFS FCFS (modelParam "capacity" (10))' in code, 'Expected the capacity parameter'
+
+assert 'spcStopTime = modelParam "specs.stop_time" (200)' in code, 'Expected the stop time to be overridable'
+
+specs_args = get_param_args(specs.get_launch_params())
+
+commands = [args for (cwd, args) in backend.get_commands() if not ('path' in args)]
+assert commands == [['stack', 'build'],
+                    ['stack', 'exec', 'modeling-project-exe', '--'] + specs_args,
+                    ['stack', 'exec', 'modeling-project-exe', '--', '--param', 'capacity=20'] + specs_args,
+                    ['stack', 'exec', 'modeling-project-exe', '--'] + specs_args[:8] + ['--param', 'specs.stop_time=200']], 'Expected one build for different parameter values and specs'
+
+try:
+    Param(model, 'specs.dt', 0.5)
+    assert False, 'Expected the reserved parameter name to be rejected'
+except InvalidParamException:
+    pass
+
+experiment = Experiment(ExperimentRendererUsingDiagrams([FinalStatsView(series = [])]))
+model.generate(specs, experiment, dirname = dirname)
+
+with open(dirname + '/app/Main.hs') as file:
+    lines = file.read().split('\n')
+
+path_line = '         path     = WritableFilePath (modelParamBy Just "experiment.path" (' + encode_str(experiment.get_path()) + '))'
+assert path_line in lines, 'Expected the experiment path to be overridable'
+
+params_filename = tempfile.mkdtemp() + '/params.json'
+write_params_file(params_filename, {'capacity': 20, 'verbose': True, 'experiment.path': 'results/a-b'})
+with open(params_filename) as file:
+    assert file.read() == '{"capacity": 20, "experiment.path": "results/a-b", "verbose": true}'
+
+for values in [{'title': 'a, b'}, {'title': '{x}'}, {'title': 'say "hi"'}, {'delays': [1, 2]}, {'a:b': 1}]:
+    try:
+        write_params_file(params_filename, values)
+        assert False, 'Expected the value that the compiled model cannot read to be rejected: ' + repr(values)
+    except InvalidParamException:
+        pass
+
+backend = FakeBackend()
+model.interpret(specs, dirname = dirname, backend = backend, params = {'capacity': 1})
+model.interpret(specs, dirname = dirname, backend = backend, params = {'capacity': 2})
+
+commands = backend.get_interpreter_input()
+runs = [command for command in commands if 'withArgs' in command]
+assert commands.count(':set +r') == 1, 'Expected the top-level values reverted after every evaluation'
+assert commands.index(':set +r') < commands.index(runs[0]), 'Expected the top-level values reverted before the first run'
+assert len(runs) == 2, 'Expected the model run twice in the same session'
+assert '"capacity=1"' in runs[0] and '"capacity=2"' in runs[1], 'Expected the parameter values of every run'
+
+specs = Specs(0, 100, 0.1, method = '(Euler)', generator_type = '(SimpleGeneratorWithSeed 1)')
+assert specs.get_launch_params()['specs.generator_type'] == '(SimpleGeneratorWithSeed 1)', 'Expected the seed in parentheses passed at launch'
+assert specs.get_launch_params()['specs.method'] == '(Euler)', 'Expected the method in parentheses passed at launch'
+
+custom_specs = Specs(0, 100, 0.1, generator_type = 'CustomGenerator01 (return 0.5)')
+assert not ('specs.generator_type' in custom_specs.get_launch_params()), 'Expected the custom generator not to be passed at launch'
+model.generate(custom_specs, dirname = dirname)
+with open(dirname + '/app/Main.hs') as file:
+    code = file.read()
+assert 'spcGeneratorType = CustomGenerator01 (return 0.5) }' in code, 'Expected the custom generator compiled as is'
+
+assert not can_launch_generator_type('SimpleGeneratorWithSeed -1'), 'Expected the negative seed not to be read'
+assert not can_launch_method('RungeKutta3'), 'Expected the unknown method not to be read'
+
+backend = FakeBackend()
+model.run(specs, dirname = dirname, backend = backend)
+assert '--param' in backend.get_commands()[-1][1] and 'specs.generator_type=(SimpleGeneratorWithSeed 1)' in backend.get_commands()[-1][1]
+
+try:
+    model.run(specs, dirname = dirname, backend = backend, params = {'specs.generator_type': 'CustomGenerator01 (return 0.5)'})
+    assert False, 'Expected the generator type that the model cannot read to be rejected'
+except InvalidParamException as e:
+    assert 'specs.generator_type' in e.message
+
+model = MainModel()
+k = Param(model, 'k', 2.0)
+code = (time_expr(model) * k).read('transact')
+assert code == '(do { _e1 <- (const (liftDynamics time) transact); let { _e2 = ((*) _e1 ((modelParam "k" (2.0)))) }; return _e2 })', \
+    'Expected the parameter coerced to the expression'
+assert binary_expr(time_expr(model), '+', k).read('transact').count('modelParam "k"') == 1, 'Expected the parameter accepted by binary_expr'
+
+try:
+    time_expr(MainModel()) * k
+    assert False, 'Expected the parameter of another model to be rejected'
+except InvalidExprException:
+    pass
@@ -0,0 +1,46 @@
+#!/usr/local/bin/python3
+
+# NOTE: It checks that the definitions whose values never reach a root
+#       are eliminated, while the queues, result sources and actions
+#       with side effects are kept.
+
+import tempfile
+
+from simulation.aivika.modeler import *
+from simulation.aivika.modeler.model_reachability import find_dead_vars_impl
+
+actions = ['_x <- return 1',
+           '_y <- return (_x + 1)',
+           '_z <- return (_y + 1)',
+           '_q <- newQueue',
+           '_unused <- return (_x * 2)',
+           'print _z']
+var_names = set(['_x', '_y', '_z', '_q', '_unused'])
+
+assert find_dead_vars_impl(actions, [], var_names, set(['_q'])) == ['_unused'], 'Expected only the unused definition dropped'
+assert find_dead_vars_impl(actions, ['source _unused'], var_names, set(['_q'])) == [], 'Expected the definition used by the result source kept'
+assert find_dead_vars_impl(actions[:-1], [], var_names, set(['_q'])) == ['_x', '_y', '_z', '_unused'], 'Expected all but the root dropped without the action'
+
+model = MainModel()
+data_type = TransactType(model, 'Transact')
+
+# the queue is never used, but it is a root
+idle_queue = create_queue(model, data_type, 5, name = 'idleQueue')
+
+# the timer is never used, which is why it is eliminated
+timer = create_arrival_timer(model, name = 'timer')
+
+queue = create_queue(model, data_type, 10, name = 'queue')
+queue_source = queue.add_result_source()
+enqueue_stream_or_remove_item(queue, exponential_random_stream(data_type, 2))
+
+dirname = tempfile.mkdtemp()
+model.generate(Specs(0, 100, 0.1), dirname = dirname)
+with open(dirname + '/app/Main.hs') as file:
+    code = file.read()
+
+assert model.get_eliminated_vars() == ['_user_timer'], 'Expected the unused timer eliminated'
+assert not ('_user_timer' in code), 'Expected the unused timer not to be written'
+assert '_user_idleQueue <-' in code, 'Expected the queue kept as a root'
+assert '_user_queue <-' in code, 'Expected the queue with the result source kept'
+assert 'consumeStream' in code, 'Expected the action with side effect kept'
@@ -0,0 +1,94 @@
+#!/usr/local/bin/python3
+
+# NOTE: It checks that the replicated sub-models are translated into
+#       one station function applied by forM, so that the generated code
+#       does not grow with the number of replicas.
+
+import tempfile
+
+from simulation.aivika.modeler import *
+
+def build_model(count, chained):
+    """Build the line of workstations with the specified number of replicas."""
+    model = MainModel()
+    data_type = TransactType(model, 'Transact')
+
+    input_stream = exponential_random_stream(data_type, 0.5)
+
+    def build_station(submodel, stream):
+        station_type = data_type.bind_to_model(submodel)
+        queue = create_queue(submodel, data_type, 10, name = 'queue', descr = 'The workstation queue')
+        queue_source = queue.add_result_source()
+        enqueue_stream_or_remove_item(queue, stream)
+        server = exponential_random_server(station_type, 0.25, name = 'server', descr = 'The workstation server')
+        server_source = server.add_result_source()
+        return server_stream(server, dequeue_stream(queue))
+
+    output_stream = replicate_submodel(model, count, build_station, input_stream, name = 'line', chained = chained)
+    terminate_stream(output_stream)
+    return model
+
+def generate_code(count, chained, split_modules = False):
+    """Generate the code of the model and return the main file."""
+    model = build_model(count, chained)
+    dirname = tempfile.mkdtemp()
+    model.generate(Specs(0, 100, 0.1), dirname = dirname, split_modules = split_modules)
+    with open(dirname + '/app/Main.hs') as file:
+        return file.read()
+
+for chained in [False, True]:
+    code2 = generate_code(2, chained)
+    code200 = generate_code(200, chained)
+    assert len(code200) - len(code2) <= 4, 'Expected the code not to grow with the number of replicas'
+    assert code2.count('_rep_1_station') == 2, 'Expected one station function applied once'
+    assert code2.count('Q.newQueue') == 1, 'Expected one queue definition'
+    assert '_rep_1_user_server <- newPreemptibleRandomExponentialServer' in code2, 'Expected the server of every replica'
+    assert '("line" ++ "[" ++ show (_rep_1_index :: Int) ++ "].queue")' in code2, 'Expected the indexed result source name'
+    if chained:
+        assert 'foldM' in code2, 'Expected the replicas connected in series'
+        assert 'snd _rep_1' in code2, 'Expected the result sources of the replicas'
+    else:
+        assert 'forM (zip [1 .. 2 :: Int] ys)' in code2, 'Expected the replicas applied by forM'
+        assert 'concatMap snd _rep_1' in code2, 'Expected the result sources of the replicas'
+    split_code = generate_code(200, chained, split_modules = True)
+    assert '_rep_1' in split_code, 'Expected the replicas returned by the model part'
+
+def build_nested_model():
+    """Build the model, where the replicas contain both the usual and replicated sub-models."""
+    model = MainModel()
+    data_type = TransactType(model, 'Transact')
+
+    def build_cell(submodel):
+        inner = SubModel(submodel, name = 'inner')
+        timer = create_arrival_timer(inner, name = 'timer')
+        timer_source = timer.add_result_source()
+        stream = exponential_random_stream(data_type.bind_to_model(submodel), 1)
+        stream = arrival_timer_stream(timer, stream)
+        return replicate_submodel(submodel, 3, build_machine, stream, name = 'machine')
+
+    def build_machine(submodel, stream):
+        timer = create_arrival_timer(submodel, name = 'timer')
+        timer_source = timer.add_result_source()
+        return arrival_timer_stream(timer, stream)
+
+    output_stream = replicate_submodel(model, 5, build_cell, name = 'cell')
+    terminate_stream(output_stream)
+    return model
+
+model = build_nested_model()
+dirname = tempfile.mkdtemp()
+model.generate(Specs(0, 100, 0.1), dirname = dirname)
+with open(dirname + '/app/Main.hs') as file:
+    code = file.read()
+
+assert '(("cell" ++ "[" ++ show (_rep_1_index :: Int) ++ "].machine") ++ "[" ++ show (_rep_3_index :: Int) ++ "].timer")' in code, 'Expected the result source name indexed twice'
+assert '("cell" ++ "[" ++ show (_rep_1_index :: Int) ++ "].inner.timer")' in code, 'Expected the nested result source name'
+assert '_rep_3 <- splitStream 3' in code, 'Expected the nested replicas inside the outer station'
+assert ' ++ concatMap snd _rep_3' in code, 'Expected the result sources of the nested replicas'
+assert '_rep_1_port_1 <- return $ mapStream' in code, 'Expected the input stream of every outer replica'
+
+try:
+    replicate_submodel(MainModel(), 0, lambda submodel: None)
+    assert False, 'Expected the invalid number of replicas to be rejected'
+except ModelException:
+    pass
@@ -0,0 +1,90 @@
+#!/usr/local/bin/python3
+
+# NOTE: It checks that the runs of the experiment are split into shards
+#       whose results are merged. The fake backend writes the CSV files
+#       that the shard views would save, which is why the test does not
+#       require Stack.
+
+import os
+import tempfile
+
+from simulation.aivika.modeler import *
+
+class ShardBackend(FakeBackend):
+    """The fake backend whose model saves the tables of the shard views."""
+
+    def popen(self, args, cwd = None, interactive = False):
+        """Save the tables if the model is run."""
+        params = dict(args[i + 1].split('=', 1) for i in range(len(args) - 1) if args[i] == '--param')
+        if 'experiment.path' in params:
+            path = params['experiment.path']
+            seed = int(params['specs.generator_type'].split()[1])
+            os.makedirs(path, exist_ok = True)
+            with open(path + '/' + SHARD_FINAL_TABLE_TITLE + '.csv', 'w') as file:
+                file.write('"Run","queue.count"\n')
+                for run in range(int(params['experiment.run_count'])):
+                    file.write(str(run + 1) + ',' + str(seed + run) + '\n')
+            for run in range(int(params['experiment.run_count'])):
+                with open(path + '/' + SHARD_TABLE_TITLE + ' - ' + str(run + 1) + '.csv', 'w') as file:
+                    file.write('"t","queue.count"\n')
+                    file.write('0.0,0\n')
+                    file.write('1.0,' + str(seed + run) + '\n')
+        return FakeBackend.popen(self, args, cwd = cwd, interactive = interactive)
+
+model = MainModel()
+
+data_type = TransactType(model, 'Transact')
+
+input_stream = exponential_random_stream(data_type, 0.4)
+
+queue = create_queue(model, data_type, 10, name = 'queue')
+queue_source = queue.add_result_source()
+
+enqueue_stream_or_remove_item(queue, input_stream)
+
+output_stream = dequeue_stream(queue)
+terminate_stream(output_stream)
+
+specs = Specs(0, 100, 0.1, generator_type = 'SimpleGeneratorWithSeed 100')
+
+tmpdir = tempfile.mkdtemp()
+os.chdir(tmpdir)
+
+views = [FinalStatsView(series = [queue_source.count]),
+         DeviationChartView(right_y_series = [queue_source.count])]
+renderer = ExperimentRendererUsingDiagrams(views)
+experiment = Experiment(renderer, run_count = 10, shards = 3)
+
+assert get_shard_ranges(10, 3) == [(0, 4), (4, 3), (7, 3)], 'Expected the disjoint run ranges'
+
+backend = ShardBackend()
+
+results = model.run_shards(specs, experiment, backend = backend, processes = 3)
+
+with open('target/app/Main.hs') as file:
+    code = file.read()
+
+assert ('finalTableTitle = ' + encode_str(SHARD_FINAL_TABLE_TITLE)) in code, 'Expected the final table of the shard'
+assert ('tableTitle = ' + encode_str(SHARD_TABLE_TITLE)) in code, 'Expected the table of the shard'
+
+builds = [args for (cwd, args) in backend.get_commands() if 'build' in args]
+assert builds == [['stack', 'build']], 'Expected one build for all shards'
+
+assert results.get_failed_shards() == [], 'Expected no failed shards'
+assert sorted(results.get_final_table()) == list(range(10)), 'Expected the global run indices'
+assert [row['queue.count'] for (run, row) in sorted(results.get_final_table().items())] == list(range(100, 110)), 'Expected the shifted seeds'
+
+stats = results.get_final_stats('queue.count')
+assert (stats.count, stats.mean, stats.min, stats.max) == (10, 104.5, 100, 109), 'Expected the merged statistics'
+
+deviation = results.get_deviation('queue.count')
+assert [(t, x.count, x.mean) for (t, x) in deviation] == [(0.0, 10, 0.0), (1.0, 10, 104.5)], 'Expected the merged deviation'
+
+assert os.path.exists(experiment.get_path() + '/index.html'), 'Expected the merged report'
+assert os.path.exists(experiment.get_path() + '/shard-2/' + SHARD_FINAL_TABLE_TITLE + '.csv'), 'Expected the report of the shard'
+
+stats = SamplingStats()
+for value in [1e9 + 4, 1e9 + 7, 1e9 + 13, 1e9 + 16]:
+    stats.add(value)
+assert stats.mean == 1e9 + 10
+assert abs(stats.get_variance() - 30) < 1e-6, 'Expected the variance of the values with the large offset'
@@ -0,0 +1,60 @@
+#!/usr/local/bin/python3
+
+# NOTE: It checks that the spool of strings keeps the order of strings
+#       even if the iteration stops early or the strings spill to
+#       the temporary file during the iteration.
+
+from simulation.aivika.modeler.model_emitter import *
+
+spool = StringSpool(spool_size = 10)
+for i in range(10):
+    spool.append('item' + str(i))
+
+for item in spool:
+    break
+
+spool.append('item10')
+spool.append('item11')
+
+assert list(spool) == ['item' + str(i) for i in range(12)], 'Expected the strings after the early stop'
+
+spool = StringSpool(spool_size = 10)
+for i in range(4):
+    spool.append('item' + str(i))
+
+items = []
+for item in spool:
+    items.append(item)
+    if len(items) == 1:
+        for i in range(4, 8):
+            spool.append('item' + str(i))
+
+assert items == ['item' + str(i) for i in range(8)], 'Expected the strings spilled during the iteration'
+assert list(spool) == items, 'Expected the same strings on the next iteration'
+assert len(spool) == 8
+
+spool = StringSpool(spool_size = 10)
+for i in range(3):
+    spool.append('i' + str(i))
+
+items = []
+for item in spool:
+    items.append(item)
+    if len(items) == 1:
+        spool.append('i3')
+        spool.append('i4567890')
+        spool.append('i5')
+
+assert len(spool) == 6
+assert items == ['i0', 'i1', 'i2', 'i3', 'i4567890', 'i5'], 'Expected the strings spilled during the in-memory phase of the iteration'
+
+spool = StringSpool(spool_size = 10)
+items = []
+spool.append('a')
+for item in spool:
+    items.append(item)
+    if len(items) < 20:
+        spool.append('item' + str(len(items)))
+
+assert items == ['a'] + ['item' + str(i) for i in range(1, 20)], 'Expected the strings appended and spilled during the iteration'
+assert list(spool) == items
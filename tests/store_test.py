@@ -0,0 +1,81 @@
+#!/usr/local/bin/python3
+
+# NOTE: It checks that the dependency store is prewarmed by Stack and
+#       then used by the generated projects, which take the built
+#       dependencies from its package database instead of building
+#       them again. The fake backend only records the commands, which
+#       is why the test does not require Stack.
+
+import os
+import tempfile
+
+from simulation.aivika.modeler import *
+
+def create_model():
+    """Create a simple model with its own extra dependency."""
+    model = MainModel()
+    data_type = TransactType(model, 'Transact')
+    input_stream = exponential_random_stream(data_type, 1)
+    terminate_stream(input_stream)
+    model.add_extra_dep('foo-1.0')
+    return model
+
+def read_file(filename):
+    """Return the file contents."""
+    with open(filename) as file:
+        return file.read()
+
+specs = Specs(0, 100, 0.1)
+
+tmpdir = tempfile.mkdtemp()
+store_dirname = tmpdir + '/store'
+package_db = tmpdir + '/store/.stack-work/install/pkgdb'
+
+set_dependency_store(None)
+
+try:
+    prewarm(store = DependencyStore(store_dirname), backend = GhcBackend())
+    assert False, 'Expected the store to be built only by Stack'
+except InvalidBackendException:
+    pass
+
+failing = FakeBackend(status = 1)
+assert prewarm(store = DependencyStore(store_dirname), backend = failing) == 1, 'Expected the failed build'
+assert get_dependency_store() is None, 'Expected the failed store not to be used'
+
+backend = FakeBackend(output = package_db + '\n')
+store = DependencyStore(store_dirname)
+assert prewarm(store = store, backend = backend) == 0, 'Expected the successful build'
+assert get_dependency_store() is store, 'Expected the store to be used afterwards'
+
+commands = backend.get_commands()
+assert len(commands) == 2, 'Expected the build and path commands'
+assert all(cwd == os.path.abspath(store_dirname) for (cwd, args) in commands), 'Expected the commands to be run in the store'
+assert commands[0][1][:2] == ['stack', 'build'], 'Expected the store to be built'
+assert 'aivika' in commands[0][1][2:], 'Expected the model packages to be built'
+assert 'aivika-experiment-diagrams' in commands[0][1][2:], 'Expected the renderer packages to be built'
+assert not ('base' in commands[0][1][2:]), 'Expected the packages of GHC not to be built'
+assert commands[1][1] == ['stack', 'path', '--local-pkg-db'], 'Expected the package database to be queried'
+
+store_file = read_file(store_dirname + '/stack.yaml')
+assert '- aivika-5.2\n' in store_file, 'Expected the extra dependencies of the store'
+assert '- aivika-experiment-diagrams-5.0\n' in store_file, 'Expected the extra dependencies of the renderer'
+
+assert store.get_package_dbs() == [package_db], 'Expected the package database to be stored'
+assert 'aivika-5.2' in store.get_extra_deps(), 'Expected the extra dependencies to be stored'
+assert DependencyStore(store_dirname).get_package_dbs() == [package_db], 'Expected the store to be read back'
+
+model = create_model()
+model.generate(specs, dirname = tmpdir + '/target')
+stack_file = read_file(tmpdir + '/target/stack.yaml')
+assert 'extra-package-dbs:\n- ' + package_db + '\n' in stack_file, 'Expected the package database of the store'
+assert not ('- aivika-5.2\n' in stack_file), 'Expected the extra dependencies of the store to be dropped'
+assert not ('- aivika-transformers-5.2\n' in stack_file), 'Expected the extra dependencies of the store to be dropped'
+assert '- foo-1.0\n' in stack_file, 'Expected the other extra dependencies to be kept'
+
+set_dependency_store(None)
+model = create_model()
+model.generate(specs, dirname = tmpdir + '/plain')
+stack_file = read_file(tmpdir + '/plain/stack.yaml')
+assert 'extra-package-dbs: []\n' in stack_file, 'Expected no package database without the store'
+assert '- aivika-5.2\n' in stack_file, 'Expected the extra dependencies without the store'
@@ -0,0 +1,82 @@
+#!/usr/local/bin/python3
+
+# NOTE: It checks that the parameter sweep compiles the model once and
+#       gathers the final values of every point. The fake backend writes
+#       the CSV file that FinalTableView would save, which is why the
+#       test does not require Stack.
+
+import os
+import tempfile
+
+from simulation.aivika.modeler import *
+
+class SweepBackend(FakeBackend):
+    """The fake backend whose model saves the final table in the experiment directory."""
+
+    def popen(self, args, cwd = None, interactive = False):
+        """Save the final table if the model is run."""
+        params = dict(args[i + 1].split('=', 1) for i in range(len(args) - 1) if args[i] == '--param')
+        if 'experiment.path' in params:
+            path = params['experiment.path']
+            os.makedirs(path, exist_ok = True)
+            with open(path + '/Final Table.csv', 'w') as file:
+                file.write('"Run","queue.count"\n')
+                for run in range(int(params['experiment.run_count'])):
+                    file.write(str(run + 1) + ',' + str(int(params['capacity']) * (run + 1)) + '\n')
+        return FakeBackend.popen(self, args, cwd = cwd, interactive = interactive)
+
+model = MainModel()
+
+data_type = TransactType(model, 'Transact')
+
+capacity = Param(model, 'capacity', 10)
+
+input_stream = exponential_random_stream(data_type, 0.4)
+
+queue = create_queue(model, data_type, capacity, name = 'queue')
+queue_source = queue.add_result_source()
+
+enqueue_stream_or_remove_item(queue, input_stream)
+
+output_stream = dequeue_stream(queue)
+terminate_stream(output_stream)
+
+specs = Specs(0, 100, 0.1)
+
+tmpdir = tempfile.mkdtemp()
+os.chdir(tmpdir)
+
+views = [FinalTableView(series = [queue_source.count])]
+renderer = ExperimentRendererUsingDiagrams(views)
+experiment = Experiment(renderer, run_count = 2)
+
+design = full_factorial_design({'capacity': [5, 10, 20], 'experiment.run_count': [2]})
+assert len(design) == 3, 'Expected three points'
+
+backend = SweepBackend()
+
+results = model.sweep(specs, experiment, design, backend = backend, processes = 2)
+
+builds = [args for (cwd, args) in backend.get_commands() if 'build' in args]
+assert builds == [['stack', 'build']], 'Expected one build for all points'
+
+assert results.get_failed_points() == [], 'Expected no failed points'
+assert results.get_names() == ['point', 'capacity', 'experiment.run_count', 'run', 'queue.count'], 'Expected the columns'
+assert results.get_column('capacity') == [5, 5, 10, 10, 20, 20], 'Expected the parameter values'
+assert results.get_column('queue.count') == [5, 10, 10, 20, 20, 40], 'Expected the final values'
+
+results.write_csv(tmpdir + '/results.csv')
+
+points = latin_hypercube_design({'capacity': (1, 100), 'mean_delay': (0.1, 1.0)}, 10, seed = 1)
+assert all(isinstance(p['capacity'], int) and 1 <= p['capacity'] <= 100 for p in points), 'Expected the integer values'
+assert sorted(int((p['mean_delay'] - 0.1) / 0.09) for p in points) == list(range(10)), 'Expected one point in every interval'
+assert sorted((p['capacity'] - 1) // 10 for p in points) == list(range(10)), 'Expected one integer point in every interval'
+
+points = latin_hypercube_design({'capacity': (1, 10)}, 10, seed = 2)
+assert sorted(p['capacity'] for p in points) == list(range(1, 11)), 'Expected every integer taken once'
+
+points = latin_hypercube_design({'capacity': (0, 4)}, 3, seed = 3)
+assert len(set(p['capacity'] for p in points)) == 3, 'Expected the distinct integers'
+
+points = latin_hypercube_design({'capacity': (1, 5)}, 20, seed = 4)
+assert sorted(p['capacity'] for p in points) == sorted(list(range(1, 6)) * 4), 'Expected every integer taken by the same number of points'
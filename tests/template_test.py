@@ -0,0 +1,101 @@
+#!/usr/local/bin/python3
+
+# NOTE: It checks that the sub-model template is written once in its own
+#       module, which is left untouched when only the top level of
+#       the model changes.
+
+import os
+import tempfile
+
+from simulation.aivika.modeler import *
+
+def build_model(rate, extra_queue):
+    """Build the model, where the workstations are the instances of the template."""
+    model = MainModel()
+    data_type = TransactType(model, 'Transact')
+
+    def build_station(template, stream):
+        station_type = data_type.bind_to_model(template)
+        queue = create_queue(template, data_type, 10, name = 'queue', descr = 'The workstation queue')
+        queue_source = queue.add_result_source()
+        enqueue_stream_or_remove_item(queue, stream)
+        server = exponential_random_server(station_type, 0.25, name = 'server', descr = 'The workstation server')
+        server_source = server.add_result_source()
+        return server_stream(server, dequeue_stream(queue))
+
+    station = SubModelTemplate(model, 'Station', build_station, input_types = [data_type])
+
+    stream = exponential_random_stream(data_type, rate)
+    if extra_queue:
+        queue = create_queue(model, data_type, 5, name = 'extraQueue')
+        queue_source = queue.add_result_source()
+        enqueue_stream_or_remove_item(queue, stream)
+        stream = dequeue_stream(queue)
+    for i in range(3):
+        stream = station.instantiate(model, [stream], name = 'station' + str(i + 1))
+    submodel = SubModel(model, name = 'submodel')
+    stream = station.instantiate(submodel, [stream], name = 'station4')
+    terminate_stream(stream)
+    return model
+
+dirname = tempfile.mkdtemp()
+template_filename = dirname + '/src/ModelTemplateStation.hs'
+
+files = build_model(0.5, False).generate(Specs(0, 100, 0.1), dirname = dirname)
+assert template_filename in files, 'Expected the template module to be written'
+
+with open(template_filename) as file:
+    template_code = file.read()
+with open(dirname + '/app/Main.hs') as file:
+    code = file.read()
+
+assert 'templateStation :: String -> Stream Transact -> Simulation ([ResultSource], Stream Transact)' in template_code, 'Expected the typed template function'
+assert '_tpl_user_server <- newPreemptibleRandomExponentialServer' in template_code, 'Expected the server of every instance'
+assert 'resultSource (_tpl_prefix ++ "queue")' in template_code, 'Expected the result source named by the instance'
+assert 'import ModelTemplateStation' in code, 'Expected the template module imported'
+assert 'import ModelTypes' in code, 'Expected the transact types in their own module'
+assert not ('data Transact_Impl' in code), 'Expected the transact types not to be defined in the main module'
+assert code.count('templateStation ') == 4, 'Expected one call per instance'
+assert '_port_2 <- return $ snd _inst_1' in code, 'Expected the output stream of the instance'
+assert 'templateStation "station1." _port_1' in code, 'Expected the instance name passed to the template function'
+assert 'templateStation "submodel.station4."' in code, 'Expected the instance name prefixed by the sub-model'
+assert 'Q.newQueue' not in code, 'Expected the template code not to be inlined'
+
+with open(dirname + '/modeling-project.cabal') as file:
+    assert 'ModelTemplateStation' in file.read(), 'Expected the template module in the library'
+
+files = build_model(0.7, True).generate(Specs(0, 100, 0.1), dirname = dirname)
+assert dirname + '/app/Main.hs' in files, 'Expected the main module to be rewritten'
+assert not (template_filename in files), 'Expected the unchanged template module to be left untouched'
+
+with open(template_filename) as file:
+    assert file.read() == template_code, 'Expected the same template code'
+
+files = build_model(0.7, True).generate(Specs(0, 100, 0.1), dirname = dirname, split_modules = True)
+assert not (template_filename in files), 'Expected the template module to be shared with the split model'
+with open(dirname + '/src/ModelPart1.hs') as file:
+    assert 'import ModelTemplateStation' in file.read(), 'Expected the template module imported by the model parts'
+
+files = MainModel().generate(Specs(0, 100, 0.1), dirname = dirname)
+assert not os.path.exists(template_filename), 'Expected the stale template module to be removed'
+
+model = MainModel()
+data_type = TransactType(model, 'Transact')
+outer_stream = exponential_random_stream(data_type, 1)
+
+try:
+    SubModelTemplate(model, 'Invalid', lambda template: outer_stream)
+    assert False, 'Expected the template returning the stream of the model to be rejected'
+except ModelException as e:
+    assert 'belong to template' in e.message
+
+def build_invalid_template(template):
+    queue = create_queue(template, data_type, 10, name = 'queue')
+    enqueue_stream_or_remove_item(queue, outer_stream)
+    return dequeue_stream(queue)
+
+try:
+    SubModelTemplate(model, 'Invalid', build_invalid_template)
+    assert False, 'Expected the template referring to the stream of the model to be rejected'
+except ModelException as e:
+    assert 'cannot refer to variable _port_1' in e.message
@@ -0,0 +1,67 @@
+#!/usr/local/bin/python3
+
+# NOTE: It checks that distinct models can be built in parallel threads
+#       and every one is translated into the same code as when it is
+#       built alone.
+
+import os
+import sys
+import tempfile
+
+from concurrent.futures import ThreadPoolExecutor
+
+from simulation.aivika.modeler import *
+
+def build_model(index):
+    """Build the model variant by the specified index."""
+    model = MainModel()
+    submodel = SubModel(model, name = 'submodel')
+
+    data_type = TransactType(model, 'Transact')
+    field = Attr(data_type, 'field', 0)
+
+    input_stream = exponential_random_stream(data_type, 0.4 + index)
+    input_stream = transform_stream(field.expr_transform(time_expr(model)), input_stream)
+
+    queue = create_queue(submodel, data_type, 4 + index, name = 'queue')
+    queue_source = queue.add_result_source()
+    enqueue_stream_or_remove_item(queue, input_stream)
+
+    server = exponential_random_server(data_type, 0.25, name = 'server')
+    server_source = server.add_result_source()
+
+    stream = dequeue_stream(queue)
+    stream = server_stream(server, stream)
+    (stream1, stream2) = split_stream(2, stream)
+    terminate_stream(stream1)
+    terminate_stream(stream2)
+
+    return model
+
+def generate_code(index, dirname):
+    """Build the model variant, generate its code in the directory and return it."""
+    model = build_model(index)
+    specs = Specs(0, 100, 0.1)
+    views = [FinalStatsView(series = [])]
+    experiment = Experiment(ExperimentRendererUsingDiagrams(views))
+    model.generate(specs, experiment, dirname = dirname)
+    with open(dirname + '/app/Main.hs') as file:
+        return (file.read().replace(experiment.get_path(), '<path>'), experiment.get_path())
+
+sys.setswitchinterval(1e-6)
+
+count = 64
+
+tmpdir = tempfile.mkdtemp()
+
+expected = [generate_code(i, tmpdir + '/serial' + str(i))[0] for i in range(count)]
+
+with ThreadPoolExecutor(max_workers = 16) as executor:
+    results = list(executor.map(lambda i: generate_code(i, tmpdir + '/parallel' + str(i)), range(count)))
+
+for i in range(count):
+    (code, path) = results[i]
+    assert 'main =' in code, 'Expected the valid code of model ' + str(i)
+    assert code == expected[i], 'Expected the same code of model ' + str(i) + ' built in parallel'
+
+assert len(set(path for (code, path) in results)) == count, 'Expected the distinct experiment paths'